@@ -0,0 +1,789 @@
+import argparse
+import gc
+import importlib
+import inspect
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from functools import cached_property
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+import numpy as np
+import pandas as pd
+
+from Benchmarks.syntheticData import syntheticMovies
+from Config.instrumentation import setInstrumentation
+from Data_Analysis.KPI_Analysis import aggregationCube, incrementalKPI, kpiAnalysis, searchIndex, sketches, sortIndex
+from Data_Cleaning import (chunkedPipeline, convertDataType, convertNumeric, extractColumn, getColumnSize,
+                           normalizeTables, optimizeDataTypes, parallelCleaning, parseNested, reOrderColumns,
+                           removeColumn, separateArray)
+
+
+# The packages whose public functions and methods must all have a benchmark
+COVERED_PACKAGES = ("Data_Cleaning", "Data_Analysis.KPI_Analysis")
+
+# Public functions without a benchmark of their own, and why
+NOT_BENCHMARKED = {
+    "Data_Cleaning.parseNested:clearNestedCache": "called before every repeat",
+    "Data_Cleaning.parseNested:nestedCacheInfo": "returns counters",
+    "Data_Analysis.KPI_Analysis.sortIndex:SortedIndex.invalidate": "drops cached orders, timed with order",
+    "Data_Analysis.KPI_Analysis.incrementalKPI:SeenMovies.close": "closes the SQLite connection",
+    "Data_Analysis.KPI_Analysis.incrementalKPI:KPIState.close": "closes the SQLite connection"
+}
+
+HISTORY_PATH = os.path.join(project_root, "Benchmarks", "results", "history.jsonl")
+
+# Benchmark name -> (group, function, functions it covers)
+BENCHMARKS = {}
+
+
+#Defines a decorator that registers a benchmark
+def benchmark(group: str, *covers: str):
+    """
+    Registers a benchmark. The decorated function gets the BenchmarkData, does the untimed setup
+    and returns the call to time, asv style. covers names the functions the call exercises, as
+    "module:function" or "module:Class.method" without the package
+    """
+    def register(function):
+        BENCHMARKS[function.__name__] = (group, function, covers)
+        return function
+
+    return register
+
+
+class BenchmarkData:
+    """
+    The synthetic movies a run is timed on, built once per size: raw as extracted, cleaned by the
+    notebook's steps, and cleaned with the KPIs. Files are written to a temporary directory
+    """
+
+    def __init__(self, rows: int, seed: int, directory: str, extractRows: int, workers: int):
+        self.rows = rows
+        self.seed = seed
+        self.directory = directory
+        self.extractRows = extractRows
+        self.workers = workers
+        self.server = None
+
+    @cached_property
+    def raw(self) -> pd.DataFrame:
+        return syntheticMovies(self.rows, self.seed)
+
+    @cached_property
+    def clean(self) -> pd.DataFrame:
+        return chunkedPipeline.applySteps(self.raw.copy(), chunkedPipeline.DEFAULT_STEPS)
+
+    @cached_property
+    def kpis(self) -> pd.DataFrame:
+        # calculateROI casts to int, so movies without a budget are left out as in the notebook's data
+        data = self.clean[self.clean["budget_musd"] > 0].copy()
+        data = kpiAnalysis.calculateProfit(data, revenueColumn="revenue_musd", budgetColumn="budget_musd")
+
+        return kpiAnalysis.calculateROI(data, revenueColumn="revenue_musd", budgetColumn="budget_musd")
+
+    @cached_property
+    def csvPath(self) -> str:
+        path = os.path.join(self.directory, f"raw-{self.rows}.csv")
+        self.raw.to_csv(path, index=False)
+
+        return path
+
+    @cached_property
+    def tables(self) -> dict:
+        return normalizeTables.buildMovieTables(self.raw.copy())
+
+    @cached_property
+    def url(self) -> str:
+        from Benchmarks.stubServer import startStubServer
+
+        self.server, url = startStubServer()
+
+        return url
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def close(self) -> None:
+        if self.server is not None:
+            self.server.shutdown()
+
+
+def _split(data: pd.DataFrame, parts: int) -> list:
+    bounds = np.linspace(0, len(data), parts + 1).astype(int)
+
+    return [data.iloc[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+# Data cleaning
+
+@benchmark("cleaning", "chunkedPipeline:applySteps")
+def cleanAll(data):
+    raw = data.raw.copy()
+    return lambda: chunkedPipeline.applySteps(raw, chunkedPipeline.DEFAULT_STEPS)
+
+
+@benchmark("cleaning", "chunkedPipeline:readChunks")
+def readChunks(data):
+    return lambda: sum(len(chunk) for chunk in chunkedPipeline.readChunks(data.csvPath, chunksize=10000))
+
+
+@benchmark("cleaning", "chunkedPipeline:ChunkWriter.write", "chunkedPipeline:ChunkWriter.close")
+def writeChunks(data):
+    chunks = _split(data.clean, 4)
+
+    def run():
+        with chunkedPipeline.ChunkWriter(data.path("chunks.csv")) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+
+    return run
+
+
+@benchmark("cleaning", "chunkedPipeline:cleanInChunks")
+def cleanInChunks(data):
+    return lambda: chunkedPipeline.cleanInChunks(data.csvPath, data.path("cleaned.csv"), chunksize=10000)
+
+
+@benchmark("cleaning", "parallelCleaning:cleanInParallel", "parallelCleaning:cleanPartitions",
+           "parallelCleaning:concatPartitions")
+def cleanInParallel(data):
+    raw = data.raw.copy()
+    return lambda: parallelCleaning.cleanInParallel(raw, workers=data.workers)
+
+
+@benchmark("cleaning", "convertDataType:convertDataType")
+def convertDataTypes(data):
+    raw = data.raw.copy()
+    return lambda: convertDataType.convertDataType(raw, columns=chunkedPipeline.DEFAULT_STEPS[2][1]["columns"])
+
+
+@benchmark("cleaning", "convertNumeric:convertNumeric")
+def convertNumericColumns(data):
+    raw = data.raw.copy()
+    return lambda: convertNumeric.convertNumeric(raw, columns=["budget", "revenue"], value=1000000)
+
+
+@benchmark("cleaning", "extractColumn:extractColumnData")
+def extractDirectors(data):
+    raw = data.raw.copy()
+    return lambda: extractColumn.extractColumnData(raw, column="credits.crew", columnName="directors",
+                                                   columnKey="job", columnValue="Director")
+
+
+@benchmark("cleaning", "extractColumn:extractData")
+def extractDirectorsPerValue(data):
+    values = data.raw["credits.crew"].tolist()
+    return lambda: [extractColumn.extractData(value, "job", "Director", ", ") for value in values]
+
+
+@benchmark("cleaning", "getColumnSize:getColumnSize")
+def castSize(data):
+    raw = data.raw.copy()
+    return lambda: getColumnSize.getColumnSize(raw, column="credits.cast", columnName="cast_size")
+
+
+@benchmark("cleaning", "getColumnSize:convertCastData")
+def castSizePerValue(data):
+    values = data.raw["credits.cast"].tolist()
+    return lambda: [getColumnSize.convertCastData(value) for value in values]
+
+
+@benchmark("cleaning", "normalizeTables:buildMovieTables", "normalizeTables:explodeNestedColumn")
+def buildMovieTables(data):
+    raw = data.raw.copy()
+    return lambda: normalizeTables.buildMovieTables(raw)
+
+
+@benchmark("cleaning", "normalizeTables:moviesWith", "normalizeTables:filterMovies")
+def filterMoviesByPerson(data):
+    tables, clean = data.tables, data.clean
+    director = tables["movie_crew"]["name"].iloc[0]
+
+    return lambda: normalizeTables.filterMovies(clean, normalizeTables.moviesWith(
+        tables["movie_genre"], name=["Action", "Drama"]).intersection(
+        normalizeTables.moviesWith(tables["movie_crew"], name=director, job="Director")))
+
+
+@benchmark("cleaning", "optimizeDataTypes:optimizeDataTypes", "optimizeDataTypes:planDataTypes",
+           "optimizeDataTypes:applyDataTypes")
+def optimizeTypes(data):
+    clean = data.clean.copy()
+    return lambda: optimizeDataTypes.optimizeDataTypes(clean)
+
+
+@benchmark("cleaning", "optimizeDataTypes:memoryReport")
+def memoryReport(data):
+    clean = data.clean
+    optimized = optimizeDataTypes.optimizeDataTypes(clean.copy())
+    return lambda: optimizeDataTypes.memoryReport(clean, optimized)
+
+
+@benchmark("cleaning", "parseNested:decodeNestedColumn")
+def decodeCrew(data):
+    crew = data.raw["credits.crew"]
+    return lambda: parseNested.decodeNestedColumn(crew, "credits.crew")
+
+
+@benchmark("cleaning", "parseNested:parseNestedStrings")
+def parseCrewStrings(data):
+    values = data.raw["credits.crew"].tolist()
+    return lambda: parseNested.parseNestedStrings(values)
+
+
+@benchmark("cleaning", "parseNested:parseNestedValue")
+def parseCrewPerValue(data):
+    values = data.raw["credits.crew"].tolist()
+    return lambda: [parseNested.parseNestedValue(value) for value in values]
+
+
+@benchmark("cleaning", "reOrderColumns:reOrderColumns")
+def reOrderAllColumns(data):
+    clean = data.clean.copy()
+    return lambda: reOrderColumns.reOrderColumns(clean, columns=list(clean.columns[::-1]))
+
+
+@benchmark("cleaning", "removeColumn:removeColumn")
+def removeColumns(data):
+    raw = data.raw.copy()
+    return lambda: removeColumn.removeColumn(raw, columns=chunkedPipeline.DEFAULT_STEPS[0][1]["columns"])
+
+
+@benchmark("cleaning", "separateArray:separateArray", "separateArray:joinKeyColumn")
+def separateArrays(data):
+    raw = data.raw.copy()
+    return lambda: separateArray.separateArray(raw, columns=chunkedPipeline.DEFAULT_STEPS[1][1]["columns"])
+
+
+@benchmark("cleaning", "separateArray:extract_key", "separateArray:joinKey")
+def separateArrayPerValue(data):
+    values = data.raw["production_companies"].tolist()
+    return lambda: [separateArray.extract_key(value, "name", " | ") for value in values]
+
+
+# KPI analysis
+
+@benchmark("kpi", "kpiAnalysis:rankColumn")
+def rankByRevenue(data):
+    kpis = data.kpis.copy()
+    return lambda: kpiAnalysis.rankColumn(kpis, column="revenue_musd", order="desc")
+
+
+@benchmark("kpi", "kpiAnalysis:topK")
+def topRevenue(data):
+    return lambda: kpiAnalysis.topK(data.kpis, columns=["revenue_musd", "vote_count"], k=10)
+
+
+@benchmark("kpi", "kpiAnalysis:bottomK")
+def bottomProfit(data):
+    return lambda: kpiAnalysis.bottomK(data.kpis, columns="profit", k=10)
+
+
+@benchmark("kpi", "kpiAnalysis:calculateProfit")
+def profit(data):
+    clean = data.clean.copy()
+    return lambda: kpiAnalysis.calculateProfit(clean, revenueColumn="revenue_musd", budgetColumn="budget_musd")
+
+
+@benchmark("kpi", "kpiAnalysis:calculateROI")
+def roi(data):
+    clean = data.kpis.drop(columns="ROI")
+    return lambda: kpiAnalysis.calculateROI(clean, revenueColumn="revenue_musd", budgetColumn="budget_musd")
+
+
+@benchmark("kpi", "kpiAnalysis:calculateCentralTendency")
+def medianRevenueByCollection(data):
+    groups = data.kpis.groupby(data.kpis["belongs_to_collection.id"].notna())
+    return lambda: kpiAnalysis.calculateCentralTendency(groups, column="revenue_musd", measure="median")
+
+
+@benchmark("kpi", "kpiAnalysis:calculateCentralTendency")
+def approximateMedianRevenue(data):
+    return lambda: kpiAnalysis.calculateCentralTendency(data.kpis, column="revenue_musd", measure="median",
+                                                        approximate=True)
+
+
+@benchmark("kpi", "kpiAnalysis:dataExist")
+def keywordScan(data):
+    return lambda: kpiAnalysis.dataExist(data.raw, keyword="Smith")
+
+
+@benchmark("kpi", "kpiAnalysis:dataExist", "searchIndex:SearchIndex.search")
+def keywordLookup(data):
+    index = searchIndex.SearchIndex(data.raw)
+    return lambda: kpiAnalysis.dataExist(data.raw, keyword="Smith", index=index)
+
+
+@benchmark("kpi", "searchIndex:SearchIndex.add")
+def buildSearchIndex(data):
+    return lambda: searchIndex.SearchIndex(data.raw)
+
+
+@benchmark("kpi", "searchIndex:SearchIndex.search", "searchIndex:SearchIndex.columnsContaining",
+           "searchIndex:SearchIndex.rowsContaining")
+def searchKeywords(data):
+    index = searchIndex.SearchIndex(data.raw)
+
+    def run():
+        index.search("ark", mode="substring")
+        index.search("Sha", mode="prefix", caseSensitive=False)
+        index.columnsContaining("Kingdom")
+        index.rowsContaining("Smith")
+
+    return run
+
+
+@benchmark("kpi", "searchIndex:SearchIndex.remove")
+def removeFromSearchIndex(data):
+    index = searchIndex.SearchIndex(data.raw)
+    return lambda: index.remove(data.raw.index[::10])
+
+
+@benchmark("kpi", "aggregationCube:buildAggregationCube")
+def buildCube(data):
+    return lambda: aggregationCube.buildAggregationCube(data.kpis)
+
+
+@benchmark("kpi", "aggregationCube:getAggregationCube")
+def cachedCube(data):
+    aggregationCube.getAggregationCube(data.kpis)
+    return lambda: aggregationCube.getAggregationCube(data.kpis)
+
+
+@benchmark("kpi", "aggregationCube:AggregationCube.slice")
+def sliceCube(data):
+    cube = aggregationCube.buildAggregationCube(data.kpis)
+    return lambda: [cube.slice(dimension, measures=["revenue_musd", "ROI"]) for dimension in cube.dimensions]
+
+
+@benchmark("kpi", "incrementalKPI:groupKeys")
+def directorAndGenreKeys(data):
+    return lambda: [incrementalKPI.groupKeys(data.kpis, grouping) for grouping in incrementalKPI.GROUPINGS]
+
+
+@benchmark("kpi", "incrementalKPI:measureColumns")
+def measures(data):
+    return lambda: incrementalKPI.measureColumns(data.clean)
+
+
+@benchmark("kpi", "incrementalKPI:KPIState.update")
+def updateKPIs(data):
+    state = incrementalKPI.KPIState()
+    return lambda: state.update(data.clean)
+
+
+@benchmark("kpi", "incrementalKPI:KPIState.summary", "incrementalKPI:KPIState.quantile")
+def readKPIs(data):
+    state = incrementalKPI.KPIState()
+    state.update(data.clean)
+
+    def run():
+        for grouping in state.groupings:
+            state.summary(grouping, "revenue_musd")
+
+        state.quantile("collection", "Franchise", "revenue_musd", 0.9)
+
+    return run
+
+
+@benchmark("kpi", "incrementalKPI:KPIState.save", "incrementalKPI:KPIState.load", "incrementalKPI:updateKPIState",
+           "incrementalKPI:moviesPath")
+def saveAndLoadKPIs(data):
+    path = data.path("kpiState.json")
+    if os.path.exists(path):
+        os.remove(path)
+
+    batches = _split(data.clean, 2)
+
+    def run():
+        for batch in batches:
+            incrementalKPI.updateKPIState(path, batch).close()
+
+    return run
+
+
+@benchmark("kpi", "incrementalKPI:SeenMovies.seen", "incrementalKPI:SeenMovies.add",
+           "incrementalKPI:SeenMovies.rollback", "incrementalKPI:SeenMovies.copy")
+def seenMovies(data):
+    path, copyPath = data.path("seenMovies.sqlite"), data.path("seenMoviesCopy.sqlite")
+    if os.path.exists(path):
+        os.remove(path)
+
+    # Half of the movies were counted before, the other half is the new batch
+    counted, batch = [ids["id"].tolist() for ids in _split(data.clean, 2)]
+    movies = incrementalKPI.SeenMovies(path)
+    movies.add(counted, 1)
+
+    def run():
+        seen = movies.seen(counted + batch)
+        movies.add(batch, 2)
+        movies.rollback(1)
+        movies.copy(copyPath).close()
+
+        return seen
+
+    return run
+
+
+@benchmark("kpi", "sketches:QuantileSketch.add", "sketches:QuantileSketch.merge",
+           "sketches:QuantileSketch.quantile", "sketches:QuantileSketch.median", "sketches:QuantileSketch.toDict",
+           "sketches:QuantileSketch.fromDict", "sketches:newSketch")
+def quantileSketches(data):
+    values = np.array_split(data.kpis["revenue_musd"].to_numpy(dtype=float), 4)
+
+    def run():
+        merged = sketches.newSketch("median")
+        for part in values:
+            sketch = sketches.newSketch("median")
+            sketch.add(part)
+            merged.merge(sketches.QuantileSketch.fromDict(sketch.toDict()))
+
+        return merged.median(), merged.quantile(0.99)
+
+    return run
+
+
+@benchmark("kpi", "sketches:FrequentItems.add", "sketches:FrequentItems.merge", "sketches:FrequentItems.mostFrequent",
+           "sketches:FrequentItems.mode", "sketches:FrequentItems.toDict", "sketches:FrequentItems.fromDict")
+def frequentItems(data):
+    values = np.array_split(data.kpis["runtime"].to_numpy(), 4)
+
+    def run():
+        merged = sketches.newSketch("mode")
+        for part in values:
+            sketch = sketches.newSketch("mode")
+            sketch.add(part)
+            merged.merge(sketches.FrequentItems.fromDict(sketch.toDict()))
+
+        return merged.mode(), merged.mostFrequent(5)
+
+    return run
+
+
+@benchmark("kpi", "sketches:sketchChunks")
+def sketchChunks(data):
+    chunks = _split(data.kpis[["revenue_musd", "genres"]], 10)
+    return lambda: sketches.sketchChunks(chunks, column="revenue_musd", measure="median", by="genres")
+
+
+@benchmark("kpi", "sortIndex:SortedIndex.order", "sortIndex:sortedIndexFor")
+def buildSortedIndex(data):
+    kpis = data.kpis.copy()
+
+    def run():
+        index = sortIndex.SortedIndex(kpis)
+        for column in ("revenue_musd", "profit", "ROI", "vote_average"):
+            index.order(column)
+
+        return sortIndex.sortedIndexFor(kpis)
+
+    return run
+
+
+@benchmark("kpi", "sortIndex:SortedIndex.rank", "sortIndex:SortedIndex.filter", "sortIndex:SortedIndex.between",
+           "sortIndex:SortedIndex.percentile", "sortIndex:SortedIndex.percentileRank")
+def querySortedIndex(data):
+    index = sortIndex.SortedIndex(data.kpis)
+    for column in ("revenue_musd", "ROI", "vote_average"):
+        index.order(column)
+
+    def run():
+        index.rank("revenue_musd", k=10)
+        index.filter("ROI", ">", 10)
+        index.between("vote_average", 6, 8)
+        index.percentile("revenue_musd", [0.5, 0.9, 0.99])
+        index.percentileRank("revenue_musd", 100)
+
+    return run
+
+
+# Extraction
+
+@benchmark("extraction", "Data_Extraction.extractData:extractDataFromAPI")
+def extractFromStubServer(data):
+    from Config.config import create_retry
+    from Data_Extraction.extractData import extractDataFromAPI
+
+    session = create_retry(pool_maxsize=data.workers * 4)
+
+    return lambda: extractDataFromAPI(session=session, url=data.url, API_KEY="stub",
+                                      movie_ids=list(range(1, data.extractRows + 1)),
+                                      output_path=data.path("extracted.csv"), max_workers=data.workers * 4)
+
+
+#Defines a function that lists the public functions and methods of the covered packages
+def publicFunctions(packages: tuple = COVERED_PACKAGES) -> list:
+    names = []
+
+    for package in packages:
+        directory = os.path.join(project_root, *package.split("."))
+
+        for fileName in sorted(os.listdir(directory)):
+            if not fileName.endswith(".py") or fileName.startswith("_"):
+                continue
+
+            module = importlib.import_module(f"{package}.{fileName[:-3]}")
+
+            for name, value in vars(module).items():
+                if name.startswith("_") or name == "main" or getattr(value, "__module__", None) != module.__name__:
+                    continue
+
+                if inspect.isfunction(value):
+                    names.append(f"{module.__name__}:{name}")
+                elif inspect.isclass(value):
+                    names.extend(f"{module.__name__}:{name}.{method}" for method, member in vars(value).items()
+                                 if not method.startswith("_") and
+                                 (inspect.isfunction(member) or isinstance(member, (classmethod, staticmethod))))
+
+    return names
+
+
+#Defines a function that returns the public functions no benchmark covers
+def uncovered(packages: tuple = COVERED_PACKAGES) -> list:
+    covered = set(NOT_BENCHMARKED)
+
+    for group, _, covers in BENCHMARKS.values():
+        for name in covers:
+            module = name.split(":")[0]
+            covered.add(name if "." in module else f"{_package(module, packages)}.{name}")
+
+    return [name for name in publicFunctions(packages) if name not in covered]
+
+
+def _package(module: str, packages: tuple) -> str:
+    for package in packages:
+        if os.path.exists(os.path.join(project_root, *package.split("."), f"{module}.py")):
+            return package
+
+    return ""
+
+
+#Defines a function that times a benchmark
+def timeBenchmark(function, data: BenchmarkData, repeat: int = 3) -> list:
+    """
+    Runs the setup of a benchmark and times the call it returns, repeat times with a fresh setup
+    each time. The parse cache is cleared and garbage collected before each call so repeats do
+    not time cached results
+
+    Returns
+    -------
+    list
+        The seconds of each repeat
+    """
+    times = []
+
+    for _ in range(repeat):
+        run = function(data)
+        parseNested.clearNestedCache()
+        gc.collect()
+
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    return times
+
+
+#Defines a function that describes the code and machine a run is made on
+def runInfo() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=project_root, capture_output=True, text=True,
+                                  timeout=30).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+
+    return {
+        "run": datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ"),
+        "commit": git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "machine": f"{platform.node()} {platform.machine()} {os.cpu_count()} cpus",
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__
+    }
+
+
+#Defines a function that runs the benchmarks
+def runBenchmarks(names: list, sizes: list, repeat: int = 3, seed: int = 0, extractRows: int = 1000,
+                  workers: int = 2) -> list:
+    """
+    Times every named benchmark on synthetic movies of every size
+
+    Parameters
+    ----------
+    names   :   list
+            Benchmarks from BENCHMARKS
+
+    sizes   :   list
+            Numbers of synthetic movies
+
+    repeat  :   int
+            Timed calls per benchmark, the median is kept
+
+    seed    :   int
+            The seed of the synthetic movies
+
+    extractRows :   int
+                The largest number of movies extracted from the stub server
+
+    workers :   int
+            Processes of the parallel cleaning, the extraction uses 4 threads per worker
+
+    Returns
+    -------
+    list
+        One record per benchmark and size, with the run information
+    """
+    info = runInfo()
+    records = []
+
+    # Instrumentation would time itself into every function
+    setInstrumentation(False)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            data = BenchmarkData(rows, seed, tmp, min(rows, extractRows), workers)
+
+            try:
+                for name in names:
+                    group, function, _ = BENCHMARKS[name]
+                    times = timeBenchmark(function, data, repeat)
+
+                    records.append({**info, "benchmark": name, "group": group, "rows": rows, "repeat": repeat,
+                                    "median": statistics.median(times), "min": min(times), "max": max(times)})
+                    print(f"{name:<28} {rows:>9} rows | median {records[-1]['median']:9.4f}s | "
+                          f"min {records[-1]['min']:9.4f}s")
+            finally:
+                data.close()
+
+    setInstrumentation(True)
+
+    return records
+
+
+#Defines a function that reads the results of previous runs
+def loadHistory(path: str = HISTORY_PATH) -> list:
+    if not os.path.exists(path):
+        return []
+
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+#Defines a function that appends the results of a run to the history
+def saveHistory(records: list, path: str = HISTORY_PATH) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with open(path, "a", encoding="utf-8") as file:
+        for record in records:
+            file.write(json.dumps(record) + "\n")
+
+
+#Defines a function that compares a run with the previous run of each benchmark
+def compareRuns(records: list, history: list, threshold: float = 1.2, noise: float = 0.001) -> pd.DataFrame:
+    """
+    Compares the median of every benchmark with the latest earlier run of the same benchmark and
+    size on the same machine
+
+    Parameters
+    ----------
+    records :   list
+            The results of the run
+
+    history :   list
+            The results of the earlier runs
+
+    threshold   :   float
+                The ratio of the medians above which a benchmark counts as a regression, and
+                below whose inverse it counts as an improvement
+
+    noise   :   float
+            Differences under this many seconds are ignored
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per benchmark and size with the previous and current medians, their ratio and
+        the status
+    """
+    # The history is in run order, so the latest run of each benchmark is kept
+    previous = {(record["machine"], record["benchmark"], record["rows"]): record for record in history}
+
+    rows = []
+    for record in records:
+        before = previous.get((record["machine"], record["benchmark"], record["rows"]))
+        ratio = record["median"] / before["median"] if before and before["median"] else np.nan
+
+        status = "new"
+        if before:
+            status = "same"
+            if abs(record["median"] - before["median"]) > noise:
+                status = "regression" if ratio > threshold else "improvement" if ratio < 1 / threshold else "same"
+
+        rows.append({"benchmark": record["benchmark"], "rows": record["rows"],
+                     "previous": before["median"] if before else np.nan, "previous_commit": before["commit"]
+                     if before else None, "median": record["median"], "ratio": ratio, "status": status})
+
+    return pd.DataFrame(rows)
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Times the cleaning, KPI and extraction functions on synthetic "
+                                                 "TMDB movies and compares the run with the previous one")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000])
+    parser.add_argument("--bench", default=".", help="Regular expression selecting the benchmarks or groups")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--extract-rows", type=int, default=1000, help="Most movies extracted from the stub server")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--history", default=HISTORY_PATH, help="JSON Lines file the results are appended to")
+    parser.add_argument("--no-save", action="store_true", help="Compare without appending to the history")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Slowdown ratio reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--list", action="store_true", help="Print the benchmarks and exit")
+    parser.add_argument("--coverage", action="store_true",
+                        help="Print the public functions without a benchmark and exit")
+    args = parser.parse_args(argv)
+
+    missing = uncovered()
+
+    if args.coverage:
+        print("\n".join(missing) or "Every public function has a benchmark")
+        sys.exit(1 if missing else 0)
+
+    names = [name for name, (group, _, _) in BENCHMARKS.items()
+             if re.search(args.bench, name) or re.search(args.bench, group)]
+
+    if args.list:
+        for name in names:
+            print(f"{BENCHMARKS[name][0]:<11} {name}")
+        return
+
+    if missing:
+        print(f"Public functions without a benchmark: {missing}")
+
+    records = runBenchmarks(names, args.rows, args.repeat, args.seed, args.extract_rows, args.workers)
+    comparison = compareRuns(records, loadHistory(args.history), args.threshold)
+
+    with pd.option_context("display.max_rows", None, "display.max_columns", None, "display.width", 200):
+        print(comparison)
+
+    if not args.no_save:
+        saveHistory(records, args.history)
+        print(f"Appended {len(records)} results to {args.history}")
+
+    if args.fail_on_regression and (comparison["status"] == "regression").any():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
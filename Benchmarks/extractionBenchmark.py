@@ -0,0 +1,91 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+import pandas as pd
+
+from Benchmarks.stubServer import startStubServer, syntheticMovie
+from Config.config import create_retry
+from Data_Extraction.batchWriter import CSVBatchWriter
+from Data_Extraction.extractData import extractDataFromAPI
+
+
+#Defines a function that builds the CSV the way the extractor used to, by growing a DataFrame
+def concatWriter(records, output_path: str) -> None:
+    df = pd.DataFrame()
+
+    for record in records:
+        df = pd.concat([df, pd.json_normalize(record)], ignore_index=True)
+
+    df.to_csv(output_path, index=False)
+
+
+#Defines a function that streams the records with the batch writer
+def batchWriter(records, output_path: str, batch_size: int = 1000) -> None:
+    with CSVBatchWriter(output_path, batch_size=batch_size) as writer:
+        for record in records:
+            writer.add(record)
+
+
+#Defines a function that times a writer and measures its peak Python memory
+def measure(writer, size: int, output_path: str) -> tuple:
+    records = (syntheticMovie(movie_id) for movie_id in range(1, size + 1))
+
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    writer(records, output_path)
+
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed, peak / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares the concat and the batch CSV writers")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--concat-max", type=int, default=10000,
+                        help="Largest size to run the quadratic concat writer on")
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+
+        print("WRITERS (synthetic responses, no network)")
+        for size in args.sizes:
+            batch_path = os.path.join(tmp, "batch.csv")
+            elapsed, peak = measure(batchWriter, size, batch_path)
+            print(f"{size:>8} movies | batch  | {elapsed:8.2f}s | peak {peak:8.1f} MiB")
+
+            if size <= args.concat_max:
+                concat_path = os.path.join(tmp, "concat.csv")
+                elapsed, peak = measure(concatWriter, size, concat_path)
+
+                with open(batch_path, "rb") as a, open(concat_path, "rb") as b:
+                    same = a.read() == b.read()
+
+                print(f"{size:>8} movies | concat | {elapsed:8.2f}s | peak {peak:8.1f} MiB | "
+                      f"identical CSV: {same}")
+
+        print("\nEXTRACTION (local stub server)")
+        server, url = startStubServer()
+
+        for size in args.sizes:
+            extractDataFromAPI(session=create_retry(pool_maxsize=args.workers), url=url, API_KEY="stub",
+                               movie_ids=list(range(1, size + 1)),
+                               output_path=os.path.join(tmp, "extracted.csv"),
+                               max_workers=args.workers)
+
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# The module every budget is measured against, so budgets hold on slower or faster machines
+BASELINE = "pandas"
+
+# Entry point -> (module, budget as a multiple of the import time of BASELINE, modules it must not import,
+# modules imported before it and not counted in its time)
+# The entry points working on DataFrames cannot import faster than pandas, so only the time their own
+# modules add to an interpreter that already imported pandas is budgeted, close to the measured time
+IMPORT_BUDGETS = {
+    "packages": ("Data_Cleaning, Data_Analysis.KPI_Analysis, Data_Analysis.Data_Visualization, "
+                 "Data_Extraction, Data_Storage, Pipeline", 0.05, ("pandas", "matplotlib", "requests"), ""),
+    "config": ("Config.config", 0.05, ("pandas", "matplotlib", "requests", "dotenv"), ""),
+    "kpi": ("Data_Analysis.KPI_Analysis.kpiAnalysis", 0.015, ("matplotlib", "requests"), BASELINE),
+    "cube": ("Data_Analysis.KPI_Analysis.aggregationCube", 0.02, ("matplotlib", "requests"), BASELINE),
+    "cleaning": ("Data_Cleaning.chunkedPipeline", 0.02, ("matplotlib", "requests"), BASELINE),
+    "visualization": ("Data_Analysis.Data_Visualization.dataVisualization", 0.02, ("matplotlib", "requests"),
+                      BASELINE),
+    "charts": ("Data_Analysis.Data_Visualization.renderCharts", 0.06, ("matplotlib", "requests"), BASELINE),
+    "pipeline": ("Pipeline.moviePipeline", 0.07, ("matplotlib", "requests"), BASELINE),
+    "extraction": ("Data_Extraction.extractData", 0.5, ("pandas", "matplotlib"), "")
+}
+
+# A line of -X importtime: "import time: self [us] | cumulative | imported package"
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+START = "-- imports"
+
+
+#Defines a function that measures the import of modules in a new interpreter
+def importTime(modules: str, preload: str = "") -> tuple:
+    """
+    Imports comma separated modules in a new interpreter with -X importtime
+
+    Parameters
+    ----------
+    modules :   str
+            The comma separated modules to measure
+
+    preload :   str
+            Comma separated modules imported first, whose time is not counted
+
+    Returns
+    -------
+    tuple
+        The seconds spent importing the modules and the set of every module they imported
+    """
+    statement = "; ".join([f"import {module.strip()}" for module in preload.split(",") if module.strip()] +
+                          [f"import sys; sys.stderr.write('{START}\\n')"] +
+                          [f"import {module.strip()}" for module in modules.split(",")])
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [project_root,
+                                                                            os.environ.get("PYTHONPATH")])))
+
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], cwd=project_root,
+                             env=environment, capture_output=True, text=True)
+
+    if process.returncode != 0:
+        raise RuntimeError(f"Importing {modules} failed:\n{process.stderr}")
+
+    # The interpreter's own startup imports and the preloaded modules are written before the marker
+    lines = process.stderr.split(START + "\n", 1)[1].splitlines()
+
+    seconds, imported = 0, set()
+    for line in lines:
+        match = IMPORT_LINE.match(line)
+        if match is None:
+            continue
+
+        imported.add(match.group(4))
+
+        # Modules imported directly by the statement are not indented, the others are counted in them
+        if match.group(3) == " ":
+            seconds += int(match.group(2)) / 1e6
+
+    return seconds, imported
+
+
+#Defines a function that checks the import time of every entry point against its budget
+def checkImportTimes(budgets: dict = IMPORT_BUDGETS, repeat: int = 5) -> list:
+    """
+    Measures the import time of each entry point and of BASELINE, keeping the fastest of repeat
+    imports, and compares them
+
+    Parameters
+    ----------
+    budgets :   dict
+            Entry points, as key value pairs of name and (modules, budget, forbidden modules, preloaded
+            modules)
+
+    repeat  :   int
+            The number of times each import is measured
+
+    Returns
+    -------
+    list
+        A dict per entry point with its time, budget, the forbidden modules it imported and whether
+        it passed
+    """
+    # A first import compiles the modules to bytecode, which later runs would not pay for
+    for modules, _, _, preload in budgets.values():
+        importTime(modules, preload)
+
+    baseline = min(importTime(BASELINE)[0] for _ in range(repeat))
+    results = []
+
+    for name, (modules, budget, forbidden, preload) in budgets.items():
+        measured = [importTime(modules, preload) for _ in range(repeat)]
+        seconds = min(seconds for seconds, _ in measured)
+        imported = set.union(*(imported for _, imported in measured))
+
+        loaded = [module for module in forbidden
+                  if any(found == module or found.startswith(module + ".") for found in imported)]
+
+        results.append({"entry": name, "modules": modules, "preload": preload, "seconds": seconds,
+                        "budget": budget * baseline,
+                        "forbidden": loaded, "passed": seconds <= budget * baseline and not loaded})
+
+    return results
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Checks the import time of the entry points with -X importtime "
+                                                 f"against budgets relative to importing {BASELINE}")
+    parser.add_argument("--entries", nargs="+", default=list(IMPORT_BUDGETS), choices=list(IMPORT_BUDGETS))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    results = checkImportTimes({name: IMPORT_BUDGETS[name] for name in args.entries}, args.repeat)
+
+    for result in results:
+        print(f"{result['entry']:<14} {result['seconds'] * 1000:8.1f} ms | budget {result['budget'] * 1000:8.1f} ms | "
+              f"{'ok' if result['passed'] else 'FAILED'}"
+              f"{' (after ' + result['preload'] + ')' if result['preload'] else ''}"
+              f"{' (imports ' + ', '.join(result['forbidden']) + ')' if result['forbidden'] else ''}")
+
+    sys.exit(0 if all(result["passed"] for result in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from Data_Cleaning.parseNested import parseNestedStrings, parseNestedValue
+
+
+# Pieces of strings that the repr to JSON conversion must leave alone
+PIECES = ["': None", "': True", "': False", " ': True", "None", "True", "False", "null", "true", "false", "NaN",
+          "Infinity", "'", '"', "\\", "\\n", "\n", "\t", "\0", ": ", ", ", "[", "]", "{", "}", "O'Brien", 'say "hi"',
+          "é", "日本語", "😀", " ", "a", "Story"]
+
+# Edits of a repr that make cells JSON and Python may read differently
+MUTATIONS = [(": None", ": null"), ("'", '"'), (", ", ","), ("True", "true"), ("[", "[["), ("]", ""), ("'", "u'"),
+             ("'", "\\'"), (": ", ": NaN, 'x': "), ("}", "},")]
+
+
+#Defines a function that builds a random string from adversarial pieces
+def adversarialString(rng: random.Random) -> str:
+    return "".join(rng.choice(PIECES) for _ in range(rng.randint(0, 4)))
+
+
+#Defines a function that builds a random nested value as found in the nested columns
+def adversarialValue(rng: random.Random, depth: int = 0):
+    kind = rng.random()
+
+    if depth > 1 or kind < 0.3:
+        return rng.choice([adversarialString(rng), None, True, False, rng.randint(-5, 5), rng.random(),
+                           float("nan")])
+
+    if kind < 0.8:
+        return {adversarialString(rng): adversarialValue(rng, depth + 1) for _ in range(rng.randint(0, 3))}
+
+    return [adversarialValue(rng, depth + 1) for _ in range(rng.randint(0, 3))]
+
+
+#Defines a function that builds cells of lists, some of them edited into malformed or ambiguous text
+def adversarialCells(count: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    cells = []
+
+    for _ in range(count):
+        cell = repr([adversarialValue(rng) for _ in range(rng.randint(0, 3))])
+
+        if rng.random() < 0.2:
+            old, new = rng.choice(MUTATIONS)
+            cell = cell.replace(old, new, 1)
+
+        cells.append(cell)
+
+    return cells
+
+
+#Defines a function that returns the cells parseNestedStrings reads differently from parseNestedValue
+def mismatches(cells: list, batchSize: int = 1000) -> list:
+    expected = [parseNestedValue(cell) for cell in cells]
+    parsed = parseNestedStrings(cells, batchSize)
+
+    # repr tells NaN, -0.0 and 0 from each other where == would not
+    return [(cell, wanted, got) for cell, wanted, got in zip(cells, expected, parsed) if repr(wanted) != repr(got)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Checks that parseNestedStrings reads adversarial cells exactly "
+                                                 "as parseNestedValue (ast.literal_eval) does")
+    parser.add_argument("--cells", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    cells = adversarialCells(args.cells, args.seed)
+
+    # Small batches also run the cell by cell fallback of the batches with a malformed cell
+    failed = {}
+    for batchSize in (1, 7, 1000):
+        start = time.perf_counter()
+        found = mismatches(cells, batchSize)
+        print(f"{len(cells)} cells | batch size {batchSize:>5} | {len(found)} mismatches | "
+              f"{time.perf_counter() - start:6.2f}s")
+        failed.update((cell, (expected, parsed)) for cell, expected, parsed in found)
+
+    for cell, (expected, parsed) in list(failed.items())[:10]:
+        print(f"{cell!r}\n    parseNestedValue: {expected!r}\n    parseNestedStrings: {parsed!r}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
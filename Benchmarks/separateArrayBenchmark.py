@@ -0,0 +1,74 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+import pandas as pd
+
+from Data_Cleaning.parseNested import clearNestedCache
+from Data_Cleaning.separateArray import extract_key, separateArray
+
+
+GENRES = ["Action", "Adventure", "Animation", "Comedy", "Crime", "Drama", "Family", "Fantasy",
+          "Horror", "Science Fiction", "Thriller", "War"]
+
+COMPANIES = ["Marvel Studios", "Lucasfilm Ltd.", "Pixar", "Legendary Pictures", "Warner Bros. Pictures",
+             "Universal Pictures", "Columbia Pictures", "Walt Disney Pictures"]
+
+
+#Defines a function that builds a frame of nested columns stored as repr strings, as in the CSV
+def syntheticFrame(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = random.Random(seed)
+
+    def cell(names):
+        if rng.random() < 0.02:
+            return float("nan")
+
+        return repr([{"id": rng.randint(1, 10000), "name": name}
+                     for name in rng.sample(names, rng.randint(0, 4))])
+
+    return pd.DataFrame({
+        "genres": [cell(GENRES) for _ in range(rows)],
+        "production_companies": [cell(COMPANIES) for _ in range(rows)]
+    })
+
+
+#Defines a function that runs the per row apply separateArray used before
+def applyPerRow(data: pd.DataFrame, columns: dict, separator: str = " | ") -> pd.DataFrame:
+    for col, key in columns.items():
+        data[col] = data[col].apply(lambda value: extract_key(value, key, separator))
+
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares the per row and vectorized separateArray")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+
+    columns = {"genres": "name", "production_companies": "name"}
+
+    for rows in args.rows:
+        data = syntheticFrame(rows)
+
+        start = time.perf_counter()
+        expected = applyPerRow(data.copy(), columns)
+        per_row = time.perf_counter() - start
+
+        clearNestedCache()
+        start = time.perf_counter()
+        result = separateArray(data.copy(), columns)
+        vectorized = time.perf_counter() - start
+
+        pd.testing.assert_frame_equal(expected, result)
+
+        print(f"{rows:>8} rows | per row apply {per_row:7.2f}s | vectorized {vectorized:7.2f}s | "
+              f"speedup {per_row / vectorized:5.1f}x | identical output")
+
+
+if __name__ == "__main__":
+    main()
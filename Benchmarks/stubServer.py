@@ -0,0 +1,171 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+#Defines a function that builds a TMDB shaped movie for the stub server
+def syntheticMovie(movie_id: int) -> dict:
+    """
+    Builds a movie shaped like the TMDB movie details response with credits appended
+
+    Parameters
+    ----------
+    movie_id    :   int
+                The ID of the movie. The same ID always produces the same movie
+
+    Returns
+    -------
+    dict
+        The movie details
+    """
+    rng = random.Random(movie_id)
+
+    genres = [{"id": 28, "name": "Action"}, {"id": 12, "name": "Adventure"},
+              {"id": 878, "name": "Science Fiction"}, {"id": 18, "name": "Drama"}]
+
+    return {
+        "adult": False,
+        "budget": rng.randint(1, 300) * 1000000,
+        "genres": rng.sample(genres, rng.randint(1, len(genres))),
+        "id": movie_id,
+        "original_language": "en",
+        "overview": f"Overview of movie {movie_id}",
+        "popularity": round(rng.uniform(1, 100), 4),
+        "release_date": f"{rng.randint(1990, 2024)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+        "revenue": rng.randint(1, 3000) * 1000000,
+        "runtime": rng.randint(80, 200),
+        "title": f"Movie {movie_id}",
+        "vote_average": round(rng.uniform(1, 10), 3),
+        "vote_count": rng.randint(0, 30000),
+        "belongs_to_collection": (
+            {"id": movie_id * 10, "name": f"Collection {movie_id}"} if rng.random() < 0.3 else None
+        ),
+        "credits": {
+            "cast": [{"id": i, "name": f"Actor {i}", "character": f"Character {i}"}
+                     for i in range(rng.randint(5, 40))],
+            "crew": [{"id": i, "name": f"Crew {i}", "job": "Director" if i == 0 else "Editor"}
+                     for i in range(rng.randint(5, 60))]
+        }
+    }
+
+
+#Defines a function that starts a local server answering like the TMDB movie endpoint
+def startStubServer(port: int = 0, latency: float = 0.0, missingIds: tuple = (0,),
+                    rateLimit: int = None) -> tuple:
+    """
+    Starts a local HTTP server in a background thread that answers GET /movie/<id> like the TMDB API
+
+    Parameters
+    ----------
+    port    :   int
+            The port to listen on. 0 picks a free port
+
+    latency :   float
+            Seconds each request waits before answering, to simulate the network
+
+    missingIds  :   tuple
+                Movie IDs answered with a 404
+
+    rateLimit   :   int
+                Requests allowed per second. Requests above it are answered with a 429 and a
+                Retry-After header
+
+    Returns
+    -------
+    tuple
+        The running server and the movie URL to pass to extractDataFromAPI. Call
+        server.shutdown() to stop it
+    """
+    missing = set(missingIds)
+    window = {"second": 0, "count": 0, "throttled": 0}
+    lock = threading.Lock()
+
+    def throttled() -> bool:
+        if rateLimit is None:
+            return False
+
+        with lock:
+            second = int(time.time())
+            if second != window["second"]:
+                window["second"], window["count"] = second, 0
+
+            window["count"] += 1
+            window["throttled"] += window["count"] > rateLimit
+
+            return window["count"] > rateLimit
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+
+            if throttled():
+                self.send_response(429)
+                self.send_header("Retry-After", "1")
+                self.end_headers()
+                return
+
+            movie_id = self.path.split("?")[0].rstrip("/").split("/")[-1]
+
+            if not movie_id.isdigit() or int(movie_id) in missing:
+                self.send_response(404)
+                self.end_headers()
+                return
+
+            body = json.dumps(syntheticMovie(int(movie_id))).encode()
+            etag = f'"{hashlib.md5(body).hexdigest()}"'
+
+            # Answer revalidation requests like TMDB does
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Keep the benchmark output clean
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    server.window = window
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server, f"http://127.0.0.1:{server.server_address[1]}/movie"
+
+
+def main():
+    import os
+    import sys
+    import tempfile
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.append(project_root)
+
+    from Config.config import create_retry
+    from Data_Extraction.extractData import extractDataFromAPI
+
+    server, url = startStubServer(latency=0.02)
+    movie_ids = list(range(200))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in (1, 16):
+            extractDataFromAPI(session=create_retry(pool_maxsize=workers), url=url, API_KEY="stub",
+                               movie_ids=movie_ids, output_path=os.path.join(tmp, f"movies_{workers}.csv"),
+                               max_workers=workers)
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
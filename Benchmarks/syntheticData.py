@@ -0,0 +1,331 @@
+import argparse
+import os
+import sys
+from functools import lru_cache
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+import numpy as np
+import pandas as pd
+
+
+# The columns of data/movieData.csv, in the same order
+COLUMNS = ["adult", "backdrop_path", "budget", "genres", "homepage", "id", "imdb_id", "origin_country",
+           "original_language", "original_title", "overview", "popularity", "poster_path", "production_companies",
+           "production_countries", "release_date", "revenue", "runtime", "spoken_languages", "status", "tagline",
+           "title", "video", "vote_average", "vote_count", "belongs_to_collection.id", "belongs_to_collection.name",
+           "belongs_to_collection.poster_path", "belongs_to_collection.backdrop_path", "credits.cast",
+           "credits.crew", "belongs_to_collection"]
+
+GENRES = [(28, "Action"), (12, "Adventure"), (16, "Animation"), (35, "Comedy"), (80, "Crime"),
+          (99, "Documentary"), (18, "Drama"), (10751, "Family"), (14, "Fantasy"), (36, "History"), (27, "Horror"),
+          (10402, "Music"), (9648, "Mystery"), (10749, "Romance"), (878, "Science Fiction"), (10770, "TV Movie"),
+          (53, "Thriller"), (10752, "War"), (37, "Western")]
+
+COUNTRIES = [("US", "United States of America"), ("GB", "United Kingdom"), ("FR", "France"), ("DE", "Germany"),
+             ("JP", "Japan"), ("CA", "Canada"), ("IN", "India"), ("IT", "Italy"), ("ES", "Spain"),
+             ("KR", "South Korea"), ("CN", "China"), ("AU", "Australia"), ("NZ", "New Zealand"), ("MX", "Mexico")]
+COUNTRY_WEIGHTS = [0.42, 0.1, 0.08, 0.06, 0.06, 0.05, 0.05, 0.04, 0.04, 0.03, 0.03, 0.02, 0.01, 0.01]
+
+LANGUAGES = [("en", "English", "English"), ("fr", "French", "Français"), ("es", "Spanish", "Español"),
+             ("de", "German", "Deutsch"), ("ja", "Japanese", "日本語"), ("it", "Italian", "Italiano"),
+             ("ko", "Korean", "한국어/조선말"), ("hi", "Hindi", "हिन्दी"), ("zh", "Mandarin", "普通话"),
+             ("ru", "Russian", "Pусский")]
+LANGUAGE_WEIGHTS = [0.55, 0.08, 0.07, 0.05, 0.06, 0.04, 0.04, 0.04, 0.04, 0.03]
+
+# (department, job, weight) of crew members
+CREW_JOBS = [("Directing", "Director", 0.0), ("Writing", "Screenplay", 0.08), ("Writing", "Writer", 0.05),
+             ("Production", "Producer", 0.12), ("Production", "Executive Producer", 0.08),
+             ("Production", "Casting", 0.04), ("Editing", "Editor", 0.05), ("Camera", "Director of Photography", 0.04),
+             ("Sound", "Original Music Composer", 0.04), ("Sound", "Sound Designer", 0.06),
+             ("Art", "Production Design", 0.04), ("Art", "Set Decoration", 0.06),
+             ("Costume & Make-Up", "Costume Design", 0.05), ("Costume & Make-Up", "Makeup Artist", 0.08),
+             ("Visual Effects", "Visual Effects Supervisor", 0.06), ("Crew", "Stunts", 0.09),
+             ("Directing", "Assistant Director", 0.06)]
+
+FIRST_NAMES = ["James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+               "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Chris", "Karen",
+               "Daniel", "Lisa", "Matthew", "Nancy", "Anthony", "Betty", "Mark", "Sandra", "Steven", "Ashley",
+               "Andrew", "Emily", "Kenji", "Yuki", "Amit", "Priya", "Jean", "Amélie", "Hans", "Sofia", "Luca",
+               "Min-jun", "Seo-yeon", "Wei", "Mei", "Olga", "Ivan", "Carlos", "Lucía", "Kwame"]
+
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez",
+              "Martinez", "Wilson", "Anderson", "Taylor", "Thomas", "Moore", "Jackson", "Martin", "Lee", "Thompson",
+              "White", "Harris", "Clark", "Lewis", "Robinson", "Walker", "Young", "Allen", "King", "Wright", "Scott",
+              "O'Brien", "O'Connor", "Tanaka", "Sato", "Sharma", "Patel", "Dubois", "Moreau", "Müller", "Schmidt",
+              "Rossi", "Kim", "Park", "Wang", "Li", "Ivanova", "Petrov", "Hernández", "López", "Mensah"]
+
+WORDS = ["Dark", "Last", "Lost", "Night", "City", "Star", "Dream", "Fire", "Shadow", "Empire", "Return", "Rise",
+         "Ghost", "Secret", "Kingdom", "Storm", "Heart", "Road", "War", "Blood", "Iron", "Silent", "Wild", "Golden",
+         "Planet", "Legend", "Edge", "Code", "Summer", "Winter", "Ocean", "Machine", "Garden", "Hunter", "Signal"]
+
+# The rendered items of the nested columns
+GENRE_TEXT = [repr({"id": genre_id, "name": name}) for genre_id, name in GENRES]
+COUNTRY_TEXT = [repr({"iso_3166_1": iso, "name": name}) for iso, name in COUNTRIES]
+LANGUAGE_TEXT = [repr({"english_name": english, "iso_639_1": iso, "name": name}) for iso, english, name in LANGUAGES]
+JOB_WEIGHTS = np.array([weight for _, _, weight in CREW_JOBS]) / sum(weight for _, _, weight in CREW_JOBS)
+# The department and the end of a rendered crew member for each job
+JOB_TEXT = [(repr(department), f"'department': {department!r}, 'job': {job!r}}}") for department, job, _ in CREW_JOBS]
+
+# Shared by every chunk so names, companies and collections repeat across the whole data
+PEOPLE = 50000
+COMPANIES = 5000
+PATH_CHARACTERS = np.array(list("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"))
+
+
+#Defines a function that generates movies shaped like the extracted TMDB data
+def syntheticMovies(rows: int, seed: int = 0, startId: int = 1, credits: bool = True) -> pd.DataFrame:
+    """
+    Generates movies with the columns of data/movieData.csv, nested columns stored as repr strings
+    as in the extracted CSV
+
+    Values follow the shape of the TMDB catalogue rather than of the 18 blockbusters of the
+    sample: 1 to 4 genres, 0 to 5 companies, lognormal cast sizes (median 15, up to 250) and crew
+    sizes (median 20, up to 1000) with a director in 97% of the movies, a third of the budgets and
+    revenues at 0, names and companies repeating across movies, and a fifth of the movies in a
+    collection. The same seed and startId always give the same movies
+
+    Parameters
+    ----------
+    rows    :   int
+            The number of movies
+
+    seed    :   int
+            The seed of the random generator
+
+    startId :   int
+            The id of the first movie, the others follow
+
+    credits :   bool
+            Generate the cast and crew. Without them the rows are about 25 times smaller, for the
+            largest sizes
+
+    Returns
+    -------
+    pd.DataFrame
+        The movies
+    """
+    rng = np.random.default_rng([seed, startId])
+    people = _people(seed)
+    companies = _companies(seed)
+
+    ids = np.arange(startId, startId + rows)
+
+    budget = np.where(rng.random(rows) < 0.35, 0, np.round(rng.lognormal(16.5, 1.3, rows), -3)).astype("int64")
+    revenue = np.where((budget == 0) & (rng.random(rows) < 0.7) | (rng.random(rows) < 0.1), 0,
+                       np.round(np.maximum(budget, 1e5) * rng.lognormal(0.6, 1.2, rows), 0)).astype("int64")
+    voteCount = np.floor(rng.lognormal(3.5, 2.0, rows)).astype("int64")
+    voteAverage = np.where(voteCount == 0, 0.0, np.clip(rng.normal(6.2, 1.2, rows), 0, 10).round(3))
+    years = np.clip(np.round(2025 - rng.exponential(18, rows)), 1920, 2025).astype(int)
+    releaseDate = pd.to_datetime(pd.DataFrame({"year": years, "month": rng.integers(1, 13, rows),
+                                               "day": rng.integers(1, 29, rows)})).dt.strftime("%Y-%m-%d")
+
+    inCollection = rng.random(rows) < 0.2
+    collectionIds = np.where(inCollection, rng.integers(1, max(rows // 5, 2), rows) + 10000, 0)
+
+    titles = _titles(rng, rows)
+    language = rng.choice(len(LANGUAGES), rows, p=LANGUAGE_WEIGHTS)
+
+    data = {
+        "adult": False,
+        "backdrop_path": _paths(rng, rows, 0.1),
+        "budget": budget,
+        "genres": _genres(rng, rows),
+        "homepage": np.where(rng.random(rows) < 0.3, [f"https://www.movie{movie_id}.com" for movie_id in ids], None),
+        "id": ids,
+        "imdb_id": [f"tt{movie_id + 1000000:07d}" for movie_id in ids],
+        "origin_country": [repr([COUNTRIES[i][0]]) for i in rng.choice(len(COUNTRIES), rows, p=COUNTRY_WEIGHTS)],
+        "original_language": [LANGUAGES[i][0] for i in language],
+        "original_title": titles,
+        "overview": [f"A story about {WORDS[first].lower()} and {WORDS[second].lower()} in {title}."
+                     if present else None for title, first, second, present in
+                     zip(titles, *rng.integers(0, len(WORDS), (2, rows)).tolist(), (rng.random(rows) > 0.02).tolist())],
+        "popularity": rng.lognormal(1.0, 1.2, rows).round(4),
+        "poster_path": _paths(rng, rows, 0.05),
+        "production_companies": _productionCompanies(rng, rows, companies),
+        "production_countries": _countries(rng, rows),
+        "release_date": releaseDate.to_numpy(),
+        "revenue": revenue,
+        "runtime": np.where(rng.random(rows) < 0.03, 0, np.clip(rng.normal(100, 22, rows), 40, 240)).astype(int),
+        "spoken_languages": _languages(rng, language),
+        "status": np.where(rng.random(rows) < 0.97, "Released", "Post Production"),
+        "tagline": [f"The {WORDS[word].lower()} begins." if present else None for word, present in
+                    zip(rng.integers(0, len(WORDS), rows).tolist(), (rng.random(rows) < 0.6).tolist())],
+        "title": titles,
+        "video": False,
+        "vote_average": voteAverage,
+        "vote_count": voteCount,
+        "belongs_to_collection.id": np.where(inCollection, collectionIds, np.nan),
+        "belongs_to_collection.name": np.where(inCollection, [f"Collection {i}" for i in collectionIds], None),
+        "belongs_to_collection.poster_path": np.where(inCollection, _paths(rng, rows, 0), None),
+        "belongs_to_collection.backdrop_path": np.where(inCollection, _paths(rng, rows, 0), None),
+        "credits.cast": [_cast(rng, people) for _ in range(rows)] if credits else "[]",
+        "credits.crew": [_crew(rng, people) for _ in range(rows)] if credits else "[]",
+        "belongs_to_collection": np.nan
+    }
+
+    return pd.DataFrame(data, columns=COLUMNS)
+
+
+#Defines a function that generates a large number of movies chunk by chunk
+def syntheticChunks(rows: int, chunksize: int = 100000, seed: int = 0, credits: bool = True):
+    """
+    Yields syntheticMovies DataFrames of at most chunksize rows with consecutive ids, so 10 million
+    movies can be generated without holding them in memory
+    """
+    for start in range(0, rows, chunksize):
+        yield syntheticMovies(min(chunksize, rows - start), seed, start + 1, credits)
+
+
+#Defines a function that writes synthetic movies to a CSV or Parquet file
+def writeSyntheticMovies(output_path: str, rows: int, chunksize: int = 100000, seed: int = 0,
+                         credits: bool = True) -> int:
+    """
+    Streams syntheticChunks to a CSV or Parquet file and returns the number of rows written
+    """
+    from Data_Cleaning.chunkedPipeline import ChunkWriter
+
+    with ChunkWriter(output_path) as writer:
+        for chunk in syntheticChunks(rows, chunksize, seed, credits):
+            writer.write(chunk)
+
+    return writer.rows
+
+
+@lru_cache(maxsize=4)
+def _people(seed: int) -> tuple:
+    # People shared by the cast and crew of every movie, rendered once as the text before and after
+    # their department, and the characters they play
+    rng = np.random.default_rng([seed, 0])
+
+    names = [f"{FIRST_NAMES[first]} {LAST_NAMES[last]}" for first, last in
+             zip(rng.integers(0, len(FIRST_NAMES), PEOPLE).tolist(), rng.integers(0, len(LAST_NAMES), PEOPLE).tolist())]
+    profiles = ["'" + path + "'" if path else "None" for path in _paths(rng, PEOPLE, 0.4)]
+
+    heads = [f"{{'adult': False, 'gender': {gender}, 'id': {person_id}, 'known_for_department': "
+             for person_id, gender in enumerate(rng.integers(0, 3, PEOPLE).tolist(), start=1)]
+    tails = [f", 'name': {name!r}, 'original_name': {name!r}, 'popularity': {popularity:.4f}, "
+             f"'profile_path': {profile}, "
+             for name, popularity, profile in zip(names, rng.lognormal(0, 1, PEOPLE).tolist(), profiles)]
+
+    characters = [repr(name) for name in names[:2000]] + [repr(word) for word in WORDS] + ["'Self'"]
+
+    return heads, tails, characters
+
+
+@lru_cache(maxsize=4)
+def _companies(seed: int) -> list:
+    rng = np.random.default_rng([seed, 1])
+    suffixes = ["Pictures", "Films", "Studios", "Entertainment"]
+
+    return [f"{{'id': {company_id}, 'logo_path': None, 'name': '{WORDS[word]} {suffixes[suffix]}', "
+            f"'origin_country': '{COUNTRIES[country][0]}'}}"
+            for company_id, word, suffix, country in zip(range(1, COMPANIES + 1),
+                                                         rng.integers(0, len(WORDS), COMPANIES).tolist(),
+                                                         rng.integers(0, len(suffixes), COMPANIES).tolist(),
+                                                         rng.choice(len(COUNTRIES), COMPANIES,
+                                                                    p=COUNTRY_WEIGHTS).tolist())]
+
+
+def _paths(rng, rows: int, missing: float) -> np.ndarray:
+    paths = np.array(["/" + "".join(chars) + ".jpg" for chars in rng.choice(PATH_CHARACTERS, (rows, 27))],
+                     dtype=object)
+    paths[rng.random(rows) < missing] = None
+
+    return paths
+
+
+def _titles(rng, rows: int) -> list:
+    words = rng.integers(0, len(WORDS), (rows, 3)).tolist()
+    lengths = rng.integers(1, 4, rows).tolist()
+    sequels = np.where(rng.random(rows) < 0.2, rng.integers(2, 5, rows), 0).tolist()
+
+    return [" ".join(WORDS[word] for word in picked[:length]) + (f" {sequel}" if sequel else "")
+            for picked, length, sequel in zip(words, lengths, sequels)]
+
+
+def _pick(rng, rows: int, weights: list, sizes: np.ndarray) -> list:
+    # Weighted sampling without replacement for every row at once: the items with the largest
+    # random keys u ** (1 / weight) are picked
+    keys = rng.random((rows, len(weights))) ** (1 / np.asarray(weights))
+    order = np.argsort(-keys, axis=1)
+
+    return [picked[:size] for picked, size in zip(order.tolist(), sizes.tolist())]
+
+
+def _render(items: list, rendered: list) -> str:
+    return "[" + ", ".join(rendered[i] for i in items) + "]"
+
+
+def _genres(rng, rows: int) -> list:
+    sizes = rng.choice([1, 2, 3, 4], rows, p=[0.35, 0.35, 0.2, 0.1])
+
+    return [_render(sorted(picked), GENRE_TEXT) for picked in _pick(rng, rows, [1] * len(GENRES), sizes)]
+
+
+def _productionCompanies(rng, rows: int, companies: list) -> list:
+    # Popular companies produce most movies
+    picked = np.minimum(rng.zipf(1.5, (rows, 5)), len(companies)) - 1
+
+    return [_render(dict.fromkeys(row[:size]), companies)
+            for row, size in zip(picked.tolist(), rng.poisson(2, rows).clip(0, 5).tolist())]
+
+
+def _countries(rng, rows: int) -> list:
+    sizes = rng.choice([0, 1, 2, 3], rows, p=[0.05, 0.7, 0.2, 0.05])
+
+    return [_render(picked, COUNTRY_TEXT) for picked in _pick(rng, rows, COUNTRY_WEIGHTS, sizes)]
+
+
+def _languages(rng, original: np.ndarray) -> list:
+    others = _pick(rng, len(original), LANGUAGE_WEIGHTS, rng.poisson(0.5, len(original)).clip(0, 3))
+
+    return [_render(dict.fromkeys([first] + picked), LANGUAGE_TEXT) for first, picked in zip(original.tolist(), others)]
+
+
+def _cast(rng, people: tuple) -> str:
+    heads, tails, characters = people
+    size = min(int(rng.lognormal(np.log(15), 0.8)), 250)
+    creditIds = rng.bytes(12 * size).hex()
+
+    return "[" + ", ".join(
+        f"{heads[member]}'Acting'{tails[member]}'cast_id': {order + 1}, 'character': {characters[character]}, "
+        f"'credit_id': '{creditIds[24 * order:24 * order + 24]}', 'order': {order}}}"
+        for order, (member, character) in enumerate(zip(rng.integers(0, len(heads), size).tolist(),
+                                                        rng.integers(0, len(characters), size).tolist()))) + "]"
+
+
+def _crew(rng, people: tuple) -> str:
+    heads, tails, _ = people
+    size = min(int(rng.lognormal(np.log(20), 1.0)), 1000)
+    creditIds = rng.bytes(12 * size).hex()
+    jobs = rng.choice(len(CREW_JOBS), size, p=JOB_WEIGHTS).tolist()
+
+    # Most movies have one director, a few have two or none
+    if size and rng.random() < 0.97:
+        jobs[0] = 0
+        if size > 1 and rng.random() < 0.08:
+            jobs[1] = 0
+
+    return "[" + ", ".join(
+        f"{heads[member]}{JOB_TEXT[job][0]}{tails[member]}'credit_id': '{creditIds[24 * i:24 * i + 24]}', "
+        f"{JOB_TEXT[job][1]}"
+        for i, (member, job) in enumerate(zip(rng.integers(0, len(heads), size).tolist(), jobs))) + "]"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Writes synthetic TMDB shaped movies to a CSV or Parquet file")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--output", default=os.path.join(project_root, "data", "cache", "syntheticMovies.csv"))
+    parser.add_argument("--chunksize", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-credits", action="store_true", help="Leave the cast and crew empty")
+    args = parser.parse_args()
+
+    rows = writeSyntheticMovies(args.output, args.rows, args.chunksize, args.seed, not args.no_credits)
+    print(f"Wrote {rows} movies to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
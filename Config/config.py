@@ -40,7 +40,14 @@ def getURL()-> str:
 def create_retry(total: int = 3, 
                  backoff_factor: float = 0.3, 
                  status_forcelist: tuple = (429, 500, 502, 503, 504), 
-                 alllowed_methods: tuple = ("GET", "POST")) -> object:
+                 alllowed_methods: tuple = ("GET", "POST"),
+                 pool_maxsize: int = 10,
+                 cache_path: str = None,
+                 cache_ttl: float = 86400,
+                 cache_max_bytes: int = 500 * 1024 ** 2,
+                 rate_limit: float = None,
+                 rate_burst: float = None,
+                 record_latency: bool = False) -> object:
     """
 
     Creates a logic to retry when quering an API
@@ -60,30 +67,84 @@ def create_retry(total: int = 3,
     allowed_methods     :   tuple
                     A tuple of HTTP allowed methods to be allowed to make the retry request
 
+    pool_maxsize    :   int
+                The number of connections kept open per host. Set it to at least the number
+                of concurrent workers sharing the session so connections are reused
+
+    cache_path  :   str
+                Path of a SQLite file to cache GET responses in. Repeated requests are then
+                answered from disk and the hit and miss counters are available from
+                session.response_cache.stats()
+
+    cache_ttl   :   float
+                Seconds a cached response is used before it is revalidated with the server
+
+    cache_max_bytes :   int
+                The maximum size of the compressed responses kept in the cache
+
+    rate_limit  :   float
+                The maximum number of requests per second per API key. Requests then wait for a
+                token from a bucket shared by every worker using the same key, the rate adapts to
+                Retry-After and rate limit headers and 429s are retried by the bucket instead of
+                the backoff
+
+    rate_burst  :   float
+                The number of requests that can be sent at once. Defaults to one second worth
+
+    record_latency  :   bool
+                    Adds the latency of every request to the http_request_duration_seconds
+                    histogram of Config.instrumentation, by method and status
+
     Return:
         Retry session
 
     """
     import requests
-    from requests.adapters import HTTPAdapter
     from urllib3.util.retry import Retry
 
+    from Config.rateLimiter import RateLimitedAdapter
+
+    # The token bucket retries the 429s itself so all workers back off together
+    if rate_limit is not None:
+        status_forcelist = tuple(status for status in status_forcelist if status != 429)
+
     retries = Retry(
         total=total,
         backoff_factor=backoff_factor,
         status_forcelist=status_forcelist,
-        allowed_methods=alllowed_methods
+        allowed_methods=alllowed_methods,
+        # urllib3 would otherwise still retry 429s sent with a Retry-After header, in this worker only
+        respect_retry_after_header=rate_limit is None
     )
 
-    adapter = HTTPAdapter(max_retries=retries)
+    adapter_options = dict(
+        max_retries=retries,
+        pool_maxsize=pool_maxsize,
+        rate_limit=rate_limit,
+        rate_burst=rate_burst,
+        max_throttled_retries=total
+    )
 
     #Creates a session
     session = requests.Session()
 
+    if cache_path:
+        from Config.responseCache import CachingAdapter, ResponseCache
+
+        session.response_cache = ResponseCache(cache_path, ttl=cache_ttl, max_bytes=cache_max_bytes)
+        adapter = CachingAdapter(session.response_cache, **adapter_options)
+    else:
+        adapter = RateLimitedAdapter(**adapter_options)
+
     session.mount("http://", adapter)
 
     session.mount("https://", adapter)
 
+    if record_latency:
+        from Config.instrumentation import instrumentSession
+
+        instrumentSession(session)
+
     return session
 
 
@@ -0,0 +1,480 @@
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# Upper bounds in seconds of the buckets of the HTTP latency histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Prefix of the Prometheus metric names
+METRIC_PREFIX = "tmdb"
+
+
+class Metrics:
+    """
+    Thread safe store of the measurements of the instrumented stages and HTTP requests
+
+    For each stage it keeps the number of calls and errors, the total wall and CPU time, the total
+    rows in and out and the largest memory increase of a call. HTTP latencies are counted in
+    cumulative histogram buckets per method and status, as Prometheus histograms are
+
+    Parameters
+    ----------
+    memory  :   str
+            How the memory of a stage is measured:
+            "rss"           the increase of the peak resident memory of the process, nearly free but
+                            only non zero when a stage sets a new peak
+            "tracemalloc"   the peak of the Python allocations during the stage, exact but slows
+                            allocation heavy code down
+            None            not measured
+    """
+
+    def __init__(self, memory: Optional[str] = "rss"):
+        if memory not in ("rss", "tracemalloc", None):
+            raise ValueError(f"Invalid memory '{memory}'. Must be one of: ['rss', 'tracemalloc', None]")
+
+        self.memory = memory
+        self.enabled = True
+        self.profileDir = None
+
+        self.stages = {}        # stage -> {"calls", "errors", "wall_seconds", ...}
+        self.histograms = {}    # (histogram, labels) -> {"buckets", "counts", "sum", "count"}
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiles = 0
+
+    def record(self, stage: str, wall: float, cpu: float, rowsIn: Optional[int] = None,
+               rowsOut: Optional[int] = None, memory: Optional[int] = None, error: bool = False) -> None:
+        """
+        Adds a call of a stage
+        """
+        with self._lock:
+            stats = self.stages.setdefault(stage, {"calls": 0, "errors": 0, "wall_seconds": 0.0,
+                                                   "cpu_seconds": 0.0, "rows_in": 0, "rows_out": 0,
+                                                   "peak_memory_bytes": 0})
+            stats["calls"] += 1
+            stats["errors"] += int(error)
+            stats["wall_seconds"] += wall
+            stats["cpu_seconds"] += cpu
+            stats["rows_in"] += rowsIn or 0
+            stats["rows_out"] += rowsOut or 0
+            stats["peak_memory_bytes"] = max(stats["peak_memory_bytes"], memory or 0)
+
+    def observe(self, histogram: str, value: float, buckets: tuple = LATENCY_BUCKETS, **labels) -> None:
+        """
+        Adds a value to a histogram, for example observe("http_request_duration_seconds", 0.12,
+        method="GET", status="200")
+        """
+        key = (histogram, tuple(sorted((name, str(label)) for name, label in labels.items())))
+
+        with self._lock:
+            entry = self.histograms.setdefault(key, {"buckets": tuple(buckets), "counts": [0] * len(buckets),
+                                                     "sum": 0.0, "count": 0})
+
+            for i, bound in enumerate(entry["buckets"]):
+                if value <= bound:
+                    entry["counts"][i] += 1
+
+            entry["sum"] += value
+            entry["count"] += 1
+
+    def reset(self) -> None:
+        """
+        Forgets every measurement
+        """
+        with self._lock:
+            self.stages.clear()
+            self.histograms.clear()
+
+    def toDict(self) -> dict:
+        """
+        Returns the measurements as a JSON serializable dict
+        """
+        with self._lock:
+            histograms = {}
+
+            for (name, labels), entry in self.histograms.items():
+                histograms.setdefault(name, []).append({
+                    "labels": dict(labels),
+                    "buckets": {str(bound): count for bound, count in zip(entry["buckets"], entry["counts"])},
+                    "sum": entry["sum"],
+                    "count": entry["count"]
+                })
+
+            return {"stages": {stage: dict(stats) for stage, stats in self.stages.items()},
+                    "histograms": histograms}
+
+    def toJSON(self) -> str:
+        return json.dumps(self.toDict(), indent=2)
+
+    def toPrometheus(self) -> str:
+        """
+        Returns the measurements in the Prometheus text exposition format
+        """
+        lines = []
+        stages = self.toDict()["stages"]
+
+        for field, kind, description in (("calls", "counter", "Calls of the stage"),
+                                         ("errors", "counter", "Calls of the stage that raised"),
+                                         ("wall_seconds", "counter", "Wall time spent in the stage"),
+                                         ("cpu_seconds", "counter", "CPU time of the process spent in the stage"),
+                                         ("rows_in", "counter", "Rows given to the stage"),
+                                         ("rows_out", "counter", "Rows returned by the stage"),
+                                         ("peak_memory_bytes", "gauge", "Largest memory increase of a call")):
+            name = f"{METRIC_PREFIX}_stage_{field}" + ("_total" if kind == "counter" else "")
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+            lines += [f'{name}{{stage="{_escape(stage)}"}} {stats[field]}' for stage, stats in stages.items()]
+
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+
+        for name in dict.fromkeys(histogram for (histogram, _), _ in histograms):
+            metric = f"{METRIC_PREFIX}_{name}"
+            lines += [f"# TYPE {metric} histogram"]
+
+            for (histogram, labels), entry in histograms:
+                if histogram != name:
+                    continue
+
+                labelText = ",".join(f'{label}="{_escape(value)}"' for label, value in labels)
+                prefix = labelText + "," if labelText else ""
+
+                for bound, count in zip(entry["buckets"], entry["counts"]):
+                    lines.append(f'{metric}_bucket{{{prefix}le="{bound}"}} {count}')
+
+                lines.append(f'{metric}_bucket{{{prefix}le="+Inf"}} {entry["count"]}')
+                lines.append(f"{metric}_sum{{{labelText}}} {entry['sum']}")
+                lines.append(f"{metric}_count{{{labelText}}} {entry['count']}")
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """
+        Writes the measurements to a file, in the Prometheus format for .prom and .txt files and as
+        JSON otherwise
+        """
+        output_dir = os.path.dirname(path)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+
+        text = self.toPrometheus() if path.endswith((".prom", ".txt")) else self.toJSON()
+
+        with open(path + ".tmp", "w") as file:
+            file.write(text)
+
+        os.replace(path + ".tmp", path)
+
+    def report(self) -> str:
+        """
+        Returns a table of the stages sorted by wall time
+        """
+        rows = sorted(self.toDict()["stages"].items(), key=lambda item: item[1]["wall_seconds"], reverse=True)
+
+        lines = [f"{'stage':<40} {'calls':>6} {'wall s':>9} {'cpu s':>9} {'rows in':>10} {'rows out':>10} "
+                 f"{'peak MB':>8}"]
+        lines += [f"{stage:<40} {stats['calls']:>6} {stats['wall_seconds']:>9.3f} {stats['cpu_seconds']:>9.3f} "
+                  f"{stats['rows_in']:>10} {stats['rows_out']:>10} {stats['peak_memory_bytes'] / 1e6:>8.1f}"
+                  for stage, stats in rows]
+
+        return "\n".join(lines)
+
+
+# The store used by the instrumented functions
+METRICS = Metrics()
+
+
+#Defines a function that returns the store used by the instrumented functions
+def getMetrics() -> Metrics:
+    return METRICS
+
+
+#Defines a function that measures a block of code as a stage
+@contextmanager
+def measure(stage: str, data=None, metrics: Optional[Metrics] = None):
+    """
+    Measures the wall time, CPU time, rows and memory of a block of code
+
+    Example:
+        with measure("separateArray", data) as record:
+            data = separateArray(data, columns)
+            record["rows_out"] = len(data)
+
+    Parameters
+    ----------
+    stage   :   str
+            The name the measurements are recorded under
+
+    data    :
+            The input of the stage. Its length is counted as the rows in when it is a DataFrame,
+            Series or array
+
+    metrics :   Metrics
+            The store to record to. Defaults to METRICS
+
+    Yields
+    ------
+    dict
+        Set "rows_out" in it to record the rows the stage returned
+    """
+    metrics = metrics or METRICS
+
+    if not metrics.enabled:
+        yield {}
+        return
+
+    record = {"rows_in": _rows(data), "rows_out": None}
+    stack = metrics._local.__dict__.setdefault("stack", [])
+
+    profiler = None
+    if metrics.profileDir is not None and not stack:
+        import cProfile
+
+        profiler = cProfile.Profile()
+
+    memory = _memoryStart(metrics.memory, stack)
+    stack.append(memory)
+
+    error = False
+    wallStart, cpuStart = time.perf_counter(), time.process_time()
+
+    if profiler is not None:
+        profiler.enable()
+
+    try:
+        yield record
+    except BaseException:
+        error = True
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+
+        wall, cpu = time.perf_counter() - wallStart, time.process_time() - cpuStart
+        stack.pop()
+
+        metrics.record(stage, wall, cpu, record["rows_in"], record["rows_out"],
+                       _memoryEnd(metrics.memory, memory, stack), error)
+
+        if profiler is not None:
+            _dumpProfile(metrics, stage, profiler)
+
+
+#Defines a decorator that measures every call of a function
+def instrumented(stage: Optional[str] = None, metrics: Optional[Metrics] = None) -> Callable:
+    """
+    Decorates a function so each call is measured with measure(). The rows in are the length of
+    the first argument (or data=) and the rows out the length of the returned value
+
+    The wrapper's code is named after the stage, so samplers like py-spy show the stage name in
+    their stacks
+
+    Parameters
+    ----------
+    stage   :   str
+            The name the calls are recorded under. Defaults to the name of the function
+
+    metrics :   Metrics
+            The store to record to. Defaults to METRICS
+    """
+    def decorator(function):
+        name = stage or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            store = metrics or METRICS
+
+            if not store.enabled:
+                return function(*args, **kwargs)
+
+            with measure(name, args[0] if args else kwargs.get("data"), store) as record:
+                result = function(*args, **kwargs)
+                record["rows_out"] = _rows(result)
+
+            return result
+
+        identifier = "".join(char if char.isalnum() else "_" for char in name)
+        wrapper.__code__ = wrapper.__code__.replace(co_name=identifier, **(
+            {"co_qualname": identifier} if sys.version_info >= (3, 11) else {}))
+
+        return wrapper
+
+    return decorator
+
+
+#Defines a function that records the latency of every request of a session
+def instrumentSession(session, metrics: Optional[Metrics] = None, buckets: tuple = LATENCY_BUCKETS):
+    """
+    Wraps session.request, which session.get and the other methods call, so the latency of every
+    request is added to the http_request_duration_seconds histogram by method and status
+    ("error" when the request raised)
+
+    Returns
+    -------
+    The session
+    """
+    request = session.request
+
+    @functools.wraps(request)
+    def timedRequest(method, url, *args, **kwargs):
+        store = metrics or METRICS
+        start = time.perf_counter()
+        status = "error"
+
+        try:
+            response = request(method, url, *args, **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            if store.enabled:
+                store.observe("http_request_duration_seconds", time.perf_counter() - start, buckets,
+                              method=str(method).upper(), status=status)
+
+    session.request = timedRequest
+
+    return session
+
+
+#Defines a function that turns the instrumentation on or off
+def setInstrumentation(enabled: bool = True, memory: Optional[str] = "rss", profileDir: Optional[str] = None,
+                       metrics: Optional[Metrics] = None) -> Metrics:
+    """
+    Configures the store used by the instrumented functions
+
+    Parameters
+    ----------
+    enabled :   bool
+            Measure the instrumented functions. When False they are called directly
+
+    memory  :   str
+            "rss", "tracemalloc" or None, see Metrics
+
+    profileDir  :   str
+                Run every outermost stage under cProfile and write its statistics to
+                profileDir/<stage>-<n>.prof, to open with pstats or snakeviz
+
+    Returns
+    -------
+    Metrics
+        The store
+    """
+    metrics = metrics or METRICS
+
+    if memory not in ("rss", "tracemalloc", None):
+        raise ValueError(f"Invalid memory '{memory}'. Must be one of: ['rss', 'tracemalloc', None]")
+
+    metrics.enabled = enabled
+    metrics.memory = memory
+    metrics.profileDir = profileDir
+
+    if profileDir:
+        os.makedirs(profileDir, exist_ok=True)
+
+    return metrics
+
+
+def _rows(value) -> Optional[int]:
+    # Rows of DataFrames, Series, arrays and lists, nothing for the other values
+    if isinstance(value, list):
+        return len(value)
+
+    shape = getattr(value, "shape", None)
+
+    return int(shape[0]) if isinstance(shape, tuple) and shape else None
+
+
+def _memoryStart(memory: Optional[str], stack: list) -> Optional[list]:
+    if memory == "rss" and resource is not None:
+        return [_peakRSS(), 0]
+
+    if memory == "tracemalloc":
+        import tracemalloc
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+        current, peak = tracemalloc.get_traced_memory()
+
+        # The peak is reset for this stage, so keep what the enclosing stage had reached
+        if stack and stack[-1] is not None:
+            stack[-1][1] = max(stack[-1][1], peak)
+
+        tracemalloc.reset_peak()
+
+        return [current, 0]
+
+    return None
+
+
+def _memoryEnd(memory: Optional[str], start: Optional[list], stack: list) -> Optional[int]:
+    if start is None:
+        return None
+
+    if memory == "rss":
+        return max(0, _peakRSS() - start[0])
+
+    import tracemalloc
+
+    peak = max(tracemalloc.get_traced_memory()[1], start[1])
+
+    if stack and stack[-1] is not None:
+        stack[-1][1] = max(stack[-1][1], peak)
+
+    return max(0, peak - start[0])
+
+
+def _peakRSS() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _dumpProfile(metrics: Metrics, stage: str, profiler) -> None:
+    with metrics._lock:
+        metrics._profiles += 1
+        count = metrics._profiles
+
+    fileName = "".join(char if char.isalnum() or char in "._-" else "_" for char in stage)
+    profiler.dump_stats(os.path.join(metrics.profileDir, f"{fileName}-{count}.prof"))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def main():
+    import random
+
+    @instrumented("sortNumbers")
+    def sortNumbers(values: list) -> list:
+        return sorted(values)
+
+    setInstrumentation(memory="tracemalloc")
+
+    for size in (10000, 100000):
+        with measure("buildNumbers") as record:
+            values = [random.random() for _ in range(size)]
+            record["rows_out"] = len(values)
+
+        sortNumbers(values)
+
+    for _ in range(20):
+        METRICS.observe("http_request_duration_seconds", random.expovariate(10), method="GET", status="200")
+
+    print(METRICS.report())
+    print(METRICS.toPrometheus())
+
+
+if __name__ == "__main__":
+    main()
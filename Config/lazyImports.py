@@ -0,0 +1,67 @@
+import importlib
+import sys
+
+
+#Defines a function that makes the modules of a package and their public names load on first use
+def lazyPackage(package: str, exports: dict) -> tuple:
+    """
+    Returns the module level __getattr__ and __dir__ of a package (PEP 562), so importing the
+    package imports none of its modules. A module is imported when it or one of its names is
+    first used, and its dependencies (pandas, matplotlib, requests) with it. In the __init__.py:
+
+        __getattr__, __dir__ = lazyPackage(__name__, {"kpiAnalysis": ["calculateROI", "rankColumn"]})
+
+    Parameters
+    ----------
+    package :   str
+            The name of the package, __name__ in its __init__.py
+
+    exports :   dict
+            The modules of the package and their public names, as key value pairs of module name
+            and list of names. A name that is also the name of a module is the module, as
+            `from package import module` would give
+
+    Returns
+    -------
+    tuple
+        The __getattr__ and __dir__ functions of the package
+    """
+    names = {name: module for module, moduleNames in exports.items() for name in moduleNames
+             if name not in exports}
+
+    def __getattr__(name: str):
+        if name in exports:
+            return importlib.import_module(f"{package}.{name}")
+
+        if name not in names:
+            raise AttributeError(f"module '{package}' has no attribute '{name}'")
+
+        value = getattr(importlib.import_module(f"{package}.{names[name]}"), name)
+
+        # Later lookups find the name without calling __getattr__
+        setattr(sys.modules[package], name, value)
+
+        return value
+
+    def __dir__() -> list:
+        return sorted(set(vars(sys.modules[package])) | set(exports) | set(names))
+
+    return __getattr__, __dir__
+
+
+def main():
+    import os
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.append(project_root)
+
+    import Data_Analysis.KPI_Analysis as kpi
+
+    print(f"pandas imported with the package: {'pandas' in sys.modules}")
+    print(kpi.calculateROI)
+    print(f"pandas imported with calculateROI: {'pandas' in sys.modules}")
+    print(f"matplotlib imported: {'matplotlib' in sys.modules}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+import hashlib
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RetryError
+
+
+#Defines a function that reads a Retry-After header
+def parseRetryAfter(value: Optional[str]) -> Optional[float]:
+    """
+    Returns the number of seconds to wait from a Retry-After header given in seconds or as an
+    HTTP date, or None if the header is missing or invalid
+    """
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+#Defines a function that reads the remaining requests and reset time of a rate limit window
+def parseRateLimit(headers) -> tuple:
+    """
+    Reads the X-RateLimit-* or RateLimit-* headers
+
+    Returns
+    -------
+    tuple
+        The remaining requests and the seconds until the window resets, None for each value
+        the server did not send. Reset values that look like epoch timestamps are converted to
+        seconds from now
+    """
+    remaining = headers.get("X-RateLimit-Remaining", headers.get("RateLimit-Remaining"))
+    reset = headers.get("X-RateLimit-Reset", headers.get("RateLimit-Reset"))
+
+    try:
+        remaining = float(remaining) if remaining is not None else None
+        reset = float(reset) if reset is not None else None
+    except ValueError:
+        return None, None
+
+    if reset is not None and reset > 1e9:
+        reset = max(0.0, reset - time.time())
+
+    return remaining, reset
+
+
+class TokenBucket:
+    """
+    Thread safe token bucket that spaces out requests to stay under an API rate limit
+
+    The rate adapts to the server: a 429 halves it and blocks every worker for the Retry-After
+    period, rate limit headers set it to what is left of the current window, and successful
+    responses raise it back towards the configured rate
+
+    Parameters
+    ----------
+    rate    :   float
+            The maximum number of requests per second
+
+    capacity    :   float
+                The number of requests that can be sent at once after an idle period. Defaults
+                to one second worth of requests
+
+    min_rate    :   float
+                The rate is never lowered below this value
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, min_rate: float = 1.0):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+
+        self.tokens = self.capacity
+        self.throttled = 0
+        self.waited = 0.0
+
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        start = max(self._updated, self._blocked_until)
+
+        if now > start:
+            self.tokens = min(self.capacity, self.tokens + (now - start) * self.rate)
+
+        self._updated = max(now, self._updated)
+
+    def acquire(self) -> None:
+        """
+        Blocks until a request may be sent
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+
+                if now >= self._blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait = max(self._blocked_until - now, (1 - self.tokens) / self.rate)
+                self.waited += wait
+
+            time.sleep(wait)
+
+    def update(self, status: int, headers) -> None:
+        """
+        Adapts the rate to a response
+
+        Parameters
+        ----------
+        status  :   int
+                The status code of the response
+
+        headers :   dict
+                The response headers
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            retry_after = parseRetryAfter(headers.get("Retry-After"))
+
+            if status == 429:
+                self.throttled += 1
+                self.rate = max(self.min_rate, self.rate / 2)
+                self.tokens = 0
+                self._blocked_until = max(self._blocked_until,
+                                          now + (retry_after if retry_after is not None else 1 / self.rate))
+                return
+
+            remaining, reset = parseRateLimit(headers)
+
+            if remaining is not None and reset is not None:
+                if remaining < 1:
+                    self.tokens = 0
+                    self._blocked_until = max(self._blocked_until, now + reset)
+                else:
+                    self.rate = max(self.min_rate, min(self.max_rate, remaining / max(reset, 1e-3)))
+            else:
+                # Additive increase back to the configured rate
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+    def stats(self) -> dict:
+        """
+        Returns the current rate, the number of 429s seen and the seconds spent waiting
+        """
+        return {"rate": self.rate, "throttled": self.throttled, "waited": self.waited}
+
+
+_LIMITERS = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+#Defines a function that returns the limiter shared by every request made with an API key
+def getRateLimiter(api_key: str, rate: float, capacity: Optional[float] = None) -> TokenBucket:
+    """
+    Returns the token bucket of an API key, creating it on first use
+
+    Every session and worker using the same key shares the same bucket, so the limit holds for
+    the key as a whole. The key is hashed so it is not kept in memory in clear
+
+    Parameters
+    ----------
+    api_key :   str
+            The API key or Authorization header the requests are made with
+
+    rate    :   float
+            The maximum number of requests per second for the key
+
+    capacity    :   float
+                The burst size of the bucket
+    """
+    digest = hashlib.sha256(api_key.encode()).hexdigest()
+
+    with _LIMITERS_LOCK:
+        if digest not in _LIMITERS:
+            _LIMITERS[digest] = TokenBucket(rate, capacity)
+
+        return _LIMITERS[digest]
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """
+    HTTP adapter that takes a token from the API key's bucket before every request
+
+    429 responses are handled here rather than by the urllib3 retries: the bucket is blocked for
+    the Retry-After period so every worker pauses together, and the request is sent again once a
+    token is available. When max_throttled_retries 429s in a row are received, RetryError is raised
+    as the urllib3 retries would. Without a rate the adapter behaves like HTTPAdapter
+
+    Parameters
+    ----------
+    rate_limit  :   float
+                The maximum number of requests per second per API key
+
+    rate_burst  :   float
+                The burst size of the bucket
+
+    max_throttled_retries   :   int
+                    How many times a request answered with a 429 is sent again
+    """
+
+    def __init__(self, rate_limit: Optional[float] = None, rate_burst: Optional[float] = None,
+                 max_throttled_retries: int = 3, **kwargs):
+        super().__init__(**kwargs)
+        self.rate_limit = rate_limit
+        self.rate_burst = rate_burst
+        self.max_throttled_retries = max_throttled_retries
+
+    def limiterFor(self, request) -> Optional[TokenBucket]:
+        """
+        Returns the bucket of the API key a request is made with
+        """
+        if self.rate_limit is None:
+            return None
+
+        return getRateLimiter(request.headers.get("Authorization", ""), self.rate_limit, self.rate_burst)
+
+    def send(self, request, **kwargs):
+        limiter = self.limiterFor(request)
+
+        if limiter is None:
+            return super().send(request, **kwargs)
+
+        for _ in range(self.max_throttled_retries + 1):
+            limiter.acquire()
+            response = super().send(request, **kwargs)
+            limiter.update(response.status_code, response.headers)
+
+            if response.status_code != 429:
+                return response
+
+            # The body of a throttled response is not read, its connection goes back to the pool
+            response.close()
+
+        raise RetryError(f"Too many 429 responses for {request.path_url.split('?')[0]} "
+                         f"({self.max_throttled_retries + 1} attempts)", request=request)
+
+
+def main():
+    bucket = TokenBucket(rate=20, capacity=5)
+
+    start = time.monotonic()
+    for _ in range(45):
+        bucket.acquire()
+
+    print(f"45 requests at 20/s with a burst of 5 took {time.monotonic() - start:.2f}s")
+
+    bucket.update(429, {"Retry-After": "1"})
+    print(bucket.stats())
+
+
+if __name__ == "__main__":
+    main()
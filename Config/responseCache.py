@@ -0,0 +1,306 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from Config.rateLimiter import RateLimitedAdapter
+
+
+# Headers of a 304 that describe its own empty body, not the cached one
+BODY_HEADERS = ("content-length", "content-encoding", "transfer-encoding", "content-range")
+
+
+#Defines a function that builds the cache key of a request
+def cacheKey(url: str) -> str:
+    """
+    Builds the cache key of a GET request from its endpoint and sorted query parameters
+
+    Parameters
+    ----------
+    url :   str
+        The full URL of the request
+
+    Returns
+    -------
+    str
+        The cache key
+    """
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, query, ""))
+
+
+class ResponseCache:
+    """
+    Stores API responses on disk in a SQLite file with zlib compressed bodies
+
+    Entries younger than ttl are served without a request. Older entries are revalidated with
+    their ETag or Last-Modified header when the server sent one, and dropped otherwise. When the
+    stored bodies grow past max_bytes the least recently used entries are evicted
+
+    Parameters
+    ----------
+    path    :   str
+            Path of the SQLite file. It is created if missing
+
+    ttl :   float
+        Seconds an entry is served without asking the server
+
+    max_bytes   :   int
+                The maximum size of the compressed bodies kept in the cache
+    """
+
+    def __init__(self, path: str, ttl: float = 86400, max_bytes: int = 500 * 1024 ** 2):
+        cache_dir = os.path.dirname(path)
+        if cache_dir and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+
+        # The session is shared by the extraction workers
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._connection.commit()
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Returns the cached entry for a key or None, marking it as recently used. The headers are
+        case insensitive, as servers and proxies may send them in lowercase (HTTP/2)
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT status, headers, body, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            self._connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._connection.commit()
+
+        status, headers, body, stored_at = row
+
+        return {
+            "status": status,
+            "headers": CaseInsensitiveDict(json.loads(headers)),
+            "body": zlib.decompress(body),
+            "stored_at": stored_at
+        }
+
+    def put(self, key: str, status: int, headers: dict, body: bytes) -> None:
+        """
+        Stores a response and evicts the least recently used entries when the cache is full
+        """
+        compressed = zlib.compress(body)
+        now = time.time()
+
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, status, json.dumps(dict(headers)), compressed, len(compressed), now, now)
+            )
+            self._evict()
+            self._connection.commit()
+
+    def touch(self, key: str, headers: Optional[dict] = None) -> None:
+        """
+        Marks an entry as fresh again after the server confirmed it did not change, replacing its
+        headers when given
+        """
+        now = time.time()
+
+        with self._lock:
+            if headers is None:
+                self._connection.execute(
+                    "UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?", (now, now, key)
+                )
+            else:
+                self._connection.execute(
+                    "UPDATE responses SET headers = ?, stored_at = ?, accessed_at = ? WHERE key = ?",
+                    (json.dumps(dict(headers)), now, now, key)
+                )
+            self._connection.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._connection.commit()
+
+    def purgeExpired(self) -> int:
+        """
+        Deletes the entries older than the TTL and returns how many were deleted
+        """
+        with self._lock:
+            deleted = self._connection.execute(
+                "DELETE FROM responses WHERE stored_at < ?", (time.time() - self.ttl,)
+            ).rowcount
+            self._connection.commit()
+
+        return deleted
+
+    def _evict(self) -> None:
+        total = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+        if total <= self.max_bytes:
+            return
+
+        for key, size in self._connection.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        ).fetchall():
+            self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+            if total <= self.max_bytes:
+                break
+
+    def count(self, counter: str) -> None:
+        """
+        Increments one of the hits, misses or revalidated counters
+        """
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self) -> dict:
+        """
+        Returns the hit, miss and revalidation counters with the number and size of the entries
+        """
+        with self._lock:
+            entries, size = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "entries": entries,
+            "bytes": size
+        }
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+class CachingAdapter(RateLimitedAdapter):
+    """
+    HTTP adapter that answers GET requests from a ResponseCache
+
+    It is mounted on the retry session by create_retry, so the retry logic and the rate limit
+    still apply to the requests that reach the server while cache hits cost no token
+
+    Parameters
+    ----------
+    cache   :   ResponseCache
+            The cache to read and store the responses
+
+    cacheable_status    :   tuple
+                    The status codes worth caching. Missing movies (404) are cached too so
+                    they are not requested again on every run
+    """
+
+    def __init__(self, cache: ResponseCache, cacheable_status: tuple = (200, 404), **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+        self.cacheable_status = cacheable_status
+
+    def send(self, request, **kwargs):
+        if request.method != "GET":
+            return super().send(request, **kwargs)
+
+        key = cacheKey(request.url)
+        entry = self.cache.get(key)
+
+        if entry is not None:
+            if time.time() - entry["stored_at"] < self.cache.ttl:
+                self.cache.count("hits")
+                return self._cachedResponse(request, entry)
+
+            validators = {}
+            if "ETag" in entry["headers"]:
+                validators["If-None-Match"] = entry["headers"]["ETag"]
+            if "Last-Modified" in entry["headers"]:
+                validators["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+
+            if validators:
+                request = request.copy()
+                request.headers.update(validators)
+            else:
+                self.cache.delete(key)
+
+        response = super().send(request, **kwargs)
+
+        if entry is not None and response.status_code == 304:
+            # The 304 carries the current validators (ETag, Last-Modified) and freshness headers
+            headers = CaseInsensitiveDict(entry["headers"])
+            headers.update((name, value) for name, value in response.headers.items()
+                           if name.lower() not in BODY_HEADERS)
+            response.close()
+
+            self.cache.count("revalidated")
+            self.cache.touch(key, headers)
+            return self._cachedResponse(request, {**entry, "headers": headers})
+
+        self.cache.count("misses")
+
+        if response.status_code in self.cacheable_status:
+            self.cache.put(key, response.status_code, response.headers, response.content)
+
+        return response
+
+    @staticmethod
+    def _cachedResponse(request, entry: dict) -> requests.Response:
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response._content = entry["body"]
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.reason = "OK" if entry["status"] == 200 else "Cached"
+
+        return response
+
+
+def main():
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(os.path.join(tmp, "responses.sqlite"), ttl=60)
+        cache.put(cacheKey("https://api.themoviedb.org/3/movie/1?b=2&a=1"), 200, {}, b'{"id": 1}')
+
+        print(cache.get(cacheKey("https://api.themoviedb.org/3/movie/1?a=1&b=2")))
+        print(cache.stats())
+
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+# Modules are imported on first use, see Config.lazyImports. Only drawing a chart imports matplotlib
+from Config.lazyImports import lazyPackage
+
+__getattr__, __dir__ = lazyPackage(__name__, {
+    "dataVisualization": ["FRANCHISE_METRICS", "DENSITY_THRESHOLD", "TREND_MODES", "trendVisuals",
+                          "trendStatistics", "trendSummary", "drawTrend", "plot_yearly_box_office_trends",
+                          "yearlyRevenue", "drawYearlyBoxOffice", "plot_franchise_vs_standalone_metrics",
+                          "franchiseSummary", "drawFranchiseMetrics"],
+    "renderCharts": ["FORMATS", "DEFAULT_CHARTS", "CHART_KINDS", "chartInputs", "renderChart", "chartHash",
+                     "renderCharts"]
+})
@@ -1,15 +1,189 @@
 import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
 
-def trendVisuals(data: pd.DataFrame, column1: str, column2: str, title: str):
-    # Prepare data
+from Data_Analysis.KPI_Analysis.aggregationCube import AggregationCube
+
+
+FRANCHISE_METRICS = {
+    "Revenue (M USD)": ("revenue_musd", "Mean Revenue"),
+    "Budget (M USD)": ("budget_musd", "Mean Budget"),
+    "Average Rating": ("vote_average", "Mean Rating"),
+    "ROI": ("ROI", "Mean ROI")
+}
+
+
+# Above this many points, trendVisuals(mode="auto") draws a density grid instead of every point
+DENSITY_THRESHOLD = 20000
+
+TREND_MODES = ("auto", "scatter", "hist2d", "hexbin")
+
+
+def trendVisuals(data: pd.DataFrame, column1: str, column2: str, title: str, mode: str = "auto", bins: int = 100,
+                 sample: int = None):
+    # pyplot is only loaded when a chart is shown, the draw functions use the Figure they are given
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(figsize=(10, 7))
+    drawTrend(fig, data, column1, column2, title, mode=mode, bins=bins, sample=sample)
+    plt.show()
+
+
+#Defines a function that computes the count, means, correlation and highest point of two columns
+def trendStatistics(x: np.ndarray, y: np.ndarray) -> dict:
+    """
+    Computes the statistics of a trend chart in one vectorized pass: the sums and the Gram matrix
+    of the two columns (shifted by their first value to keep the sums small) give the means,
+    variances and covariance together. The correlation matches pandas' Series.corr
+    """
+    count = len(x)
+    if count == 0:
+        raise ValueError("No rows have both columns.")
+
+    shifted = np.vstack([x - x[0], y - y[0]])
+    sums = shifted.sum(axis=1)
+    gram = shifted @ shifted.T
+
+    means = sums / count
+    covariance = gram / count - np.outer(means, means)
+    scale = np.sqrt(covariance[0, 0] * covariance[1, 1])
+
+    highest = int(np.argmax(y))
+
+    return {
+        "count": count,
+        "x_mean": float(x[0] + means[0]),
+        "y_mean": float(y[0] + means[1]),
+        "corr": float(covariance[0, 1] / scale) if scale > 0 else np.nan,
+        "max": (float(x[highest]), float(y[highest]))
+    }
+
+
+#Defines a function that computes everything a trend chart is drawn from
+def trendSummary(data: pd.DataFrame, column1: str, column2: str, mode: str = "auto", bins: int = 100,
+                 sample: int = None, seed: int = 0) -> dict:
+    """
+    Reduces two columns to what drawTrend needs: the statistics of every row with both values,
+    and either the points to scatter or a density grid built with NumPy
+
+    Parameters
+    ----------
+    data    :   pd.DataFrame
+            The movies
+
+    column1 :   str
+            The column on the x axis
+
+    column2 :   str
+            The column on the y axis
+
+    mode    :   str
+            scatter draws every point, hist2d counts the points on a bins x bins grid, hexbin on a
+            hexagonal grid bins hexagons wide. auto scatters up to DENSITY_THRESHOLD points and
+            uses hist2d above
+
+    bins    :   int
+            The width of the density grid
+
+    sample  :   int
+            Draw or bin at most this many randomly chosen points. The statistics and the highest
+            point always use every row
+
+    seed    :   int
+            The seed of the sampling
+
+    Returns
+    -------
+    dict
+        The mode, the statistics of trendStatistics and the points or the grid. It is small for
+        the density modes whatever the number of movies
+    """
+    if mode not in TREND_MODES:
+        raise ValueError(f"Invalid mode '{mode}'. Must be one of: {list(TREND_MODES)}")
+
     temp = data[[column1, column2]].dropna()
-    x = temp[column1]
-    y = temp[column2]
+    x = temp[column1].to_numpy(dtype=float)
+    y = temp[column2].to_numpy(dtype=float)
+
+    summary = trendStatistics(x, y)
+
+    if mode == "auto":
+        mode = "scatter" if min(len(x), sample or len(x)) <= DENSITY_THRESHOLD else "hist2d"
+
+    if sample is not None and len(x) > sample:
+        keep = np.sort(np.random.default_rng(seed).choice(len(x), size=sample, replace=False))
+        x, y = x[keep], y[keep]
+
+    summary["mode"] = mode
+
+    if mode == "scatter":
+        summary["x"], summary["y"] = x, y
+    elif mode == "hist2d":
+        counts, xedges, yedges = np.histogram2d(x, y, bins=bins)
+        summary["counts"] = counts.T
+        summary["extent"] = (xedges[0], xedges[-1], yedges[0], yedges[-1])
+    else:
+        summary.update(_hexagonCounts(x, y, bins))
+
+    return summary
+
+
+def _hexagonCounts(x: np.ndarray, y: np.ndarray, gridsize: int) -> dict:
+    # The hexagonal binning of Axes.hexbin done with NumPy: the hexagon centres form two offset
+    # rectangular lattices and each point goes to the nearest centre of the two
+    xmin, xmax = x.min(), x.max()
+    ymin, ymax = y.min(), y.max()
+    if xmax == xmin:
+        xmin, xmax = xmin - 0.5, xmax + 0.5
+    if ymax == ymin:
+        ymin, ymax = ymin - 0.5, ymax + 0.5
+
+    # Padding avoids rounding errors at the edges, as in Axes.hexbin
+    padding = 1e-9 * (xmax - xmin)
+    xmin, xmax = xmin - padding, xmax + padding
+
+    nx = gridsize
+    ny = max(int(gridsize / np.sqrt(3)), 1)
+    sx = (xmax - xmin) / nx
+    sy = (ymax - ymin) / ny
+
+    ix = (x - xmin) / sx
+    iy = (y - ymin) / sy
+    ix1, iy1 = np.round(ix).astype(int), np.round(iy).astype(int)
+    ix2, iy2 = np.floor(ix).astype(int), np.floor(iy).astype(int)
+
+    first = (ix - ix1) ** 2 + 3.0 * (iy - iy1) ** 2 < (ix - ix2 - 0.5) ** 2 + 3.0 * (iy - iy2 - 0.5) ** 2
+
+    counts1 = np.bincount(ix1[first] * (ny + 1) + iy1[first], minlength=(nx + 1) * (ny + 1))
+    counts2 = np.bincount(np.minimum(ix2[~first], nx - 1) * ny + np.minimum(iy2[~first], ny - 1),
+                          minlength=nx * ny)
+
+    grid1 = np.mgrid[0:nx + 1, 0:ny + 1].reshape(2, -1).T.astype(float)
+    grid2 = np.mgrid[0:nx, 0:ny].reshape(2, -1).T + 0.5
+
+    centres = np.vstack([grid1, grid2]) * [sx, sy] + [xmin, ymin]
+    counts = np.concatenate([counts1, counts2])
+    occupied = counts > 0
+
+    return {"centres": centres[occupied], "counts": counts[occupied], "size": (sx, sy),
+            "extent": (xmin, xmax, ymin, ymax)}
+
+
+#Defines a function that draws the scatter plot of two columns on a figure
+def drawTrend(fig, data: pd.DataFrame | dict, column1: str, column2: str, title: str, mode: str = "auto",
+              bins: int = 100, sample: int = None, seed: int = 0):
+    """
+    Draws trendVisuals on a matplotlib Figure without pyplot, so it can be rendered without a
+    display and in several processes at once. data is the movies, or their trendSummary. The
+    density modes draw the grid as one image, so large datasets render in about the same time
+    and file size as small ones
+    """
+    from matplotlib.colors import LogNorm
+
+    summary = data if isinstance(data, dict) else trendSummary(data, column1, column2, mode, bins, sample, seed)
+    ax = fig.add_subplot()
 
     # Correlation
-    corr = x.corr(y)
+    corr = summary["corr"]
 
     if corr >= 0.7:
         corr_label = "Strong Positive Correlation"
@@ -23,28 +197,41 @@ def trendVisuals(data: pd.DataFrame, column1: str, column2: str, title: str):
         corr_label = "Strong Negative Correlation"
 
     # Means
-    x_mean = x.mean()
-    y_mean = y.mean()
+    x_mean = summary["x_mean"]
+    y_mean = summary["y_mean"]
 
     # Plot
-    plt.figure(figsize=(10, 7))
-    plt.scatter(
-        x, y,
-        alpha=0.75,
-        color="#4c72b0",
-        edgecolor="white",
-        linewidth=0.6
-    )
+    if summary["mode"] == "scatter":
+        ax.scatter(
+            summary["x"], summary["y"],
+            alpha=0.75,
+            color="#4c72b0",
+            edgecolor="white",
+            linewidth=0.6
+        )
+    elif summary["mode"] == "hist2d":
+        density = ax.imshow(
+            np.ma.masked_equal(summary["counts"], 0),
+            extent=summary["extent"],
+            origin="lower",
+            aspect="auto",
+            interpolation="nearest",
+            cmap=_densityColormap(),
+            norm=LogNorm()
+        )
+        fig.colorbar(density, ax=ax, label="Movies")
+    else:
+        density = _drawHexagons(ax, summary)
+        fig.colorbar(density, ax=ax, label="Movies")
 
     # Mean reference lines
-    plt.axvline(x_mean, linestyle="--", linewidth=1.5, color="#555555", label=f"Mean {column1}")
-    plt.axhline(y_mean, linestyle="--", linewidth=1.5, color="#555555", label=f"Mean {column2}")
+    ax.axvline(x_mean, linestyle="--", linewidth=1.5, color="#555555", label=f"Mean {column1}")
+    ax.axhline(y_mean, linestyle="--", linewidth=1.5, color="#555555", label=f"Mean {column2}")
 
     # Highlight highest Y value
-    max_idx = y.idxmax()
-    plt.annotate(
+    ax.annotate(
         f"Highest {column2}",
-        xy=(x.loc[max_idx], y.loc[max_idx]),
+        xy=summary["max"],
         xytext=(15, -25),
         textcoords="offset points",
         arrowprops=dict(arrowstyle="-|>", color="#c62828", linewidth=2),
@@ -53,8 +240,8 @@ def trendVisuals(data: pd.DataFrame, column1: str, column2: str, title: str):
     )
 
     # Axis limits (needed for quadrant positioning)
-    x_min, x_max = plt.xlim()
-    y_min, y_max = plt.ylim()
+    x_min, x_max = ax.get_xlim()
+    y_min, y_max = ax.get_ylim()
 
     # Quadrant centers (data-aware positioning)
     qx_left = (x_min + x_mean) / 2
@@ -70,17 +257,17 @@ def trendVisuals(data: pd.DataFrame, column1: str, column2: str, title: str):
     )
 
     # Quadrant labels
-    plt.text(qx_right, qy_top, f"High {column1} – High {column2}\n(Strong Performers)", **quadrant_style)
-    plt.text(qx_left, qy_top, f"Low {column1} – High {column2}\n(Efficient / Overperformers)", **quadrant_style)
-    plt.text(qx_right, qy_bottom, f"High {column1} – Low {column2}\n(Underperformers)", **quadrant_style)
-    plt.text(qx_left, qy_bottom, f"Low {column1} – Low {column2}\n(Weak Performers)", **quadrant_style)
+    ax.text(qx_right, qy_top, f"High {column1} – High {column2}\n(Strong Performers)", **quadrant_style)
+    ax.text(qx_left, qy_top, f"Low {column1} – High {column2}\n(Efficient / Overperformers)", **quadrant_style)
+    ax.text(qx_right, qy_bottom, f"High {column1} – Low {column2}\n(Underperformers)", **quadrant_style)
+    ax.text(qx_left, qy_bottom, f"Low {column1} – Low {column2}\n(Weak Performers)", **quadrant_style)
 
     # Correlation summary
-    plt.text(
+    ax.text(
         0.98,
         0.98,
         f"r = {corr:.2f}\n{corr_label}",
-        transform=plt.gca().transAxes,
+        transform=ax.transAxes,
         ha="right",
         va="top",
         fontsize=10,
@@ -88,26 +275,77 @@ def trendVisuals(data: pd.DataFrame, column1: str, column2: str, title: str):
     )
 
     # Labels & styling
-    plt.xlabel(column1.upper())
-    plt.ylabel(column2.upper())
-    plt.title(title, fontsize=14, weight="bold")
+    ax.set_xlabel(column1.upper())
+    ax.set_ylabel(column2.upper())
+    ax.set_title(title, fontsize=14, weight="bold")
+
+    ax.legend(loc="lower right", frameon=False)
+    ax.grid(True, linestyle="--", alpha=0.35)
+    fig.tight_layout()
+
+    return fig
+
+
+def _densityColormap():
+    # Blues without its palest shades, so bins holding a single movie stay visible
+    from matplotlib import colormaps
+    from matplotlib.colors import ListedColormap
+
+    return ListedColormap(colormaps["Blues"](np.linspace(0.3, 1, 256)))
+
+
+def _drawHexagons(ax, summary: dict):
+    # Draws the counts of _hexagonCounts the way Axes.hexbin draws its own
+    from matplotlib.collections import PolyCollection
+    from matplotlib.colors import LogNorm
+    from matplotlib.transforms import AffineDeltaTransform
+
+    sx, sy = summary["size"]
+    hexagon = [sx, sy / 3] * np.array([[.5, -.5], [.5, .5], [0., 1.], [-.5, .5], [-.5, -.5], [0., -1.]])
 
-    plt.legend(loc="lower right", frameon=False)
-    plt.grid(True, linestyle="--", alpha=0.35)
-    plt.tight_layout()
+    collection = PolyCollection([hexagon], offsets=summary["centres"],
+                                offset_transform=AffineDeltaTransform(ax.transData), cmap=_densityColormap(),
+                                norm=LogNorm(), edgecolors="face", linewidths=0.2)
+    collection.set_array(summary["counts"])
+
+    xmin, xmax, ymin, ymax = summary["extent"]
+    ax.add_collection(collection, autolim=False)
+    ax.update_datalim([(xmin, ymin), (xmax, ymax)])
+    ax.autoscale_view()
+
+    return collection
+
+
+
+def plot_yearly_box_office_trends(data: pd.DataFrame | AggregationCube):
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(figsize=(11, 5.5))
+    drawYearlyBoxOffice(fig, yearlyRevenue(data))
     plt.show()
 
 
+#Defines a function that computes the mean revenue of each release year
+def yearlyRevenue(data: pd.DataFrame | AggregationCube) -> pd.Series:
+    # A cube already holds the yearly means
+    if isinstance(data, AggregationCube):
+        return data.slice("year", "revenue_musd", "mean")
 
-def plot_yearly_box_office_trends(data: pd.DataFrame):
     data = data.copy()
     data["release_year"] = pd.to_datetime(data["release_date"]).dt.year
-    yearly = data.groupby("release_year")["revenue_musd"].mean()
 
-    plt.figure(figsize=(11, 5.5))
+    return data.groupby("release_year")["revenue_musd"].mean()
+
+
+#Defines a function that draws the yearly revenue on a figure
+def drawYearlyBoxOffice(fig, yearly: pd.Series):
+    """
+    Draws plot_yearly_box_office_trends on a matplotlib Figure from the output of yearlyRevenue
+    """
+    ax = fig.add_subplot()
 
     # Blue trend line
-    plt.plot(
+    ax.plot(
         yearly.index,
         yearly.values,
         marker="o",
@@ -128,7 +366,7 @@ def plot_yearly_box_office_trends(data: pd.DataFrame):
     low_value = yearly.min()
 
     # Peak annotation (green arrow)
-    plt.annotate(
+    ax.annotate(
         f"Peak Revenue\n{peak_value:.1f}M USD",
         xy=(peak_year, peak_value),
         xytext=(20, -35),
@@ -145,7 +383,7 @@ def plot_yearly_box_office_trends(data: pd.DataFrame):
     )
 
     # Lowest annotation (red arrow)
-    plt.annotate(
+    ax.annotate(
         f"Lowest Revenue\n{low_value:.1f}M USD",
         xy=(low_year, low_value),
         xytext=(-25, 30),
@@ -162,45 +400,58 @@ def plot_yearly_box_office_trends(data: pd.DataFrame):
     )
 
     # Titles & labels
-    plt.title("Yearly Box Office Performance", fontsize=14, weight="bold")
-    plt.xlabel("Year", fontsize=11)
-    plt.ylabel("Average Revenue (Million USD)", fontsize=11)
+    ax.set_title("Yearly Box Office Performance", fontsize=14, weight="bold")
+    ax.set_xlabel("Year", fontsize=11)
+    ax.set_ylabel("Average Revenue (Million USD)", fontsize=11)
 
     # Clean grid
-    plt.grid(True, linestyle="--", alpha=0.35)
+    ax.grid(True, linestyle="--", alpha=0.35)
 
     # Legend
-    plt.legend(frameon=False)
+    ax.legend(frameon=False)
 
-    plt.tight_layout()
-    plt.show()
+    fig.tight_layout()
 
+    return fig
 
 
-def plot_franchise_vs_standalone_metrics(data: pd.DataFrame):
-    metrics = {
-        "Revenue (M USD)": ("revenue_musd", "Mean Revenue"),
-        "Budget (M USD)": ("budget_musd", "Mean Budget"),
-        "Average Rating": ("vote_average", "Mean Rating"),
-        "ROI": ("ROI", "Mean ROI")
-    }
 
-    summary = data.agg(
+def plot_franchise_vs_standalone_metrics(data: pd.DataFrame | AggregationCube):
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(figsize=(13, 8))
+    drawFranchiseMetrics(fig, franchiseSummary(data))
+    plt.show()
+
+
+#Defines a function that computes the means compared by plot_franchise_vs_standalone_metrics
+def franchiseSummary(data: pd.DataFrame | AggregationCube) -> pd.DataFrame:
+    # A cube already holds the means of the collection groups
+    if isinstance(data, AggregationCube):
+        return data.slice("collection", [col for col, _ in FRANCHISE_METRICS.values()], "mean")
+
+    return data.agg(
         revenue_musd=("revenue_musd", "mean"),
         budget_musd=("budget_musd", "mean"),
         vote_average=("vote_average", "mean"),
         ROI=("ROI", "mean")
     )
 
-    fig, axes = plt.subplots(2, 2, figsize=(13, 8))
-    axes = axes.flatten()
+
+#Defines a function that draws the franchise and standalone means on a figure
+def drawFranchiseMetrics(fig, summary: pd.DataFrame):
+    """
+    Draws plot_franchise_vs_standalone_metrics on a matplotlib Figure from the output of
+    franchiseSummary
+    """
+    axes = fig.subplots(2, 2).flatten()
 
     colors = {
         "Franchise": "#1f4fd8",    # professional blue
         "Standalone": "#6b7280"   # neutral charcoal
     }
 
-    for ax, (title, (col, ylabel)) in zip(axes, metrics.items()):
+    for ax, (title, (col, ylabel)) in zip(axes, FRANCHISE_METRICS.items()):
         values = summary[col]
         x = np.arange(len(values))
 
@@ -244,8 +495,9 @@ def plot_franchise_vs_standalone_metrics(data: pd.DataFrame):
         weight="bold"
     )
 
-    plt.tight_layout(rect=[0, 0, 1, 0.95])
-    plt.show()
+    fig.tight_layout(rect=[0, 0, 1, 0.95])
+
+    return fig
 
 
 
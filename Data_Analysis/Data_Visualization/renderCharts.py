@@ -0,0 +1,303 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(project_root)
+
+import numpy as np
+import pandas as pd
+
+from Data_Analysis.Data_Visualization import dataVisualization
+from Data_Analysis.Data_Visualization.dataVisualization import (drawFranchiseMetrics, drawTrend, drawYearlyBoxOffice,
+                                                                franchiseSummary, trendSummary, yearlyRevenue)
+from Data_Analysis.KPI_Analysis.aggregationCube import AggregationCube
+
+
+FORMATS = ("png", "svg", "pdf")
+
+# The charts of the notebook, as key value pairs of chart name and (kind, parameters)
+DEFAULT_CHARTS = {
+    "budget_vs_revenue": ("trend", {"column1": "budget_musd", "column2": "revenue_musd",
+                                    "title": "BUDGET (USD) Vs REVENUE (USD)"}),
+    "popularity_vs_rating": ("trend", {"column1": "popularity", "column2": "vote_average",
+                                       "title": "POPULARITY VS RATING"}),
+    "yearly_box_office": ("yearly", {}),
+    "franchise_vs_standalone": ("franchise", {})
+}
+
+MANIFEST = ".charts.json"
+
+
+#Defines a function that reduces the two columns of a trend chart to its statistics and points or grid
+def trendInputs(data: pd.DataFrame, cube: AggregationCube = None, column1: str = None, column2: str = None,
+                mode: str = "auto", bins: int = 100, sample: int = None, seed: int = 0, **kwargs) -> dict:
+    return trendSummary(data, column1, column2, mode, bins, sample, seed)
+
+
+#Defines a function that computes the yearly revenue from the cube when there is one
+def yearlyInputs(data: pd.DataFrame, cube: AggregationCube = None, **kwargs) -> pd.Series:
+    return yearlyRevenue(cube if cube is not None else data)
+
+
+#Defines a function that computes the franchise and standalone means from the cube when there is one
+def franchiseInputs(data: pd.DataFrame, cube: AggregationCube = None, **kwargs) -> pd.DataFrame:
+    if cube is not None:
+        return franchiseSummary(cube)
+
+    return franchiseSummary(data.groupby(np.where(data["belongs_to_collection.id"].notna(), "Franchise",
+                                                  "Standalone")))
+
+
+# Chart kind -> (function computing its inputs, function drawing them on a Figure, figure size)
+CHART_KINDS = {
+    "trend": (trendInputs, drawTrend, (10, 7)),
+    "yearly": (yearlyInputs, drawYearlyBoxOffice, (11, 5.5)),
+    "franchise": (franchiseInputs, drawFranchiseMetrics, (13, 8))
+}
+
+
+#Defines a function that computes the inputs of every chart
+def chartInputs(data: pd.DataFrame, charts: dict = DEFAULT_CHARTS, cube: AggregationCube = None) -> dict:
+    """
+    Returns the data each chart is drawn from (the aggregates, or the trendSummary of a scatter
+    plot), as key value pairs of chart name and inputs. They are small next to the movies, so
+    only they are sent to the rendering processes and hashed
+    """
+    inputs = {}
+
+    for name, (kind, params) in charts.items():
+        if kind not in CHART_KINDS:
+            raise ValueError(f"Invalid chart kind '{kind}' for '{name}'. Must be one of: {list(CHART_KINDS)}")
+
+        inputs[name] = CHART_KINDS[kind][0](data, cube, **params)
+
+    return inputs
+
+
+#Defines a function that draws a chart on its own Figure and returns the file content
+def renderChart(kind: str, inputs, params: dict = None, format: str = "png", dpi: int = 100) -> bytes:
+    """
+    Draws a chart with the explicit Figure API, without pyplot. The figure is not registered with
+    any backend or window, so charts can be rendered without a display, in threads or in processes
+
+    Parameters
+    ----------
+    kind    :   str
+            A key of CHART_KINDS
+
+    inputs  :   pd.DataFrame, pd.Series or dict
+            The output of chartInputs for the chart
+
+    params  :   dict
+            The parameters of the chart, such as the columns and title of a trend
+
+    format  :   str
+            png, svg or pdf
+
+    dpi :   int
+        The resolution of PNG images
+
+    Returns
+    -------
+    bytes
+        The content of the file
+    """
+    from matplotlib.figure import Figure
+
+    if format not in FORMATS:
+        raise ValueError(f"Invalid format '{format}'. Must be one of: {list(FORMATS)}")
+
+    _, draw, figsize = CHART_KINDS[kind]
+
+    fig = Figure(figsize=figsize)
+    draw(fig, inputs, **(params or {}))
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=format, dpi=dpi)
+
+    return buffer.getvalue()
+
+
+#Defines a function that hashes everything a chart file depends on
+def chartHash(kind: str, inputs, params: dict, format: str, dpi: int) -> str:
+    """
+    Hashes the inputs of a chart with its kind, parameters, format, resolution and the code
+    drawing it, so a chart is only drawn again when one of them changes
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps([kind, params, format, dpi], sort_keys=True, default=repr).encode())
+
+    for path in (dataVisualization.__file__, __file__):
+        with open(path, "rb") as file:
+            digest.update(file.read())
+
+    _hashValue(digest, inputs)
+
+    return digest.hexdigest()
+
+
+def _hashValue(digest, value) -> None:
+    # repr would truncate arrays, so their bytes are hashed
+    if isinstance(value, (pd.Series, pd.DataFrame)):
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+        digest.update(repr(list(value.columns) if isinstance(value, pd.DataFrame) else value.name).encode())
+        digest.update(repr(list(value.index.names)).encode())
+    elif isinstance(value, np.ndarray):
+        digest.update(repr((value.shape, str(value.dtype))).encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        for key in sorted(value):
+            digest.update(repr(key).encode())
+            _hashValue(digest, value[key])
+    else:
+        digest.update(repr(value).encode())
+
+
+#Defines a function that renders a set of charts to files in a process pool
+def renderCharts(data: pd.DataFrame, output_dir: str, charts: dict = DEFAULT_CHARTS, formats: tuple = ("png",),
+                 cube: AggregationCube = None, workers: int = None, dpi: int = 100, force: bool = False) -> dict:
+    """
+    Renders charts to files without a display, skipping the charts whose inputs did not change
+
+    The inputs of every chart are computed once in this process and hashed. A chart whose file
+    exists with the same hash in the manifest of output_dir is not drawn again. The others are
+    drawn with the Agg, SVG or PDF backends across a process pool, each process writing its files
+
+    Parameters
+    ----------
+    data    :   pd.DataFrame
+            The cleaned movies with their KPIs
+
+    output_dir  :   str
+                The directory the charts are written to, as {name}.{format}
+
+    charts  :   dict
+            The charts to render, as key value pairs of name and (kind, parameters). Defaults to
+            the notebook's charts
+
+    formats :   tuple
+            File formats among png, svg and pdf
+
+    cube    :   AggregationCube
+            The aggregation cube of the movies, used instead of aggregating them again
+
+    workers :   int
+            Rendering processes. Defaults to the number of CPUs, 1 renders in this process
+
+    dpi :   int
+        The resolution of PNG images
+
+    force   :   bool
+            Draws every chart even if it is up to date
+
+    Returns
+    -------
+    dict
+        The files of each chart, as key value pairs of chart name and {format: path}
+    """
+    for format in formats:
+        if format not in FORMATS:
+            raise ValueError(f"Invalid format '{format}'. Must be one of: {list(FORMATS)}")
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    manifestPath = os.path.join(output_dir, MANIFEST)
+    manifest = {}
+    if os.path.exists(manifestPath):
+        with open(manifestPath) as file:
+            manifest = json.load(file)
+
+    inputs = chartInputs(data, charts, cube)
+    files, jobs = {}, []
+
+    for name, (kind, params) in charts.items():
+        files[name] = {}
+
+        for format in formats:
+            path = os.path.join(output_dir, f"{name}.{format}")
+            digest = chartHash(kind, inputs[name], params, format, dpi)
+            files[name][format] = path
+
+            if not force and manifest.get(f"{name}.{format}") == digest and os.path.exists(path):
+                print(f"{name}.{format}: up to date")
+                continue
+
+            jobs.append((f"{name}.{format}", digest, (kind, inputs[name], params, format, dpi, path)))
+
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_initWorker) as executor:
+            futures = [executor.submit(_renderJob, *job) for _, _, job in jobs]
+            for future in futures:
+                future.result()
+    else:
+        for _, _, job in jobs:
+            _renderJob(*job)
+
+    for key, digest, _ in jobs:
+        manifest[key] = digest
+        print(f"{key}: rendered")
+
+    with open(manifestPath + ".tmp", "w") as file:
+        json.dump(manifest, file, indent=2)
+
+    os.replace(manifestPath + ".tmp", manifestPath)
+
+    return files
+
+
+def _initWorker() -> None:
+    # Workers never open windows, even if the parent uses an interactive backend
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+
+def _renderJob(kind: str, inputs, params: dict, format: str, dpi: int, path: str) -> str:
+    content = renderChart(kind, inputs, params, format, dpi)
+
+    with open(path + ".tmp", "wb") as file:
+        file.write(content)
+
+    os.replace(path + ".tmp", path)
+
+    return path
+
+
+def main():
+    from Data_Analysis.KPI_Analysis.kpiAnalysis import calculateProfit, calculateROI
+
+    parser = argparse.ArgumentParser(description="Renders the charts of the notebook to files without a display")
+    parser.add_argument("--input", default=os.path.join(project_root, "data", "pipeline_output", "clean.csv"),
+                        help="The cleaned movies, as written by Pipeline/moviePipeline.py")
+    parser.add_argument("--output", default=os.path.join(project_root, "data", "pipeline_output", "charts"))
+    parser.add_argument("--charts", nargs="+", default=list(DEFAULT_CHARTS), choices=list(DEFAULT_CHARTS))
+    parser.add_argument("--formats", nargs="+", default=["png"], choices=list(FORMATS))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--dpi", type=int, default=100)
+    parser.add_argument("--force", action="store_true", help="Draw the charts even if they are up to date")
+    args = parser.parse_args()
+
+    data = pd.read_csv(args.input)
+
+    if "profit" not in data.columns:
+        data = calculateProfit(data=data, revenueColumn="revenue_musd", budgetColumn="budget_musd")
+    if "ROI" not in data.columns:
+        data = calculateROI(data=data, revenueColumn="revenue_musd", budgetColumn="budget_musd")
+
+    files = renderCharts(data, args.output, {name: DEFAULT_CHARTS[name] for name in args.charts}, args.formats,
+                         workers=args.workers, dpi=args.dpi, force=args.force)
+
+    for paths in files.values():
+        for path in paths.values():
+            print(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+# Modules are imported on first use, see Config.lazyImports
+from Config.lazyImports import lazyPackage
+
+__getattr__, __dir__ = lazyPackage(__name__, {
+    "aggregationCube": ["STATISTICS", "AggregationCube", "buildAggregationCube", "getAggregationCube"],
+    "incrementalKPI": ["GROUPINGS", "MEASURES", "groupKeys", "measureColumns", "SeenMovies", "moviesPath", "KPIState",
+                       "updateKPIState"],
+    "kpiAnalysis": ["rankColumn", "topK", "bottomK", "calculateProfit", "calculateROI", "calculateCentralTendency",
+                    "dataExist"],
+    "searchIndex": ["TEXT_COLUMNS", "NESTED_NAME_COLUMNS", "SearchIndex"],
+    "sketches": ["QuantileSketch", "FrequentItems", "newSketch", "sketchChunks"],
+    "sortIndex": ["SortedIndex", "sortedIndexFor"]
+})
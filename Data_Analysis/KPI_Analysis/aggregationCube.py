@@ -0,0 +1,181 @@
+import hashlib
+from collections import OrderedDict
+
+import pandas as pd
+
+from Config.instrumentation import instrumented
+from Data_Analysis.KPI_Analysis.incrementalKPI import GROUPINGS, MEASURES, groupKeys, measureColumns
+
+
+STATISTICS = ("count", "sum", "mean", "median", "min", "max", "std")
+
+# (fingerprint of the data, dimensions, measures, statistics) -> cube, most recently used last
+_CACHE = OrderedDict()
+_CACHE_SIZE = 8
+
+
+class AggregationCube:
+    """
+    Every statistic of every measure for every group of every dimension, in one table
+
+    The table is indexed by (dimension, group) and has a (measure, statistic) column for each
+    measure and statistic, so a report or a plot reads its numbers from it instead of grouping
+    the movies again
+
+    Parameters
+    ----------
+    table   :   pd.DataFrame
+            The table built by buildAggregationCube
+    """
+
+    def __init__(self, table: pd.DataFrame):
+        self.table = table
+
+    @property
+    def dimensions(self) -> list:
+        return self.table.index.get_level_values(0).unique().tolist()
+
+    def slice(self, dimension: str, measures=None, statistics=None) -> pd.DataFrame | pd.Series:
+        """
+        Returns the statistics of the groups of a dimension
+
+        Parameters
+        ----------
+        dimension   :   str
+                    "collection", "director", "genre" or "year"
+
+        measures    :   str or list
+                    Measure or measures to return. Defaults to all of them
+
+        statistics  :   str or list
+                    Statistic or statistics to return. Defaults to all of them
+
+        Returns
+        -------
+        pd.DataFrame or pd.Series
+            One row per group. Giving a single measure or statistic drops that column level, and
+            giving both returns a Series
+        """
+        if dimension not in self.dimensions:
+            raise ValueError(f"Dimension '{dimension}' not found in the cube. Must be one of: {self.dimensions}")
+
+        table = self.table.xs(dimension, level="dimension")
+        table.index.name = dimension
+
+        if measures is not None:
+            table = table.loc[:, (measures, slice(None))] if isinstance(measures, str) else \
+                table.loc[:, (list(measures), slice(None))]
+            table = table.droplevel("measure", axis=1) if isinstance(measures, str) else table
+
+        if statistics is not None:
+            if isinstance(measures, str):
+                table = table[statistics]
+            else:
+                table = table.loc[:, (slice(None), statistics if isinstance(statistics, str) else list(statistics))]
+                table = table.droplevel("statistic", axis=1) if isinstance(statistics, str) else table
+
+        # Drop the groups without any value for the measures asked
+        return table.dropna(how="all")
+
+
+#Defines a function that computes the statistics of the measures for every dimension
+@instrumented()
+def buildAggregationCube(data: pd.DataFrame, dimensions: tuple = GROUPINGS, measures: tuple = MEASURES,
+                         statistics: tuple = STATISTICS) -> AggregationCube:
+    """
+    Computes many statistics of many measures across collection membership, directors, genres
+    and release years at once
+
+    Each dimension is grouped once and every measure and statistic is aggregated by that single
+    groupby. Movies with several directors or genres count in each of their groups
+
+    Parameters
+    ----------
+    data    :   pd.DataFrame
+            The cleaned movies (budget_musd, revenue_musd, directors, genres, release_date, ...)
+
+    dimensions  :   tuple
+                Dimensions to group by, from GROUPINGS. Dimensions whose column is missing are skipped
+
+    measures    :   tuple
+                Columns to aggregate. profit and ROI are computed when missing
+
+    statistics  :   tuple
+                Statistics understood by DataFrameGroupBy.agg
+
+    Returns
+    -------
+    AggregationCube
+        The cube
+    """
+    values = measureColumns(data, measures)
+    tables = {}
+
+    for dimension in dimensions:
+        try:
+            keys = groupKeys(data, dimension)
+        except KeyError as error:
+            print(f"Column {error} not found in dataset. Skipping the {dimension} dimension.")
+            continue
+
+        rows = values.loc[keys.index].set_axis(keys.to_numpy(), axis=0)
+        tables[dimension] = rows.groupby(level=0).agg(list(statistics))
+
+    table = pd.concat(tables, names=["dimension", "group"])
+    table.columns.names = ["measure", "statistic"]
+
+    return AggregationCube(table)
+
+
+#Defines a function that returns the cube of the movies, computing it only when they change
+def getAggregationCube(data: pd.DataFrame, dimensions: tuple = GROUPINGS, measures: tuple = MEASURES,
+                       statistics: tuple = STATISTICS) -> AggregationCube:
+    """
+    Returns the aggregation cube of the movies from a cache keyed by a hash of their content
+
+    Reports and plots can call it freely on the same movies: the cube is built once and
+    rebuilt only when the columns it reads change. Takes the same parameters as buildAggregationCube
+    """
+    columns = [col for col in (*measures, "revenue_musd", "budget_musd", "belongs_to_collection.id",
+                               "directors", "genres", "release_date") if col in data.columns]
+    hashes = pd.util.hash_pandas_object(data[list(dict.fromkeys(columns))], index=True).to_numpy()
+
+    key = (hashlib.blake2b(hashes.tobytes(), digest_size=16).hexdigest(), tuple(dimensions),
+           tuple(measures), tuple(statistics))
+
+    if key in _CACHE:
+        _CACHE.move_to_end(key)
+        return _CACHE[key]
+
+    cube = _CACHE[key] = buildAggregationCube(data, dimensions, measures, statistics)
+    if len(_CACHE) > _CACHE_SIZE:
+        _CACHE.popitem(last=False)
+
+    return cube
+
+
+def main():
+    import os
+
+    from Data_Cleaning.extractColumn import extractColumnData
+    from Data_Cleaning.separateArray import separateArray
+
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    data = pd.read_csv(os.path.join(project_root, "data", "movieData.csv"))
+
+    data["budget_musd"] = data["budget"] / 1e6
+    data["revenue_musd"] = data["revenue"] / 1e6
+    data = separateArray(data, columns={"genres": "name"})
+    data = extractColumnData(data, column="credits.crew", columnName="directors", columnKey="job",
+                             columnValue="Director")
+
+    cube = getAggregationCube(data)
+
+    print(cube.slice("collection", statistics="mean"))
+    print(cube.slice("genre", "ROI", ["count", "median"]))
+    print(cube.slice("year", "revenue_musd", "mean"))
+    print(getAggregationCube(data) is cube)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+import json
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from Data_Analysis.KPI_Analysis.sketches import QuantileSketch
+
+
+GROUPINGS = ("collection", "director", "genre", "year")
+
+MEASURES = ("budget_musd", "revenue_musd", "profit", "ROI", "popularity", "vote_average", "vote_count")
+
+
+#Defines a function that returns the group of each movie for a grouping
+def groupKeys(data: pd.DataFrame, grouping: str) -> pd.Series:
+    """
+    Returns the groups of the movies for a grouping, one row per movie and group
+
+    collection  :   "Franchise" or "Standalone" from belongs_to_collection.id
+    director    :   each name in the directors column (", " separated)
+    genre       :   each genre in the genres column (" | " separated)
+    year        :   the year of release_date
+
+    Movies in several groups (co-directed, several genres) appear once per group, with their index
+    repeated. Movies without a group are left out
+    """
+    if grouping == "collection":
+        return pd.Series(np.where(data["belongs_to_collection.id"].notna(), "Franchise", "Standalone"),
+                         index=data.index)
+
+    if grouping == "director":
+        return data["directors"].dropna().str.split(",").explode().str.strip().replace("", np.nan).dropna()
+
+    if grouping == "genre":
+        return data["genres"].dropna().str.split("|").explode().str.strip().replace("", np.nan).dropna()
+
+    if grouping == "year":
+        return pd.to_datetime(data["release_date"], errors="coerce").dt.year.dropna().astype(int)
+
+    raise ValueError(f"Invalid grouping '{grouping}'. Must be one of: {list(GROUPINGS)}")
+
+
+#Defines a function that returns the measures of the movies as float columns
+def measureColumns(data: pd.DataFrame, measures: tuple = MEASURES) -> pd.DataFrame:
+    """
+    Returns the measures of the movies as float64 columns
+
+    profit and ROI are computed from revenue_musd and budget_musd when the data does not have
+    them. ROI is then revenue / budget, missing when the budget is 0. Measures that are missing
+    and cannot be computed are left out
+    """
+    values = pd.DataFrame(index=data.index)
+
+    for measure in measures:
+        if measure in data.columns:
+            values[measure] = pd.to_numeric(data[measure], errors="coerce")
+        elif measure == "profit" and {"revenue_musd", "budget_musd"} <= set(data.columns):
+            values[measure] = data["revenue_musd"] - data["budget_musd"]
+        elif measure == "ROI" and {"revenue_musd", "budget_musd"} <= set(data.columns):
+            values[measure] = data["revenue_musd"] / data["budget_musd"].where(data["budget_musd"] != 0)
+
+    return values.astype("float64")
+
+
+class SeenMovies:
+    """
+    Keeps the ids of the movies counted by a KPIState in a SQLite file next to its JSON file
+
+    Checking and adding a batch only reads and writes the ids of the batch, so saving and loading
+    the state does not grow with the movies already counted. Every id is stored with the generation
+    of the state that counted it: the ids are committed before the JSON file is replaced, and the
+    ids of a generation the JSON file never reached (a save interrupted in between) are removed
+    when the state is loaded
+
+    Parameters
+    ----------
+    path    :   str
+            Path of the SQLite file. It is created if missing
+    """
+
+    # Stays under the number of parameters older SQLite versions allow in a statement
+    CHUNK = 900
+
+    def __init__(self, path: str):
+        movies_dir = os.path.dirname(path)
+        if movies_dir and not os.path.exists(movies_dir):
+            os.makedirs(movies_dir)
+
+        self.path = path
+        self._connection = sqlite3.connect(path)
+
+        # WAL with a full sync keeps the ids committed before the JSON file is replaced
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS movies (
+                movie_id PRIMARY KEY,
+                generation INTEGER NOT NULL
+            ) WITHOUT ROWID
+            """
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS movies_generation ON movies (generation)")
+        self._connection.commit()
+
+    def seen(self, movie_ids: list) -> set:
+        """
+        Returns the ids of movie_ids that are stored
+        """
+        seen = set()
+
+        for start in range(0, len(movie_ids), self.CHUNK):
+            chunk = movie_ids[start:start + self.CHUNK]
+            seen.update(movie_id for (movie_id,) in self._connection.execute(
+                f"SELECT movie_id FROM movies WHERE movie_id IN ({', '.join('?' * len(chunk))})", chunk
+            ))
+
+        return seen
+
+    def add(self, movie_ids, generation: int) -> None:
+        """
+        Stores movie ids counted by a generation of the state
+        """
+        self._connection.executemany("INSERT OR IGNORE INTO movies VALUES (?, ?)",
+                                     ((movie_id, generation) for movie_id in movie_ids))
+        self._connection.commit()
+
+    def rollback(self, generation: int) -> None:
+        """
+        Removes the ids stored by generations after generation
+        """
+        self._connection.execute("DELETE FROM movies WHERE generation > ?", (generation,))
+        self._connection.commit()
+
+    def copy(self, path: str) -> "SeenMovies":
+        """
+        Copies the ids to a new SQLite file and returns it
+        """
+        if os.path.exists(path):
+            os.remove(path)
+
+        movies = SeenMovies(path)
+        self._connection.backup(movies._connection)
+
+        return movies
+
+    def __len__(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM movies").fetchone()[0]
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+#Defines a function that returns the path of the SQLite file holding the movie ids of a state
+def moviesPath(path: str) -> str:
+    """
+    Returns the SQLite file next to the JSON file of a state, kpiState.json -> kpiState.movies.sqlite
+    """
+    return os.path.splitext(path)[0] + ".movies.sqlite"
+
+
+class KPIState:
+    """
+    Running KPIs per group that are updated with each new batch of movies
+
+    For every grouping, group and measure the state keeps the count, sum, minimum, maximum and a
+    QuantileSketch of the values, so means, totals and medians are available without the movies
+    seen before. Updating with a batch only reads the batch, and the state can be saved and loaded
+    between runs. Movies already counted (by id) are skipped, so a batch can be replayed safely. The
+    ids are kept in SeenMovies next to the JSON file, which only holds the aggregates and sketches
+
+    profit and ROI are computed from revenue_musd and budget_musd when the batch does not have
+    them. ROI is revenue / budget, missing when the budget is 0, and is not rounded
+
+    Parameters
+    ----------
+    groupings   :   tuple
+                The groupings to keep, from GROUPINGS
+
+    measures    :   tuple
+                The columns to aggregate. Columns missing from a batch are skipped
+
+    relativeAccuracy    :   float
+                        The relative error of the quantiles
+
+    idColumn    :   str
+                The column holding the movie id
+    """
+
+    def __init__(self, groupings: tuple = GROUPINGS, measures: tuple = MEASURES,
+                 relativeAccuracy: float = 0.01, idColumn: str = "id"):
+        self.groupings = tuple(groupings)
+        self.measures = tuple(measures)
+        self.relativeAccuracy = relativeAccuracy
+        self.idColumn = idColumn
+
+        self.stats = {}     # (grouping, group, measure) -> {"count", "sum", "min", "max", "sketch"}
+        self.generation = 0     # The number of saves, the ids of later generations were never saved
+        self.movies = set()     # Ids counted since the last save
+        self.seenMovies = None  # Ids saved before, set by load and save
+
+    def update(self, batch: pd.DataFrame) -> int:
+        """
+        Adds a batch of movies to the KPIs
+
+        Returns
+        -------
+        int
+            The number of movies added, excluding the movies already counted
+        """
+        # Set and primary key lookups keep the check proportional to the batch, not to the movies already counted
+        ids = batch[self.idColumn]
+        saved = self.seenMovies.seen(ids.tolist()) if self.seenMovies is not None else set()
+        new = ~np.fromiter((movie in self.movies or movie in saved for movie in ids.tolist()), dtype=bool,
+                           count=len(ids)) & ~ids.duplicated().to_numpy()
+
+        if not new.all():
+            print(f"Skipping {int((~new).sum())} movies already counted.")
+
+        batch = batch[new]
+        values = measureColumns(batch, self.measures)
+
+        for grouping in self.groupings:
+            keys = groupKeys(batch, grouping)
+            rows = values.loc[keys.index].set_axis(keys.to_numpy(), axis=0)
+
+            for measure in values.columns:
+                column = rows[measure].dropna()
+                grouped = column.groupby(level=0)
+                aggregates = grouped.agg(["count", "sum", "min", "max"])
+
+                for group, count, total, low, high in aggregates.itertuples():
+                    stats = self._stats(grouping, group, measure)
+                    stats["count"] += int(count)
+                    stats["sum"] += float(total)
+                    stats["min"] = min(stats["min"], float(low))
+                    stats["max"] = max(stats["max"], float(high))
+
+                for group, groupValues in grouped:
+                    self.stats[(grouping, group, measure)]["sketch"].add(groupValues.to_numpy())
+
+        self.movies.update(batch[self.idColumn].tolist())
+
+        return len(batch)
+
+    def summary(self, grouping: str, measure: str) -> pd.DataFrame:
+        """
+        Returns the count, sum, mean, min, median and max of a measure for each group of a grouping
+        """
+        rows = {
+            group: {"count": stats["count"], "sum": stats["sum"], "mean": stats["sum"] / stats["count"],
+                    "min": stats["min"], "median": stats["sketch"].quantile(0.5), "max": stats["max"]}
+            for (statsGrouping, group, statsMeasure), stats in self.stats.items()
+            if statsGrouping == grouping and statsMeasure == measure and stats["count"]
+        }
+
+        summary = pd.DataFrame.from_dict(rows, orient="index",
+                                         columns=["count", "sum", "mean", "min", "median", "max"])
+        summary.index.name = grouping
+
+        return summary.sort_index()
+
+    def quantile(self, grouping: str, group, measure: str, q: float) -> float:
+        """
+        Returns the q-th quantile (0 to 1) of a measure in a group, NaN if the group is unknown
+        """
+        stats = self.stats.get((grouping, group, measure))
+
+        return stats["sketch"].quantile(q) if stats is not None else np.nan
+
+    def save(self, path: str) -> None:
+        """
+        Saves the state to a JSON file, replacing it atomically, and adds the ids counted since the
+        last save to the SQLite file next to it
+        """
+        output_dir = os.path.dirname(path)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+
+        if self.seenMovies is None:
+            # A new state replaces whatever state was saved at path before
+            self.seenMovies = SeenMovies(moviesPath(path))
+            self.seenMovies.rollback(self.generation)
+        elif os.path.abspath(self.seenMovies.path) != os.path.abspath(moviesPath(path)):
+            seenMovies = self.seenMovies.copy(moviesPath(path))
+            self.seenMovies.close()
+            self.seenMovies = seenMovies
+
+        self.generation += 1
+        self.seenMovies.add(self.movies, self.generation)
+        self.movies = set()
+
+        state = {
+            "groupings": self.groupings,
+            "measures": self.measures,
+            "relativeAccuracy": self.relativeAccuracy,
+            "idColumn": self.idColumn,
+            "generation": self.generation,
+            "stats": [[grouping, group, measure, {**stats, "sketch": stats["sketch"].toDict()}]
+                      for (grouping, group, measure), stats in self.stats.items()]
+        }
+
+        with open(path + ".tmp", "w") as file:
+            json.dump(state, file)
+
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "KPIState":
+        """
+        Loads a state saved with save, or returns a new state built with kwargs if there is no file
+        """
+        if not os.path.exists(path):
+            return cls(**kwargs)
+
+        with open(path) as file:
+            state = json.load(file)
+
+        kpis = cls(state["groupings"], state["measures"], state["relativeAccuracy"], state["idColumn"])
+        kpis.generation = state.get("generation", 0)
+        kpis.seenMovies = SeenMovies(moviesPath(path))
+        kpis.seenMovies.rollback(kpis.generation)
+
+        # States saved before the ids moved to SQLite list them, they are stored with the next save
+        kpis.movies = set(state.get("movies", []))
+
+        for grouping, group, measure, stats in state["stats"]:
+            kpis.stats[(grouping, group, measure)] = {**stats, "sketch": QuantileSketch.fromDict(stats["sketch"])}
+
+        return kpis
+
+    def close(self) -> None:
+        """
+        Closes the SQLite file of the movie ids
+        """
+        if self.seenMovies is not None:
+            self.seenMovies.close()
+            self.seenMovies = None
+
+    def _stats(self, grouping: str, group, measure: str) -> dict:
+        key = (grouping, group, measure)
+
+        if key not in self.stats:
+            self.stats[key] = {"count": 0, "sum": 0.0, "min": np.inf, "max": -np.inf,
+                               "sketch": QuantileSketch(self.relativeAccuracy)}
+
+        return self.stats[key]
+
+
+#Defines a function that adds a batch of movies to the KPI state saved at a path
+def updateKPIState(path: str, batch: pd.DataFrame, **kwargs) -> KPIState:
+    """
+    Loads the KPI state saved at path (or starts a new one), adds the batch and saves it back
+
+    Parameters
+    ----------
+    path    :   str
+            The JSON file holding the state, the movie ids are kept next to it (see moviesPath)
+
+    batch   :   pd.DataFrame
+            The new movies, cleaned as in the notebook (budget_musd, revenue_musd, directors, ...)
+
+    kwargs  :
+            Options of a new KPIState
+
+    Returns
+    -------
+    KPIState
+        The updated state
+    """
+    kpis = KPIState.load(path, **kwargs)
+    kpis.update(batch)
+    kpis.save(path)
+
+    return kpis
+
+
+def main():
+    import tempfile
+
+    rng = np.random.default_rng(0)
+    rows = 10000
+    movies = pd.DataFrame({
+        "id": np.arange(rows),
+        "belongs_to_collection.id": np.where(rng.random(rows) < 0.3, 1.0, np.nan),
+        "directors": rng.choice(["James Cameron", "Joss Whedon", "Joe Russo, Anthony Russo"], rows),
+        "genres": rng.choice(["Action|Adventure", "Drama", "Science Fiction|Action"], rows),
+        "release_date": pd.to_datetime(rng.integers(2000, 2020, rows).astype(str)),
+        "budget_musd": rng.uniform(1, 300, rows).round(1),
+        "revenue_musd": rng.uniform(0, 2000, rows).round(1),
+        "vote_average": rng.uniform(0, 10, rows).round(1)
+    })
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "kpiState.json")
+
+        for start in range(0, rows, 2000):
+            updateKPIState(path, movies.iloc[start:start + 2000]).close()
+
+        kpis = updateKPIState(path, movies.iloc[:2000])
+        print(f"movies counted: {len(kpis.seenMovies)} | state file: {os.path.getsize(path)} bytes")
+
+        print(kpis.summary("collection", "revenue_musd"))
+        print(kpis.summary("director", "ROI"))
+        print(movies.groupby(groupKeys(movies, "collection"))["revenue_musd"].agg(["count", "sum", "mean", "median"]))
+
+        kpis.close()
+
+
+if __name__ == "__main__":
+    main()
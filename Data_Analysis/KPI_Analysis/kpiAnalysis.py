@@ -1,6 +1,21 @@
+import re
+
+import numpy as np
 import pandas as pd
 from pandas.core.groupby.generic import DataFrameGroupBy
 
+try:
+    from Config.instrumentation import instrumented
+except ModuleNotFoundError:
+    # Run as a script, without the project root on sys.path: the functions are not measured
+    def instrumented(stage=None, metrics=None):
+        return lambda function: function
+
+
+# Characters that make a keyword a regular expression rather than plain text
+_REGEX_CHARACTERS = re.compile(r"[.^$*+?{}\[\]\\|()]")
+
+@instrumented()
 def rankColumn(data: pd.DataFrame, column: str, order: str = "asc") -> pd.DataFrame:
     """
     Ranks movies using a specified column and order.
@@ -44,7 +59,105 @@ def rankColumn(data: pd.DataFrame, column: str, order: str = "asc") -> pd.DataFr
 
     return data
 
+#Defines a function that returns the top k movies without sorting the whole frame
+@instrumented()
+def topK(data: pd.DataFrame, columns: str | list, k: int = 10, order: str | list = "desc",
+         returnIndex: bool = False) -> pd.DataFrame | pd.Index:
+    """
+    Returns the k best ranked movies without sorting or modifying data
+
+    The candidates are selected with a partial selection (np.partition) on the first column, which
+    is O(n), and only the candidates are sorted with the other columns as tie breakers. Missing
+    values are ranked last whatever the order, and rows that tie on every column keep their order
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The movies. It is left untouched
+
+    columns : str or list
+        Column or columns to rank by, the first one taking precedence
+
+    k : int
+        Number of movies to return
+
+    order : str or list
+        Sorting order: 'asc' or 'desc', or one order per column
+
+    returnIndex : bool
+        Returns the index labels of the movies instead of the rows
+
+    Returns
+    -------
+    pd.DataFrame or pd.Index
+        The k movies in rank order, with their original index
+    """
+    columns = [columns] if isinstance(columns, str) else list(columns)
+    orders = [order] * len(columns) if isinstance(order, str) else list(order)
+
+    # Validate columns and orders
+    for column in columns:
+        if column not in data.columns:
+            raise ValueError(f"Column '{column}' not found in DataFrame.")
+
+    if len(orders) != len(columns):
+        raise ValueError("Give one order per column.")
+
+    orders = [o.lower() if o.lower() in ["asc", "desc"] else "asc" for o in orders]
+
+    # Each column becomes an ascending float key and a missing value mask
+    keys = [_rankKey(data[column], o) for column, o in zip(columns, orders)]
+    k = max(min(k, len(data)), 0)
+
+    key, missing = keys[0]
+    valid = np.flatnonzero(~missing)
+
+    # Every row tying with the k-th value is a candidate so the tie breakers can decide
+    if len(valid) > k:
+        kth = np.partition(key[valid], k - 1)[k - 1] if k else -np.inf
+        candidates = valid[key[valid] <= kth]
+    else:
+        candidates = np.arange(len(data))
+
+    # np.lexsort sorts by the last key first and is stable
+    sortKeys = []
+    for key, missing in reversed(keys):
+        sortKeys += [np.where(missing, 0, key)[candidates], missing[candidates]]
+
+    positions = candidates[np.lexsort(sortKeys)][:k]
+
+    if returnIndex:
+        return data.index[positions]
+
+    return data.iloc[positions]
+
+
+#Defines a function that returns the bottom k movies without sorting the whole frame
+@instrumented()
+def bottomK(data: pd.DataFrame, columns: str | list, k: int = 10, returnIndex: bool = False) -> pd.DataFrame | pd.Index:
+    """
+    Returns the k lowest ranked movies, like topK with the 'asc' order on every column
+    """
+    return topK(data, columns, k=k, order="asc", returnIndex=returnIndex)
+
+
+def _rankKey(series: pd.Series, order: str):
+    # Numbers and dates rank by value, anything else by its sorted position
+    missing = series.isna().to_numpy()
+
+    if pd.api.types.is_datetime64_any_dtype(series):
+        key = series.array.asi8.astype("float64")
+    elif pd.api.types.is_numeric_dtype(series):
+        key = series.to_numpy(dtype="float64", na_value=np.nan)
+    else:
+        key = pd.factorize(series, sort=True)[0].astype("float64")
+
+    key = np.where(missing, 0, key)
+
+    return (-key if order == "desc" else key), missing
+
 #Defines a function that calculates the profit
+@instrumented()
 def calculateProfit(data:pd.DataFrame, revenueColumn: str, budgetColumn: str) -> pd.DataFrame:
     """
     Calculates the profit for every movie using the revenue and budget columns and creates a 
@@ -77,6 +190,7 @@ def calculateProfit(data:pd.DataFrame, revenueColumn: str, budgetColumn: str) ->
     data["profit"] = data[revenueColumn] - data[budgetColumn]
     return data
 
+@instrumented()
 def calculateROI(data: pd.DataFrame, revenueColumn: str, budgetColumn: str) -> pd.DataFrame:
     """
     Docstring for calculateROI
@@ -101,7 +215,10 @@ def calculateROI(data: pd.DataFrame, revenueColumn: str, budgetColumn: str) -> p
     return data
 
 #Defines a function that calculates central tendency (mean, mode and median of a given column)
-def calculateCentralTendency(data: pd.DataFrame | DataFrameGroupBy, column: str, measure: str) -> pd.Series | str:
+@instrumented()
+def calculateCentralTendency(data: pd.DataFrame | DataFrameGroupBy, column: str, measure: str,
+                             approximate: bool = False, relativeAccuracy: float = 0.01,
+                             capacity: int = 1000) -> pd.Series | str:
     """
     Docstring for calculateCentralTendency
     
@@ -111,6 +228,13 @@ def calculateCentralTendency(data: pd.DataFrame | DataFrameGroupBy, column: str,
     :type column: str
     :param measure: Description
     :type measure: str
+    :param approximate: Computes the median and mode with bounded memory sketches (QuantileSketch
+        and FrequentItems) instead of sorting or counting every value. The mode is a single value
+    :type approximate: bool
+    :param relativeAccuracy: Relative error of the approximate median
+    :type relativeAccuracy: float
+    :param capacity: Number of values counted for the approximate mode
+    :type capacity: int
     :return: Description
     :rtype: Series[Any]
     """
@@ -133,13 +257,33 @@ def calculateCentralTendency(data: pd.DataFrame | DataFrameGroupBy, column: str,
     if measure not in valid_measures:
         return f"Invalid measure '{measure}'. Must be one of: {valid_measures}"
 
+    # Sketches give the median and mode in bounded memory, the mean is already a single pass
+    if approximate and measure != "mean":
+        from Data_Analysis.KPI_Analysis.sketches import newSketch
+
+        def summarise(values):
+            sketch = newSketch(measure, relativeAccuracy, capacity)
+            sketch.add(values.to_numpy())
+
+            return getattr(sketch, measure)()
+
+        if isinstance(data, DataFrameGroupBy):
+            return pd.Series({group: summarise(values) for group, values in data[column]}, name=column)
+
+        return summarise(data[column])
+
+    # Grouped columns have no mode method, so the modes of each group are listed
+    if isinstance(data, DataFrameGroupBy) and measure == "mode":
+        return pd.Series({group: values.mode().tolist() for group, values in data[column]}, name=column)
+
     # Perform calculation
     return getattr(data[column], measure)()
 
 
 
 #Defines a function that checks if a specific data exists in the dataFrame
-def dataExist(data: pd.DataFrame, keyword: str) -> bool:
+@instrumented()
+def dataExist(data: pd.DataFrame, keyword: str, index=None) -> bool:
     """
     Docstring for dataExist
     
@@ -147,14 +291,30 @@ def dataExist(data: pd.DataFrame, keyword: str) -> bool:
     :type data: pd.DataFrame
     :param keyword: Description
     :type keyword: str
+    :param index: A SearchIndex built once over data, looked up instead of scanning the columns it
+        indexes. The other columns (release_date, budget, ...) are still scanned, and a keyword with
+        regular expression characters scans every column, as the index matches text literally.
+        Nested columns are only matched on the key the index holds (the names in credits.cast,
+        not the characters), so they can report fewer columns than the scan
+    :type index: SearchIndex
     :return: Description
     :rtype: bool
     """
 
-    cols = data.apply(lambda col: col.astype(str).str.contains(keyword, na=False).any())
+    if index is not None and not _REGEX_CHARACTERS.search(keyword):
+        found = set(index.columnsContaining(keyword))
+        scanned = [col for col in data.columns if col not in set(index.indexedColumns)]
+    else:
+        found, scanned = set(), list(data.columns)
+
+    if scanned:
+        cols = data[scanned].apply(lambda col: col.astype(str).str.contains(keyword, na=False).any())
+        found.update(cols[cols].index)
+
+    columns = [col for col in data.columns if col in found]
 
-    if len(cols[cols].index.tolist()) != 0:
-        print(f"The columns that have such data is/are \n{cols[cols].index.tolist()}")
+    if len(columns) != 0:
+        print(f"The columns that have such data is/are \n{columns}")
         return True
     else:
         print(f"None of the columns have the {keyword}")
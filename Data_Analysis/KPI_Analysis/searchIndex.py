@@ -0,0 +1,274 @@
+import re
+from bisect import bisect_left
+
+import pandas as pd
+
+from Data_Cleaning.parseNested import decodeNestedColumn
+
+
+# Free text columns indexed when no columns are given
+TEXT_COLUMNS = ("title", "original_title", "overview", "tagline", "directors", "belongs_to_collection.name")
+
+# Nested columns and the key whose values are indexed
+NESTED_NAME_COLUMNS = {"credits.cast": "name", "credits.crew": "name", "production_companies": "name",
+                       "genres": "name"}
+
+_WORD = re.compile(r"\w+")
+
+
+class SearchIndex:
+    """
+    An inverted index over the text and nested name columns of the movies
+
+    Every word of every indexed cell points to the columns and rows it appears in, and the words
+    themselves are indexed by their trigrams and kept sorted. A lookup only reads the postings of
+    the words that can match and checks the few candidate cells, instead of casting every column
+    to str and scanning the whole frame
+
+    Parameters
+    ----------
+    data    :   pd.DataFrame
+            Movies to index. More can be added later with add
+
+    columns :   list
+            Columns to index. Defaults to the TEXT_COLUMNS and NESTED_NAME_COLUMNS in the data
+
+    nestedColumns   :   dict
+                    Nested columns as key value pairs of column and the key whose values are
+                    indexed. Defaults to NESTED_NAME_COLUMNS
+    """
+
+    def __init__(self, data: pd.DataFrame = None, columns: list = None, nestedColumns: dict = None):
+        self.columns = list(columns) if columns is not None else None
+        self.nestedColumns = dict(NESTED_NAME_COLUMNS if nestedColumns is None else nestedColumns)
+
+        self._text = {}         # column -> {row: text}
+        self._postings = {}     # word -> {column: set of rows}
+        self._grams = {}        # trigram -> set of words
+        self._order = {}        # row -> insertion order, to return rows in a stable order
+        self._sorted = []       # words in sorted order for prefix lookups
+        self._dirty = False
+
+        if data is not None:
+            self.add(data)
+
+    def add(self, data: pd.DataFrame) -> None:
+        """
+        Indexes the rows of data. Rows whose label is already indexed are replaced
+        """
+        columns = self.columns if self.columns is not None else \
+            [col for col in (*TEXT_COLUMNS, *self.nestedColumns) if col in data.columns]
+
+        for label in data.index:
+            self._order.setdefault(label, len(self._order))
+
+        for col in columns:
+            if col not in data.columns:
+                print(f"Column '{col}' not found in dataset. Skipping.")
+                continue
+
+            texts = self._text.setdefault(col, {})
+
+            for label, text in zip(data.index, self._columnText(data, col)):
+                if label in texts:
+                    self._removeCell(col, label)
+
+                if text:
+                    texts[label] = text
+
+                    for word in set(_WORD.findall(text.lower())):
+                        self._addWord(word, col, label)
+
+    def remove(self, labels) -> None:
+        """
+        Removes rows from the index
+        """
+        for col, texts in self._text.items():
+            for label in labels:
+                if label in texts:
+                    self._removeCell(col, label)
+
+        for label in labels:
+            self._order.pop(label, None)
+
+    def search(self, keyword: str, mode: str = "substring", caseSensitive: bool = True) -> dict:
+        """
+        Finds the cells containing a keyword
+
+        Parameters
+        ----------
+        keyword :   str
+                The text to look for
+
+        mode    :   str
+                "substring" finds the keyword anywhere in a cell, like str.contains without regex.
+                "prefix" finds it at the start of a word, so "Tarant" matches Quentin Tarantino
+
+        caseSensitive   :   bool
+                        Whether the case of the keyword must match
+
+        Returns
+        -------
+        dict
+            The rows containing the keyword by column, for the columns that have any
+        """
+        if mode not in ("substring", "prefix"):
+            raise ValueError(f"Invalid mode '{mode}'. Must be one of: ['substring', 'prefix']")
+
+        pieces = _WORD.findall(keyword.lower())
+
+        # Only cells holding a word that contains every piece of the keyword can match
+        candidates = None
+
+        for i, piece in enumerate(pieces):
+            words = self._wordsStartingWith(piece) if mode == "prefix" and i == 0 and keyword[:1].isalnum() \
+                else self._wordsContaining(piece)
+            rows = self._rows(words)
+
+            candidates = rows if candidates is None else \
+                {col: candidates[col] & rows[col] for col in candidates.keys() & rows.keys()}
+
+        if candidates is None:
+            candidates = {col: set(texts) for col, texts in self._text.items()}
+
+        flags = 0 if caseSensitive else re.IGNORECASE
+        pattern = re.compile(("(?<!\\w)" if mode == "prefix" else "") + re.escape(keyword), flags)
+
+        result = {}
+        for col, rows in candidates.items():
+            texts = self._text[col]
+            found = [row for row in rows if pattern.search(texts[row])]
+
+            if found:
+                result[col] = sorted(found, key=self._order.__getitem__)
+
+        return result
+
+    @property
+    def indexedColumns(self) -> list:
+        """
+        The columns indexed so far. Nested columns are only indexed by the values of their key
+        """
+        return list(self._text)
+
+    def columnsContaining(self, keyword: str, **kwargs) -> list:
+        """
+        Returns the columns with at least one cell containing the keyword
+        """
+        return list(self.search(keyword, **kwargs))
+
+    def rowsContaining(self, keyword: str, **kwargs) -> list:
+        """
+        Returns the rows with at least one indexed cell containing the keyword
+        """
+        rows = set().union(*self.search(keyword, **kwargs).values())
+
+        return sorted(rows, key=self._order.__getitem__)
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def _columnText(self, data: pd.DataFrame, col: str) -> list:
+        if col not in self.nestedColumns:
+            return [value if isinstance(value, str) else None if pd.isna(value) else str(value)
+                    for value in data[col]]
+
+        key = self.nestedColumns[col]
+        texts = []
+
+        # Columns already flattened by separateArray are indexed as they are
+        for value, items in zip(data[col], decodeNestedColumn(data[col], col)):
+            if items is not None:
+                names = [str(item[key]) for item in items if isinstance(item, dict) and item.get(key) is not None]
+                texts.append(" | ".join(names) if names else None)
+            else:
+                texts.append(value if isinstance(value, str) else None)
+
+        return texts
+
+    def _addWord(self, word: str, col: str, row) -> None:
+        postings = self._postings.get(word)
+
+        if postings is None:
+            postings = self._postings[word] = {}
+            self._dirty = True
+
+            for gram in _trigrams(word):
+                self._grams.setdefault(gram, set()).add(word)
+
+        postings.setdefault(col, set()).add(row)
+
+    def _removeCell(self, col: str, row) -> None:
+        text = self._text[col].pop(row)
+
+        for word in set(_WORD.findall(text.lower())):
+            postings = self._postings[word]
+            postings[col].discard(row)
+
+            if not postings[col]:
+                del postings[col]
+
+            if not postings:
+                del self._postings[word]
+                self._dirty = True
+
+                for gram in _trigrams(word):
+                    self._grams[gram].discard(word)
+
+                    if not self._grams[gram]:
+                        del self._grams[gram]
+
+    def _wordsContaining(self, piece: str) -> list:
+        grams = _trigrams(piece)
+
+        # Pieces shorter than a trigram are checked against every word
+        if not grams:
+            return [word for word in self._postings if piece in word]
+
+        sets = sorted((self._grams.get(gram, set()) for gram in grams), key=len)
+        return [word for word in sets[0].intersection(*sets[1:]) if piece in word]
+
+    def _wordsStartingWith(self, prefix: str) -> list:
+        if self._dirty:
+            self._sorted = sorted(self._postings)
+            self._dirty = False
+
+        words = []
+        for i in range(bisect_left(self._sorted, prefix), len(self._sorted)):
+            if not self._sorted[i].startswith(prefix):
+                break
+
+            words.append(self._sorted[i])
+
+        return words
+
+    def _rows(self, words: list) -> dict:
+        rows = {}
+
+        for word in words:
+            for col, postings in self._postings[word].items():
+                rows.setdefault(col, set()).update(postings)
+
+        return rows
+
+
+def _trigrams(word: str) -> set:
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+def main():
+    import os
+
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    data = pd.read_csv(os.path.join(project_root, "data", "movieData.csv"))
+
+    index = SearchIndex(data.iloc[:10])
+    index.add(data.iloc[10:])
+
+    print(index.search("Robert Downey"))
+    print(index.columnsContaining("Tarant", mode="prefix"))
+    print(index.rowsContaining("marvel", caseSensitive=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+
+class QuantileSketch:
+    """
+    A mergeable quantile sketch with a relative error guarantee (DDSketch)
+
+    Values are counted in logarithmic buckets, so any quantile is returned within
+    relativeAccuracy of the exact value (1% by default) whatever the number of values added.
+    Sketches with the same accuracy merge exactly, so the sketch of a group can be updated with
+    each new batch, or the sketches of chunks and processes combined, without the original values
+
+    Memory is bounded by maxBuckets per sign. The default covers values spanning more than 17
+    orders of magnitude at 1%; beyond that the buckets closest to zero are merged, which only
+    affects the accuracy of the values closest to zero. Infinite values (ROI with a budget of 0)
+    have no bucket: they are counted apart and rank below or above every finite value
+
+    Parameters
+    ----------
+    relativeAccuracy    :   float
+                        The relative error allowed on the quantiles, between 0 and 1
+
+    maxBuckets  :   int
+                The maximum number of buckets kept for the positive and for the negative values
+    """
+
+    def __init__(self, relativeAccuracy: float = 0.01, maxBuckets: int = 2048):
+        if not 0 < relativeAccuracy < 1:
+            raise ValueError("relativeAccuracy must be between 0 and 1.")
+
+        self.relativeAccuracy = relativeAccuracy
+        self.maxBuckets = maxBuckets
+        self.gamma = (1 + relativeAccuracy) / (1 - relativeAccuracy)
+        self._logGamma = math.log(self.gamma)
+
+        self.positive = {}      # bucket -> count of values > 0
+        self.negative = {}      # bucket -> count of values < 0, bucketed by their absolute value
+        self.zeros = 0
+        self.infinities = [0, 0]    # count of -inf and of +inf
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, values) -> None:
+        """
+        Adds a value or an array of values. Missing values are ignored
+        """
+        values = np.asarray(values, dtype="float64").ravel()
+        values = values[~np.isnan(values)]
+
+        if not len(values):
+            return
+
+        finite = np.isfinite(values)
+        if not finite.all():
+            self.infinities[0] += int(np.count_nonzero(values == -np.inf))
+            self.infinities[1] += int(np.count_nonzero(values == np.inf))
+
+        self._addBuckets(self.positive, values[finite & (values > 0)])
+        self._addBuckets(self.negative, -values[finite & (values < 0)])
+
+        self.zeros += int(np.count_nonzero(values == 0))
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def merge(self, other: "QuantileSketch") -> None:
+        """
+        Adds the values counted by another sketch with the same relative accuracy
+        """
+        if other.relativeAccuracy != self.relativeAccuracy:
+            raise ValueError("Only sketches with the same relative accuracy can be merged.")
+
+        for buckets, otherBuckets in ((self.positive, other.positive), (self.negative, other.negative)):
+            for bucket, count in otherBuckets.items():
+                buckets[bucket] = buckets.get(bucket, 0) + count
+
+            self._collapse(buckets)
+
+        self.zeros += other.zeros
+        self.infinities = [self.infinities[0] + other.infinities[0], self.infinities[1] + other.infinities[1]]
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        """
+        Returns the q-th quantile (0 to 1) of the values added, NaN if there are none
+
+        The value returned is within relativeAccuracy of the value at rank q * (count - 1) rounded
+        down. Unlike pandas, the two middle values of an even count are not averaged
+        """
+        if not self.count:
+            return math.nan
+
+        rank = q * (self.count - 1)
+        seen = self.infinities[0]
+
+        if seen > rank:
+            return -math.inf
+
+        # From the most negative value to the largest one
+        for bucket in sorted(self.negative, reverse=True):
+            seen += self.negative[bucket]
+            if seen > rank:
+                return self._clamp(-self._value(bucket))
+
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+
+        for bucket in sorted(self.positive):
+            seen += self.positive[bucket]
+            if seen > rank:
+                return self._clamp(self._value(bucket))
+
+        return math.inf if self.infinities[1] else self.max
+
+    def median(self) -> float:
+        """
+        Returns the median of the values added
+        """
+        return self.quantile(0.5)
+
+    def toDict(self) -> dict:
+        """
+        Returns the sketch as a JSON serializable dict
+        """
+        return {
+            "relativeAccuracy": self.relativeAccuracy,
+            "maxBuckets": self.maxBuckets,
+            "positive": [list(self.positive), list(self.positive.values())],
+            "negative": [list(self.negative), list(self.negative.values())],
+            "zeros": self.zeros,
+            "infinities": self.infinities,
+            "count": self.count,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None
+        }
+
+    @classmethod
+    def fromDict(cls, state: dict) -> "QuantileSketch":
+        """
+        Rebuilds a sketch saved with toDict
+        """
+        sketch = cls(state["relativeAccuracy"], state.get("maxBuckets", 2048))
+        sketch.positive = dict(zip(*state["positive"]))
+        sketch.negative = dict(zip(*state["negative"]))
+        sketch.zeros = state["zeros"]
+        sketch.infinities = list(state.get("infinities", [0, 0]))
+        sketch.count = state["count"]
+
+        if sketch.count:
+            sketch.min = state["min"]
+            sketch.max = state["max"]
+
+        return sketch
+
+    def _addBuckets(self, buckets: dict, values: np.ndarray) -> None:
+        if not len(values):
+            return
+
+        keys, counts = np.unique(np.ceil(np.log(values) / self._logGamma).astype("int64"), return_counts=True)
+
+        for bucket, count in zip(keys.tolist(), counts.tolist()):
+            buckets[bucket] = buckets.get(bucket, 0) + count
+
+        self._collapse(buckets)
+
+    def _collapse(self, buckets: dict) -> None:
+        # Merges the buckets closest to zero until maxBuckets are left
+        if len(buckets) <= self.maxBuckets:
+            return
+
+        keys = sorted(buckets)
+        kept = keys[len(keys) - self.maxBuckets]
+
+        buckets[kept] += sum(buckets.pop(bucket) for bucket in keys[:len(keys) - self.maxBuckets])
+
+    def _value(self, bucket: int) -> float:
+        # The middle of the bucket, within relativeAccuracy of every value in it
+        return 2 * self.gamma ** bucket / (self.gamma + 1)
+
+    def _clamp(self, value: float) -> float:
+        return min(max(value, self.min), self.max)
+
+
+class FrequentItems:
+    """
+    A mergeable sketch of the most frequent values (Space-Saving)
+
+    At most capacity values are counted. When more values are seen, the least counted ones are
+    dropped and a value arriving later starts from the smallest count kept, so the count of any
+    value is overestimated by at most count / capacity. Any value more frequent than that is
+    guaranteed to be kept, so the mode is exact whenever it stands out by more than the error.
+    Values are counted exactly with value_counts CHUNK at a time and merged, like a sketch from
+    another chunk, so adding a whole column never holds more than CHUNK values and capacity counts
+
+    Parameters
+    ----------
+    capacity    :   int
+                The number of values counted. The error on the counts is count / capacity
+    """
+
+    # The number of values counted at once by add
+    CHUNK = 100_000
+
+    def __init__(self, capacity: int = 1000):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1.")
+
+        self.capacity = capacity
+        self.counts = {}        # value -> estimated count
+        self.errors = {}        # value -> maximum overestimation of its count
+        self.count = 0
+
+    def add(self, values) -> None:
+        """
+        Adds a value or an array of values. Missing values are ignored
+        """
+        values = (values if isinstance(values, np.ndarray) else np.asarray(values, dtype=object)).ravel()
+
+        for start in range(0, len(values), self.CHUNK):
+            chunk = np.asarray(values[start:start + self.CHUNK], dtype=object)
+            counts = pd.Series(chunk).value_counts(dropna=True, sort=False)
+            counts = dict(zip(counts.index.tolist(), counts.tolist()))
+
+            self._merge(counts, dict.fromkeys(counts, 0), 0, sum(counts.values()))
+
+    def merge(self, other: "FrequentItems") -> None:
+        """
+        Adds the values counted by another sketch, keeping the capacity of this one
+        """
+        self._merge(other.counts, other.errors, other._floor(), other.count)
+
+    def mostFrequent(self, k: int = 10) -> list:
+        """
+        Returns the k most frequent values as (value, estimated count, maximum error) tuples
+        """
+        values = sorted(self.counts, key=self.counts.__getitem__, reverse=True)[:k]
+
+        return [(value, self.counts[value], self.errors[value]) for value in values]
+
+    def mode(self):
+        """
+        Returns the most frequent value, NaN if no value was added
+        """
+        return self.mostFrequent(1)[0][0] if self.counts else math.nan
+
+    def toDict(self) -> dict:
+        """
+        Returns the sketch as a JSON serializable dict (the values must be JSON serializable)
+        """
+        return {"capacity": self.capacity, "count": self.count,
+                "items": [[value, self.counts[value], self.errors[value]] for value in self.counts]}
+
+    @classmethod
+    def fromDict(cls, state: dict) -> "FrequentItems":
+        """
+        Rebuilds a sketch saved with toDict
+        """
+        sketch = cls(state["capacity"])
+        sketch.count = state["count"]
+
+        for value, count, error in state["items"]:
+            sketch.counts[value] = count
+            sketch.errors[value] = error
+
+        return sketch
+
+    def _floor(self) -> int:
+        # Values missing from a full sketch may have been counted up to its smallest count
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+
+    def _merge(self, otherCounts: dict, otherErrors: dict, otherFloor: int, otherCount: int) -> None:
+        selfFloor = self._floor()
+
+        counts, errors = {}, {}
+        for value in self.counts.keys() | otherCounts.keys():
+            counts[value] = self.counts.get(value, selfFloor) + otherCounts.get(value, otherFloor)
+            errors[value] = self.errors.get(value, selfFloor) + otherErrors.get(value, otherFloor)
+
+        # The dropped values were counted at most as much as the smallest value kept
+        kept = sorted(counts, key=counts.__getitem__, reverse=True)[:self.capacity]
+
+        self.counts = {value: counts[value] for value in kept}
+        self.errors = {value: errors[value] for value in kept}
+        self.count += otherCount
+
+
+#Defines a function that returns an empty sketch for a measure
+def newSketch(measure: str, relativeAccuracy: float = 0.01, capacity: int = 1000):
+    """
+    Returns a QuantileSketch for "median" or a FrequentItems for "mode"
+    """
+    measure = measure.lower()
+
+    if measure == "median":
+        return QuantileSketch(relativeAccuracy)
+
+    if measure == "mode":
+        return FrequentItems(capacity)
+
+    raise ValueError(f"Invalid measure '{measure}'. Must be one of: ['median', 'mode']")
+
+
+#Defines a function that sketches a column read in chunks
+def sketchChunks(chunks, column: str, measure: str, by: str = None, relativeAccuracy: float = 0.01,
+                 capacity: int = 1000):
+    """
+    Computes an approximate median or mode of a column without loading the whole data
+
+    Parameters
+    ----------
+    chunks  :   iterable of pd.DataFrame
+            The data, for example pd.read_csv(path, chunksize=100000)
+
+    column  :   str
+            The column to summarise
+
+    measure :   str
+            "median" or "mode"
+
+    by  :   str
+        A column to group by. Each group gets its own sketch
+
+    relativeAccuracy    :   float
+                        The relative error of the median
+
+    capacity    :   int
+                The number of values counted for the mode
+
+    Returns
+    -------
+    The median or mode, or a pd.Series of them by group
+    """
+    measure = measure.lower()
+    sketches = {}
+
+    for chunk in chunks:
+        groups = chunk.groupby(by, sort=False)[column] if by is not None else ((None, chunk[column]),)
+
+        for group, values in groups:
+            if group not in sketches:
+                sketches[group] = newSketch(measure, relativeAccuracy, capacity)
+
+            sketches[group].add(values.to_numpy())
+
+    if by is None:
+        return getattr(sketches.get(None, newSketch(measure, relativeAccuracy, capacity)), measure)()
+
+    return pd.Series({group: getattr(sketch, measure)() for group, sketch in sketches.items()},
+                     name=column).rename_axis(by).sort_index()
+
+
+def main():
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(3, 1.5, 1_000_000)
+
+    sketch = QuantileSketch()
+    for batch in np.array_split(values, 10):
+        part = QuantileSketch()
+        part.add(batch)
+        sketch.merge(part)
+
+    for q in (0.1, 0.5, 0.9, 0.99):
+        exact = np.quantile(values, q, method="lower")
+        print(f"q={q:<5} sketch {sketch.quantile(q):12.4f} | exact {exact:12.4f} | "
+              f"{len(sketch.positive)} buckets")
+
+    ratings = np.round(rng.normal(6.5, 1.2, 1_000_000), 1)
+    frequent = FrequentItems(capacity=50)
+    frequent.add(ratings)
+
+    print(f"mode sketch {frequent.mode()} | exact {pd.Series(ratings).mode()[0]} | "
+          f"top 3 {frequent.mostFrequent(3)}")
+
+
+if __name__ == "__main__":
+    main()
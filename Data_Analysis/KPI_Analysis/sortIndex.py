@@ -0,0 +1,310 @@
+import hashlib
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from Data_Analysis.KPI_Analysis.kpiAnalysis import _rankKey
+
+
+# id of a frame -> its SortedIndex, dropped when the frame is garbage collected
+_INDEXES = {}
+
+_OPERATORS = (">", ">=", "<", "<=", "==")
+
+
+class SortedIndex:
+    """
+    Caches the sort order of the columns of a frame for repeated ranking, percentile and range queries
+
+    The order of a column is computed with a stable argsort the first time a query needs it and
+    reused until that column changes. Each column is fingerprinted with a hash of its values, so
+    a query after data[column] was modified (or replaced) recomputes only that column. With
+    check=False the fingerprints are skipped and invalidate must be called after a modification
+
+    Missing values are ranked last in both directions, as in rankColumn and topK
+
+    Parameters
+    ----------
+    data    :   pd.DataFrame
+            The movies. Use sortedIndexFor to share one index per frame
+
+    check   :   bool
+            Whether to check the fingerprint of a column before using its cached order
+
+    weak    :   bool
+            Keep only a weak reference to the frame, so the index does not keep it alive. The
+            indexes of sortedIndexFor are weak, the index is dropped with its frame
+    """
+
+    def __init__(self, data: pd.DataFrame, check: bool = True, weak: bool = False):
+        self._data = weakref.ref(data) if weak else data
+        self.check = check
+        self._entries = {}      # column -> {"fingerprint", "asc", "desc", "values"}
+
+    @property
+    def data(self) -> pd.DataFrame:
+        data = self._frame()
+
+        if data is None:
+            raise ReferenceError("The frame of this SortedIndex was garbage collected.")
+
+        return data
+
+    def _frame(self) -> pd.DataFrame:
+        # The frame, or None once a weakly referenced frame was collected
+        return self._data() if isinstance(self._data, weakref.ref) else self._data
+
+    def invalidate(self, column: str = None) -> None:
+        """
+        Drops the cached orders of a column, or of every column
+        """
+        if column is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(column, None)
+
+    def order(self, column: str, order: str = "asc") -> np.ndarray:
+        """
+        Returns the positions of the rows sorted by a column, missing values last
+
+        Parameters
+        ----------
+        column  :   str
+                Column to sort by
+
+        order   :   str
+                Sorting order: 'asc' or 'desc'
+        """
+        order = order.lower() if order.lower() in ["asc", "desc"] else "asc"
+
+        return self._order(column, self._entry(column), order)
+
+    def rank(self, column: str, k: int = None, order: str = "desc", returnIndex: bool = False):
+        """
+        Returns the movies ranked by a column without sorting or modifying the frame
+
+        Parameters
+        ----------
+        column  :   str
+                Column to rank by
+
+        k   :   int
+            Number of movies to return. Defaults to all of them
+
+        order   :   str
+                Sorting order: 'asc' or 'desc'
+
+        returnIndex :   bool
+                    Returns the index labels instead of the rows
+
+        Returns
+        -------
+        pd.DataFrame or pd.Index
+            The movies in rank order, with their original index
+        """
+        positions = self.order(column, order)[:k]
+
+        return self.data.index[positions] if returnIndex else self.data.iloc[positions]
+
+    def filter(self, column: str, operator: str, value, returnIndex: bool = False):
+        """
+        Returns the movies whose column compares to a value, like data[data[column] > value]
+
+        The bounds are found with a binary search over the cached sorted values, so only the
+        matching rows are touched. The rows keep the order of the frame
+
+        Parameters
+        ----------
+        column  :   str
+                A numeric or datetime column
+
+        operator    :   str
+                    One of ">", ">=", "<", "<=" and "=="
+
+        value   :   number or date
+                The value to compare to
+
+        returnIndex :   bool
+                    Returns the index labels instead of the rows
+        """
+        if operator not in _OPERATORS:
+            raise ValueError(f"Invalid operator '{operator}'. Must be one of: {list(_OPERATORS)}")
+
+        entry, values = self._sortedValues(column)
+        value = self._scalar(column, value)
+
+        low = np.searchsorted(values, value, side="right" if operator == ">" else "left") \
+            if operator in (">", ">=", "==") else 0
+        high = np.searchsorted(values, value, side="left" if operator == "<" else "right") \
+            if operator in ("<", "<=", "==") else len(values)
+
+        positions = np.sort(entry["asc"][low:max(low, high)])
+
+        return self.data.index[positions] if returnIndex else self.data.iloc[positions]
+
+    def between(self, column: str, low=None, high=None, returnIndex: bool = False):
+        """
+        Returns the movies whose column is between low and high (both included), in frame order
+        """
+        entry, values = self._sortedValues(column)
+
+        start = np.searchsorted(values, self._scalar(column, low), side="left") if low is not None else 0
+        end = np.searchsorted(values, self._scalar(column, high), side="right") if high is not None else len(values)
+
+        positions = np.sort(entry["asc"][start:max(start, end)])
+
+        return self.data.index[positions] if returnIndex else self.data.iloc[positions]
+
+    def percentile(self, column: str, q):
+        """
+        Returns the q-th percentile (0 to 100) of a column, interpolated linearly like np.percentile
+
+        Missing values are ignored. q can be a number or a list of numbers
+        """
+        values = self._sortedValues(column)[1]
+
+        if not len(values):
+            return np.nan if np.ndim(q) == 0 else np.full(len(q), np.nan)
+
+        position = np.asarray(q, dtype="float64") / 100 * (len(values) - 1)
+        below = np.floor(position).astype("int64")
+        above = np.minimum(below + 1, len(values) - 1)
+
+        result = values[below] + (values[above] - values[below]) * (position - below)
+
+        if pd.api.types.is_datetime64_any_dtype(self.data[column]):
+            series = self.data[column]
+            result = pd.DatetimeIndex(np.atleast_1d(result).astype("int64").astype(f"datetime64[{series.dt.unit}]"))
+            result = result.tz_localize(series.dt.tz)
+
+            return result if np.ndim(q) else result[0]
+
+        return result if np.ndim(q) else float(result)
+
+    def percentileRank(self, column: str, value) -> float:
+        """
+        Returns the percentage (0 to 100) of the non missing values of a column that are <= value
+        """
+        values = self._sortedValues(column)[1]
+
+        if not len(values):
+            return np.nan
+
+        return 100 * np.searchsorted(values, self._scalar(column, value), side="right") / len(values)
+
+    def _entry(self, column: str) -> dict:
+        if column not in self.data.columns:
+            raise ValueError(f"Column '{column}' not found in DataFrame.")
+
+        entry = self._entries.get(column)
+
+        if entry is None or self.check:
+            fingerprint = _fingerprint(self.data[column])
+
+            if entry is None or entry["fingerprint"] != fingerprint:
+                entry = self._entries[column] = {"fingerprint": fingerprint}
+
+        return entry
+
+    def _order(self, column: str, entry: dict, order: str) -> np.ndarray:
+        if order not in entry:
+            key, missing = _rankKey(self.data[column], order)
+            entry[order] = np.lexsort((key, missing))
+
+        return entry[order]
+
+    def _sortedValues(self, column: str) -> tuple:
+        # The entry of the column and its non missing values in ascending order, for the binary searches
+        series = self.data[column]
+
+        if not (pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_any_dtype(series)):
+            raise TypeError(f"Column '{column}' must be numeric or datetime for range and percentile queries.")
+
+        entry = self._entry(column)
+        positions = self._order(column, entry, "asc")
+
+        if "values" not in entry:
+            key, missing = _rankKey(series, "asc")
+            entry["values"] = key[positions[:len(positions) - missing.sum()]]
+
+        return entry, entry["values"]
+
+    def _scalar(self, column: str, value) -> float:
+        if pd.api.types.is_datetime64_any_dtype(self.data[column]):
+            series = self.data[column]
+            value = pd.Timestamp(value)
+
+            if series.dt.tz is not None and value.tz is None:
+                value = value.tz_localize(series.dt.tz)
+
+            # Compared in the unit the column stores
+            return float(value.as_unit(series.dt.unit).asm8.view("int64"))
+
+        return float(value)
+
+
+def _fingerprint(series: pd.Series) -> tuple:
+    # Plain numpy columns are hashed as raw bytes, which is much faster than hashing each value
+    if isinstance(series.dtype, np.dtype) and series.dtype != object:
+        values = np.ascontiguousarray(series.to_numpy())
+    else:
+        values = pd.util.hash_pandas_object(series, index=False).to_numpy()
+
+    return str(series.dtype), len(values), hashlib.blake2b(values.view("uint8"), digest_size=16).hexdigest()
+
+
+#Defines a function that returns the sorted index attached to a frame
+def sortedIndexFor(data: pd.DataFrame, check: bool = True) -> SortedIndex:
+    """
+    Returns the SortedIndex of a frame, creating it on the first call
+
+    The index lives as long as the frame, so every ranking on the same frame shares its cached
+    orders. It only references the frame weakly, so it does not keep the frame alive. A copy of
+    the frame gets its own index
+    """
+    key = id(data)
+    index = _INDEXES.get(key)
+
+    if index is None or index._frame() is not data:
+        index = _INDEXES[key] = SortedIndex(data, check=check, weak=True)
+        weakref.finalize(data, _INDEXES.pop, key, None)
+
+    return index
+
+
+def main():
+    import gc
+    import time
+
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({
+        "ROI": rng.lognormal(1, 1, 2_000_000).round(1),
+        "vote_average": rng.uniform(0, 10, 2_000_000).round(1)
+    })
+
+    index = sortedIndexFor(data)
+
+    for attempt in ("first", "cached", "unchecked"):
+        index.check = attempt != "unchecked"
+
+        start = time.perf_counter()
+        top = index.rank("ROI", k=5)
+        high = index.filter("ROI", ">", 100, returnIndex=True)
+        low = index.filter("vote_average", "<", 1, returnIndex=True)
+        median = index.percentile("ROI", 50)
+        elapsed = time.perf_counter() - start
+
+        print(f"{attempt:<9} {elapsed * 1000:8.1f} ms | {len(high)} with ROI > 100 | {len(low)} rated < 1 | "
+              f"median ROI {median:.2f} | top ROI {top['ROI'].tolist()}")
+
+    # The index must not keep its frame alive
+    frame = weakref.ref(data)
+    del data, index, top
+    gc.collect()
+
+    print(f"frame collected: {frame() is None} | indexes left: {len(_INDEXES)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+# Modules are imported on first use, see Config.lazyImports
+from Config.lazyImports import lazyPackage
+
+__getattr__, __dir__ = lazyPackage(__name__, {
+    "chunkedPipeline": ["CLEANING_FUNCTIONS", "DEFAULT_STEPS", "applySteps", "readChunks", "ChunkWriter",
+                        "cleanInChunks"],
+    "convertDataType": ["convertDataType"],
+    "convertNumeric": ["convertNumeric"],
+    "extractColumn": ["extractData", "extractColumnData"],
+    "getColumnSize": ["convertCastData", "getColumnSize"],
+    "normalizeTables": ["MOVIE_TABLES", "explodeNestedColumn", "buildMovieTables", "moviesWith", "filterMovies"],
+    "optimizeDataTypes": ["INTEGER_TYPES", "UNSIGNED_TYPES", "planDataTypes", "applyDataTypes", "memoryReport",
+                          "optimizeDataTypes"],
+    "parallelCleaning": ["cleanInParallel", "cleanPartitions", "concatPartitions"],
+    "parseNested": ["parseNestedValue", "parseNestedStrings", "decodeNestedColumn", "nestedCacheInfo",
+                    "clearNestedCache"],
+    "reOrderColumns": ["reOrderColumns"],
+    "removeColumn": ["removeColumn"],
+    "separateArray": ["separateArray", "joinKeyColumn", "extract_key", "joinKey"]
+})
@@ -0,0 +1,319 @@
+import os
+import time
+from typing import Optional
+
+import pandas as pd
+
+from Config.instrumentation import instrumented
+from Data_Cleaning.convertDataType import convertDataType
+from Data_Cleaning.convertNumeric import convertNumeric
+from Data_Cleaning.extractColumn import extractColumnData
+from Data_Cleaning.getColumnSize import getColumnSize
+from Data_Cleaning.optimizeDataTypes import optimizeDataTypes
+from Data_Cleaning.parseNested import clearNestedCache
+from Data_Cleaning.reOrderColumns import reOrderColumns
+from Data_Cleaning.removeColumn import removeColumn
+from Data_Cleaning.separateArray import separateArray
+from Data_Storage.movieStorage import _importArrow, storageFormat
+
+
+# Cleaning functions a step can name, so a pipeline can be configured from JSON
+CLEANING_FUNCTIONS = {
+    "removeColumn": removeColumn,
+    "separateArray": separateArray,
+    "convertDataType": convertDataType,
+    "convertNumeric": convertNumeric,
+    "getColumnSize": getColumnSize,
+    "extractColumnData": extractColumnData,
+    "reOrderColumns": reOrderColumns,
+    "optimizeDataTypes": optimizeDataTypes
+}
+
+# The cleaning done in Notebook/movieAnalysis.ipynb
+DEFAULT_STEPS = [
+    ("removeColumn", {"columns": ("adult", "imdb_id", "original_title", "video", "homepage", "backdrop_path",
+                                  "origin_country", "belongs_to_collection")}),
+    ("separateArray", {"columns": {"genres": "name", "production_countries": "name",
+                                   "spoken_languages": "name", "production_companies": "name"}}),
+    ("convertDataType", {"columns": {"budget": "int64", "id": "int64", "popularity": "int64",
+                                     "release_date": "datetime", "title": "string", "poster_path": "string",
+                                     "tagline": "string", "status": "category", "overview": "string"}}),
+    ("convertNumeric", {"columns": ["budget", "revenue"], "value": 1000000}),
+    ("removeColumn", {"columns": ("status",)}),
+    ("getColumnSize", {"column": "credits.cast", "columnName": "cast_size"}),
+    ("getColumnSize", {"column": "credits.crew", "columnName": "crew_size"}),
+    ("extractColumnData", {"column": "credits.crew", "columnName": "directors", "columnKey": "job",
+                           "columnValue": "Director"})
+]
+
+
+#Defines a function that applies cleaning steps to a DataFrame
+def applySteps(data: pd.DataFrame, steps: list) -> pd.DataFrame:
+    """
+    Applies a sequence of cleaning steps to a DataFrame
+
+    Parameters
+    ----------
+    data    :   pd.DataFrame
+            The movies
+
+    steps   :   list
+            (function, kwargs) pairs. The function is a cleaning function or its name in
+            CLEANING_FUNCTIONS and is called as function(data, **kwargs)
+
+    Returns
+    -------
+    pd.DataFrame
+        The cleaned movies
+    """
+    for function, kwargs in steps:
+        if isinstance(function, str):
+            if function not in CLEANING_FUNCTIONS:
+                raise ValueError(f"Unknown cleaning step '{function}'. Must be one of: {list(CLEANING_FUNCTIONS)}")
+
+            function = CLEANING_FUNCTIONS[function]
+
+        data = function(data, **kwargs)
+
+    return data
+
+
+#Defines a function that reads a CSV, Parquet or Arrow file in chunks
+def readChunks(path: str, chunksize: int = 50000, columns: Optional[list] = None, format: Optional[str] = None):
+    """
+    Yields the movies of a file as DataFrames of at most chunksize rows
+
+    CSV files are read with pd.read_csv(chunksize=...), Parquet files one batch of row groups at a
+    time and Arrow IPC files one record batch at a time from a memory map, so only a chunk is in
+    memory at once
+
+    Parameters
+    ----------
+    path    :   str
+            Path of the file
+
+    chunksize   :   int
+                The number of rows per chunk
+
+    columns :   list
+            Columns to read. Defaults to all of them
+
+    format  :   str
+            "csv", "parquet" or "arrow". Defaults to the extension of the path
+    """
+    format = storageFormat(path, format)
+
+    if format == "csv":
+        usecols = (lambda col: col in columns) if columns is not None else None
+
+        with pd.read_csv(path, chunksize=chunksize, usecols=usecols) as reader:
+            yield from reader
+
+        return
+
+    pyarrow = _importArrow()
+
+    if format == "parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+
+        return
+
+    with pyarrow.memory_map(path) as source:
+        reader = pyarrow.ipc.open_file(source)
+
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            batch = batch.select(columns) if columns is not None else batch
+
+            for start in range(0, batch.num_rows, chunksize):
+                yield batch.slice(start, chunksize).to_pandas()
+
+
+class ChunkWriter:
+    """
+    Appends DataFrames to a CSV or Parquet file one chunk at a time
+
+    The file is written next to the output and moved into place when the writer is closed, so an
+    interrupted run never leaves a partial output behind. The columns (and for Parquet the schema)
+    of the first chunk are used for every chunk
+
+    Parameters
+    ----------
+    output_path :   str
+                Path of the file to write
+
+    format  :   str
+            "csv" or "parquet". Defaults to the extension of the path
+    """
+
+    def __init__(self, output_path: str, format: Optional[str] = None):
+        self.output_path = output_path
+        self.format = storageFormat(output_path, format)
+        self.rows = 0
+
+        if self.format == "arrow":
+            raise ValueError("Chunked output supports CSV and Parquet files.")
+
+        output_dir = os.path.dirname(output_path)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+
+        self._tmpPath = output_path + ".tmp"
+        self._columns = None
+        self._writer = None
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        """
+        Appends a chunk to the file
+        """
+        if self._columns is None:
+            self._columns = list(chunk.columns)
+        elif list(chunk.columns) != self._columns:
+            missing = [col for col in self._columns if col not in chunk.columns]
+            if missing:
+                raise ValueError(f"Chunk is missing columns written before: {missing}")
+
+            chunk = chunk[self._columns]
+
+        if self.format == "csv":
+            chunk.to_csv(self._tmpPath, mode="a" if self.rows else "w", header=not self.rows, index=False)
+        else:
+            pyarrow = _importArrow()
+            import pyarrow.parquet as pq
+
+            if self._writer is None:
+                table = pyarrow.Table.from_pandas(chunk, preserve_index=False)
+                self._writer = pq.ParquetWriter(self._tmpPath, table.schema, compression="zstd")
+            else:
+                table = pyarrow.Table.from_pandas(chunk, schema=self._writer.schema, preserve_index=False)
+
+            self._writer.write_table(table)
+
+        self.rows += len(chunk)
+
+    def close(self) -> int:
+        """
+        Finishes the file and moves it to the output path
+
+        Returns
+        -------
+        int
+            The number of rows written
+        """
+        if self._writer is not None:
+            self._writer.close()
+
+        if os.path.exists(self._tmpPath):
+            os.replace(self._tmpPath, self.output_path)
+
+        return self.rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            if self._writer is not None:
+                self._writer.close()
+
+            if os.path.exists(self._tmpPath):
+                os.remove(self._tmpPath)
+
+        return False
+
+
+#Defines a function that cleans a file chunk by chunk
+@instrumented()
+def cleanInChunks(input_path: str, output_path: str, steps: list = DEFAULT_STEPS, chunksize: int = 50000,
+                  columns: Optional[list] = None, input_format: Optional[str] = None,
+                  output_format: Optional[str] = None, workers: int = 1) -> dict:
+    """
+    Cleans a movie file larger than memory by applying the cleaning steps to one chunk at a time
+
+    Each chunk is read, cleaned with the same steps as a whole DataFrame would be and appended to
+    the output, so memory is bounded by the chunk size. The steps must work row by row (all the
+    Data_Cleaning functions do), since a chunk does not see the rows of the other chunks
+
+    Parameters
+    ----------
+    input_path  :   str
+                The CSV, Parquet or Arrow file to clean
+
+    output_path :   str
+                The CSV or Parquet file to write
+
+    steps   :   list
+            (function, kwargs) pairs applied in order, as in applySteps. Defaults to the cleaning
+            done in the notebook
+
+    chunksize   :   int
+                The number of rows cleaned at a time
+
+    columns :   list
+            Columns to read. Defaults to all of them
+
+    input_format, output_format :   str
+                                "csv", "parquet" or "arrow". Default to the extensions of the paths
+
+    workers :   int
+            The number of processes cleaning chunks at once (see parallelCleaning.cleanPartitions).
+            The chunks are still written in order, so the output is the same
+
+    Returns
+    -------
+    dict
+        The number of chunks, rows read and rows written
+    """
+    start = time.perf_counter()
+    chunks = rowsIn = 0
+
+    def counted(reader):
+        nonlocal chunks, rowsIn
+
+        for chunk in reader:
+            chunks += 1
+            rowsIn += len(chunk)
+            yield chunk
+
+    reader = counted(readChunks(input_path, chunksize, columns, input_format))
+
+    with ChunkWriter(output_path, output_format) as writer:
+        if workers > 1:
+            from Data_Cleaning.parallelCleaning import cleanPartitions
+
+            for cleaned in cleanPartitions(reader, steps, workers):
+                writer.write(cleaned)
+        else:
+            for chunk in reader:
+                writer.write(applySteps(chunk, steps))
+
+                # Parsed nested columns are only reused within a chunk
+                clearNestedCache()
+
+    elapsed = time.perf_counter() - start
+    print(f"Cleaned {rowsIn} rows in {chunks} chunks in {elapsed:.2f} seconds "
+          f"({rowsIn / elapsed if elapsed else 0:.0f} rows/s)")
+
+    return {"chunks": chunks, "rows_in": rowsIn, "rows_out": writer.rows}
+
+
+def main():
+    import tempfile
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    input_path = os.path.join(project_root, "data", "movieData.csv")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output_path = os.path.join(tmp, "cleanMovieData.csv")
+
+        print(cleanInChunks(input_path, output_path, chunksize=5))
+        print(pd.read_csv(output_path)[["id", "title", "genres", "budget_musd", "cast_size", "directors"]])
+
+
+if __name__ == "__main__":
+    main()
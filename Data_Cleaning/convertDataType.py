@@ -1,5 +1,13 @@
 import pandas as pd
 
+try:
+    from Config.instrumentation import instrumented
+except ModuleNotFoundError:
+    # Run as a script, without the project root on sys.path: the functions are not measured
+    def instrumented(stage=None, metrics=None):
+        return lambda function: function
+
+@instrumented()
 def convertDataType(data: pd.DataFrame, columns: dict) -> pd.DataFrame:
     """
     Cast a pandas object to a specified datatype
@@ -1,6 +1,14 @@
 
 import pandas as pd
 
+try:
+    from Config.instrumentation import instrumented
+except ModuleNotFoundError:
+    # Run as a script, without the project root on sys.path: the functions are not measured
+    def instrumented(stage=None, metrics=None):
+        return lambda function: function
+
+@instrumented()
 def convertNumeric(data: pd.DataFrame, columns: list, value: int) -> pd.DataFrame:
     """
     Rounds a numeric column to a specified value
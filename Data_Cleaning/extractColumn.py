@@ -1,19 +1,14 @@
-import ast
 import pandas as pd
 import numpy as np
 
-def extractData(value, columnKey, columnValue, separator):
-    if pd.isna(value):
-        return np.nan
+from Config.instrumentation import instrumented
+from Data_Cleaning.parseNested import decodeNestedColumn, parseNestedValue
 
-    # Handle stringified lists (from CSV)
-    if isinstance(value, str):
-        try:
-            value = ast.literal_eval(value)
-        except (ValueError, SyntaxError):
-            return np.nan
+def extractData(value, columnKey, columnValue, separator):
+    # Handle stringified lists (from CSV) and arrays (from Parquet/Arrow)
+    value = parseNestedValue(value)
 
-    if not isinstance(value, list):
+    if value is None:
         return np.nan
 
     directors = [
@@ -24,16 +19,19 @@ def extractData(value, columnKey, columnValue, separator):
 
     return separator.join(directors) if directors else np.nan
 
+@instrumented()
 def extractColumnData(data: pd.DataFrame, 
                       column: str, 
                       columnName: str,
                       columnKey: str ,
                       columnValue: str,
                       separator: str = ", ") -> pd.DataFrame:
-    data[columnName] = data[column].apply(
-                                            lambda value: 
-                                            extractData(value, columnKey, columnValue, separator)
-                                        )
+    # The column is parsed once and shared with the other cleaning functions
+    data[columnName] = pd.Series(
+                                    [extractData(items, columnKey, columnValue, separator)
+                                     for items in decodeNestedColumn(data[column], column)],
+                                    index=data.index
+                                )
     
     return data
 
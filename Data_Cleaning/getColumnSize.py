@@ -1,26 +1,22 @@
-import ast
 import pandas as pd
 import numpy as np
 
-def convertCastData(value):
-    if pd.isna(value):
-        return 0
-
-    # If value was read from CSV → string
-    if isinstance(value, str):
-        try:
-            value = ast.literal_eval(value)
-        except (ValueError, SyntaxError):
-            return 0
+from Config.instrumentation import instrumented
+from Data_Cleaning.parseNested import decodeNestedColumn, parseNestedValue
 
-    # Ensure it's a list
-    if isinstance(value, list):
-        return len(value)
+def convertCastData(value):
+    # Strings read from CSV are parsed, anything that is not a list counts as empty
+    items = parseNestedValue(value)
 
-    return 0
+    return len(items) if items is not None else 0
 
+@instrumented()
 def getColumnSize(data: pd.DataFrame, column: str, columnName: str) -> pd.DataFrame:
-    data[columnName] = data[column].apply(convertCastData)
+    # The column is parsed once and shared with the other cleaning functions
+    data[columnName] = pd.Series(
+        [len(items) if items is not None else 0 for items in decodeNestedColumn(data[column], column)],
+        index=data.index
+    )
     return data
 
 def main():
@@ -0,0 +1,193 @@
+import pandas as pd
+import numpy as np
+from itertools import chain
+
+from Config.instrumentation import instrumented
+from Data_Cleaning.parseNested import decodeNestedColumn
+
+
+# Table name -> (nested column, {key in each item: column in the table})
+MOVIE_TABLES = {
+    "movie_cast": ("credits.cast", {"id": "person_id", "name": "name", "character": "character",
+                                    "order": "order"}),
+    "movie_crew": ("credits.crew", {"id": "person_id", "name": "name", "department": "department",
+                                    "job": "job"}),
+    "movie_genre": ("genres", {"id": "genre_id", "name": "name"}),
+    "movie_company": ("production_companies", {"id": "company_id", "name": "name"})
+}
+
+
+#Defines a function that explodes a nested column into a long table
+@instrumented()
+def explodeNestedColumn(data: pd.DataFrame, column: str, fields: dict, idColumn: str = "id") -> pd.DataFrame:
+    """
+    Explodes a column of lists of dicts into a long table with one row per item
+
+    Example:
+    Input:
+        id = 299534, genres = [{'id': 12, 'name': 'Adventure'}, {'id': 28, 'name': 'Action'}]
+
+    Output:
+        movie_id  genre_id  name
+        299534    12        Adventure
+        299534    28        Action
+
+    Parameters
+    ----------
+    data    :   pd.DataFrame
+            The movies, with the nested column still holding repr strings, lists or arrays
+            (run it before separateArray flattens the column)
+
+    column  :   str
+            The nested column
+
+    fields  :   dict
+            Keys to extract from each item as key value pairs of item key and table column
+
+    idColumn    :   str
+            The column holding the movie id
+
+    Returns
+    -------
+    pd.DataFrame
+        A movie_id column followed by the fields. Integer fields are downcast and the other fields
+        are categorical, so repeated names are stored once
+    """
+    parsed = decodeNestedColumn(data[column], column)
+    lengths = np.fromiter((len(items) if items is not None else 0 for items in parsed),
+                          dtype=np.int64, count=len(parsed))
+
+    # Exploded items and the movie each of them belongs to
+    items = list(chain.from_iterable(items for items in parsed if items))
+    isDict = np.fromiter((isinstance(item, dict) for item in items), dtype=bool, count=len(items))
+    items = [item for item, keep in zip(items, isDict) if keep]
+
+    movieIds = pd.to_numeric(data[idColumn]).to_numpy()
+    table = pd.DataFrame({"movie_id": np.repeat(movieIds, lengths)[isDict]})
+
+    for key, name in fields.items():
+        table[name] = _compactColumn([item.get(key) for item in items])
+
+    table["movie_id"] = pd.to_numeric(table["movie_id"], downcast="integer")
+
+    return table
+
+
+def _compactColumn(values: list) -> pd.Series:
+    # Ids and orders become the smallest integer type, anything else a category
+    present = [value for value in values if value is not None]
+
+    if present and all(isinstance(value, (int, np.integer)) and not isinstance(value, bool)
+                       for value in present):
+        if len(present) == len(values):
+            return pd.to_numeric(pd.Series(values, dtype="int64"), downcast="integer")
+
+        return pd.Series(values, dtype="Int64")
+
+    return pd.Series(values, dtype="category")
+
+
+#Defines a function that builds the long tables for cast, crew, genres and companies
+@instrumented()
+def buildMovieTables(data: pd.DataFrame, tables: dict = None, idColumn: str = "id") -> dict:
+    """
+    Builds the movie_cast, movie_crew, movie_genre and movie_company tables from the nested columns
+
+    Parameters
+    ----------
+    data    :   pd.DataFrame
+            The movies before separateArray flattens genres and production_companies
+
+    tables  :   dict
+            Tables to build as in MOVIE_TABLES. Tables whose column is missing are skipped
+
+    idColumn    :   str
+            The column holding the movie id
+
+    Returns
+    -------
+    dict
+        The tables by name
+    """
+    tables = MOVIE_TABLES if tables is None else tables
+    result = {}
+
+    for name, (column, fields) in tables.items():
+        if column in data.columns:
+            result[name] = explodeNestedColumn(data, column, fields, idColumn)
+        else:
+            print(f"Column '{column}' not found in dataset. Skipping {name}.")
+
+    return result
+
+
+#Defines a function that looks up the movies matching values in a long table
+def moviesWith(table: pd.DataFrame, **conditions) -> pd.Index:
+    """
+    Returns the ids of the movies that have rows matching every condition
+
+    A condition is a column and a value the column must equal, such as name="Quentin Tarantino"
+    and job="Director" on movie_crew. A list of values for one column requires a row for each of
+    them, so name=["Science Fiction", "Action"] on movie_genre finds movies with both genres.
+    Comparisons on categorical columns only compare the integer codes
+
+    Parameters
+    ----------
+    table   :   pd.DataFrame
+            A table from buildMovieTables
+
+    Returns
+    -------
+    pd.Index
+        The matching movie ids
+    """
+    mask = np.ones(len(table), dtype=bool)
+    allOf = {}
+
+    for column, value in conditions.items():
+        if isinstance(value, (list, tuple, set)):
+            allOf[column] = set(value)
+            mask &= table[column].isin(allOf[column]).to_numpy()
+        else:
+            mask &= (table[column] == value).to_numpy()
+
+    matches = table.loc[mask]
+
+    for column, values in allOf.items():
+        found = matches.groupby("movie_id", observed=True)[column].nunique()
+        matches = matches[matches["movie_id"].isin(found.index[found == len(values)])]
+
+    return pd.Index(matches["movie_id"].unique(), name="movie_id")
+
+
+#Defines a function that keeps the movies whose id is in a set of ids
+def filterMovies(data: pd.DataFrame, movieIds, idColumn: str = "id") -> pd.DataFrame:
+    """
+    Keeps the rows of data whose id is in movieIds (a hash semi join)
+
+    Example:
+        filterMovies(movie_data, moviesWith(tables["movie_cast"], name="Uma Thurman").intersection(
+                                 moviesWith(tables["movie_crew"], name="Quentin Tarantino", job="Director")))
+    """
+    return data[data[idColumn].isin(movieIds)]
+
+
+def main():
+    import os
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    data = pd.read_csv(os.path.join(project_root, "data", "movieData.csv"))
+
+    tables = buildMovieTables(data)
+
+    for name, table in tables.items():
+        print(f"{name:<14} {len(table):>6} rows | {table.memory_usage(deep=True).sum() / 1024:8.1f} KiB")
+
+    movieIds = moviesWith(tables["movie_genre"], name=["Science Fiction", "Action"]).intersection(
+               moviesWith(tables["movie_cast"], name="Robert Downey Jr."))
+
+    print(filterMovies(data, movieIds)[["id", "title"]])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import (is_bool_dtype, is_datetime64_any_dtype, is_float_dtype, is_integer_dtype,
+                              is_numeric_dtype)
+
+try:
+    from Config.instrumentation import instrumented
+except ModuleNotFoundError:
+    # Run as a script, without the project root on sys.path: the functions are not measured
+    def instrumented(stage=None, metrics=None):
+        return lambda function: function
+
+
+INTEGER_TYPES = ("int8", "int16", "int32", "int64")
+UNSIGNED_TYPES = ("uint8", "uint16", "uint32", "uint64")
+
+
+#Defines a function that picks a compact datatype for each column
+def planDataTypes(data: pd.DataFrame, sample: int = 10000, categoryRatio: float = 0.5,
+                  lossyFloats: bool = False, exclude: tuple = ()) -> dict:
+    """
+    Picks the smallest datatype that holds each column without losing values
+
+    Integers (and floats holding only finite whole numbers) get the smallest integer type fitting
+    their range, a nullable Int type when values are missing. Floats become float32 when every value
+    survives the round trip. Text columns with few distinct values become categorical and the
+    other text columns Arrow backed strings (if not already). Columns of lists or dicts and datetimes are left alone
+
+    Example:
+    Input:
+        budget_musd int64 [356, 260, 0, 63], genres object ['Action', 'Drama', 'Action', 'Action']
+
+    Output:
+        {'budget_musd': 'uint16', 'genres': 'category'}
+
+    Parameters
+    ----------
+    data    :   pd.DataFrame
+            The movies
+
+    sample  :   int
+            The number of rows whose text is inspected to tell categories from free text. The
+            ranges of the numeric columns are always read from every row, so the types fit all of them
+
+    categoryRatio   :   float
+                    Text columns with at most this share of distinct values in the sample become
+                    categorical
+
+    lossyFloats :   bool
+                Cast every float column to float32 (about 7 significant digits) instead of only the
+                ones it holds exactly
+
+    exclude :   tuple
+            Columns to leave as they are
+
+    Returns
+    -------
+    dict
+        The new datatype of each column to change, as key value pairs of column and datatype
+    """
+    rows = data.sample(sample, random_state=0) if len(data) > sample else data
+    plan = {}
+
+    for col in data.columns:
+        if col in exclude:
+            continue
+
+        dtype = _planColumn(data[col], rows[col], categoryRatio, lossyFloats)
+
+        if dtype is not None and dtype != str(data[col].dtype):
+            plan[col] = dtype
+
+    return plan
+
+
+def _planColumn(series: pd.Series, sample: pd.Series, categoryRatio: float, lossyFloats: bool) -> Optional[str]:
+    dtype = series.dtype
+
+    if isinstance(dtype, pd.CategoricalDtype) or is_datetime64_any_dtype(dtype):
+        return None
+
+    if is_bool_dtype(dtype):
+        return "boolean" if series.hasnans else "bool"
+
+    if is_numeric_dtype(dtype):
+        values = series.to_numpy(dtype="float64", na_value=np.nan) if not is_integer_dtype(dtype) else None
+        present = values[~np.isnan(values)] if values is not None else None
+
+        # inf and -inf (the ROI of a movie without budget) have no integer
+        if values is None or (np.isfinite(present).all() and np.array_equal(present, np.trunc(present))):
+            return _integerType(series)
+
+        if is_float_dtype(dtype) and (lossyFloats or np.array_equal(values.astype("float32"), values,
+                                                                     equal_nan=True)):
+            return "float32"
+
+        return None
+
+    present = sample.dropna()
+    if not len(present) or not all(isinstance(value, str) for value in present.tolist()):
+        # Lists, dicts and mixed values stay Python objects
+        return None
+
+    if present.nunique() <= categoryRatio * len(present):
+        return "category"
+
+    # pandas 3 already stores text as Arrow strings
+    if isinstance(dtype, pd.StringDtype) and dtype.storage == "pyarrow":
+        return None
+
+    return _stringType()
+
+
+def _integerType(series: pd.Series) -> Optional[str]:
+    # The smallest integer type holding the range, nullable if values are missing
+    if not series.notna().any():
+        return None
+
+    low, high = int(series.min()), int(series.max())
+    types = UNSIGNED_TYPES if low >= 0 else INTEGER_TYPES
+
+    for dtype in types:
+        info = np.iinfo(dtype)
+
+        if info.min <= low and high <= info.max:
+            return dtype.capitalize().replace("Uint", "UInt") if series.hasnans else dtype
+
+    return None
+
+
+def _stringType() -> str:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return "string"
+
+    return "string[pyarrow]"
+
+
+#Defines a function that casts the columns of a DataFrame to a plan
+def applyDataTypes(data: pd.DataFrame, plan: dict) -> pd.DataFrame:
+    """
+    Casts every column of the plan in a single astype
+
+    A plan can be computed once and applied to every chunk of a file, so the chunks share their
+    types. A column planned as integers is left as it is when a chunk has values that would not
+    survive the cast: values out of range, fractions, infinities or missing values for a type that
+    is not nullable
+
+    Parameters
+    ----------
+    data    :   pd.DataFrame
+            The movies
+
+    plan    :   dict
+            The datatype of each column, as returned by planDataTypes
+
+    Returns
+    -------
+    pd.DataFrame
+        The movies with the new datatypes
+    """
+    plan = dict(plan)
+
+    for col, dtype in list(plan.items()):
+        if col not in data.columns:
+            print(f"Column '{col}' not found in dataset. Skipping.")
+            del plan[col]
+
+        elif dtype.lower() in INTEGER_TYPES + UNSIGNED_TYPES:
+            loss = _integerLoss(data[col], dtype)
+
+            if loss is not None:
+                print(f"Column '{col}' {loss}. Skipping.")
+                del plan[col]
+
+    return data.astype(plan)
+
+
+def _integerLoss(series: pd.Series, dtype: str) -> Optional[str]:
+    # Why casting the column to the integer type would fail or change values, None if it would not
+    if not is_numeric_dtype(series.dtype):
+        return f"is not numeric, {dtype} cannot hold it"
+
+    missing = series.isna()
+    if missing.any() and dtype == dtype.lower():
+        return f"has missing values, {dtype} cannot hold them"
+
+    present = series[~missing]
+    if not len(present):
+        return None
+
+    if not is_integer_dtype(series.dtype):
+        values = present.to_numpy(dtype="float64")
+
+        if not np.isfinite(values).all():
+            return f"has infinite values, {dtype} cannot hold them"
+
+        if not np.array_equal(values, np.trunc(values)):
+            return f"has fractional values, {dtype} would truncate them"
+
+    info = np.iinfo(dtype.lower())
+    if present.min() < info.min or present.max() > info.max:
+        return f"does not fit in {dtype}"
+
+    return None
+
+
+#Defines a function that compares the memory used by each column before and after
+def memoryReport(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns the datatype and the bytes used by each column before and after, including the
+    strings held by object columns
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per column with dtype_before, dtype_after, bytes_before, bytes_after and ratio,
+        sorted by bytes_before, followed by a Total row
+    """
+    report = pd.DataFrame({
+        "dtype_before": before.dtypes.astype(str),
+        "dtype_after": after.dtypes.astype(str),
+        "bytes_before": before.memory_usage(deep=True, index=False),
+        "bytes_after": after.memory_usage(deep=True, index=False)
+    }).sort_values("bytes_before", ascending=False)
+
+    report.loc["Total"] = ["", "", report["bytes_before"].sum(), report["bytes_after"].sum()]
+    report["ratio"] = (report["bytes_before"] / report["bytes_after"]).round(2)
+
+    return report
+
+
+#Defines a function that casts every column of a DataFrame to a compact datatype
+@instrumented()
+def optimizeDataTypes(data: pd.DataFrame, plan: Optional[dict] = None, sample: int = 10000,
+                      categoryRatio: float = 0.5, lossyFloats: bool = False, exclude: tuple = (),
+                      report: bool = False) -> pd.DataFrame:
+    """
+    Plans the datatypes of the movies with planDataTypes and applies them in one pass
+
+    Parameters
+    ----------
+    data    :   pd.DataFrame
+            The movies
+
+    plan    :   dict
+            A plan to apply instead of planning from the data, for example the plan of the first chunk
+
+    sample, categoryRatio, lossyFloats, exclude :
+            Options of planDataTypes
+
+    report  :   bool
+            Print the memory used by each column before and after
+
+    Returns
+    -------
+    pd.DataFrame
+        The movies with compact datatypes
+    """
+    if plan is None:
+        plan = planDataTypes(data, sample, categoryRatio, lossyFloats, exclude)
+
+    optimized = applyDataTypes(data, plan)
+
+    if report:
+        memory = memoryReport(data, optimized)
+        print(memory.to_string())
+        print(f"Memory: {memory.loc['Total', 'bytes_before'] / 1e6:.2f} MB -> "
+              f"{memory.loc['Total', 'bytes_after'] / 1e6:.2f} MB")
+
+    return optimized
+
+
+def main():
+    import os
+    import sys
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.append(project_root)
+
+    from Data_Cleaning.chunkedPipeline import DEFAULT_STEPS, applySteps
+
+    data = applySteps(pd.read_csv(os.path.join(project_root, "data", "movieData.csv")), DEFAULT_STEPS)
+
+    print(planDataTypes(data))
+
+    # The raw credits JSON is most of the memory of the cleaned movies
+    optimizeDataTypes(data.drop(columns=["credits.cast", "credits.crew"]), report=True)
+
+
+if __name__ == "__main__":
+    main()
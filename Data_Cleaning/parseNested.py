@@ -0,0 +1,315 @@
+import ast
+import hashlib
+import json
+import re
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+try:
+    from Config.instrumentation import instrumented
+except ModuleNotFoundError:
+    # Run as a script, without the project root on sys.path: the functions are not measured
+    def instrumented(stage=None, metrics=None):
+        return lambda function: function
+
+
+# (column, content hash) -> parsed values, most recently used last
+_CACHE = OrderedDict()
+_CACHE_SIZE = 16
+_STATS = {"hits": 0, "misses": 0}
+
+# A Python string literal, with its escapes
+_REPR_LITERAL = re.compile(r""""[^"\\]*(?:\\.[^"\\]*)*"|'[^'\\]*(?:\\.[^'\\]*)*'""", re.S)
+
+# A quote that may open a string starting with a constant, like ': True Story'. A quote after a letter or
+# a digit closes a string, or the cell is neither JSON nor Python. Starting with the literal keeps the
+# search as fast as str.find
+_QUOTED_CONSTANT = re.compile(r"': (?<!\w': )(?:None|True|False)")
+
+
+#Defines a function that parses a nested cell into a list
+def parseNestedValue(value):
+    """
+    Parses a cell of a nested column (genres, credits.cast, credits.crew, ...) into a list
+
+    Parameters
+    ----------
+    value   :   str, list, numpy array or NaN
+            A Python repr string read from a CSV, a list from JSON or an array from Parquet/Arrow
+
+    Returns
+    -------
+    The list of items, or None if the cell is empty, malformed or not a list
+    """
+    if isinstance(value, list):
+        return value
+
+    # Arrays come from Parquet/Arrow files
+    if isinstance(value, np.ndarray):
+        return list(value)
+
+    if isinstance(value, str):
+        try:
+            value = ast.literal_eval(value)
+        except Exception:
+            return None
+
+        return value if isinstance(value, list) else None
+
+    return None
+
+
+#Defines a function that parses many repr strings at once
+def parseNestedStrings(values, batchSize: int = 1000) -> list:
+    """
+    Parses a sequence of nested cells into lists, like parseNestedValue on each of them
+
+    Repr strings of lists are rewritten to JSON and parsed batchSize cells at a time with a single
+    json.loads call, which is far faster than ast.literal_eval. A tokenizer finds the string
+    literals: plain single quoted strings only have their quotes swapped, double quoted strings
+    (names like O'Brien) are already JSON, and the few with escapes are converted one by one. A
+    batch JSON rejects is parsed cell by cell, and any cell JSON rejects falls back to
+    parseNestedValue
+
+    Parameters
+    ----------
+    values  :   sequence
+            The cells to parse
+
+    batchSize   :   int
+                The number of cells parsed by each json.loads call
+
+    Returns
+    -------
+    list
+        A list or None per cell
+    """
+    parsed = [None] * len(values)
+
+    for start in range(0, len(values), batchSize):
+        batch = range(start, min(start + batchSize, len(values)))
+        safe = [i for i in batch if _isListRepr(values[i])]
+
+        lists = _parseJsonBatch([values[i] for i in safe])
+
+        if lists is None:
+            lists = [_parseJsonBatch([values[i]]) for i in safe]
+            lists = [result[0] if result is not None else parseNestedValue(values[i])
+                     for i, result in zip(safe, lists)]
+
+        for i, items in zip(safe, lists):
+            parsed[i] = items
+
+        safe = set(safe)
+        for i in batch:
+            if i not in safe:
+                parsed[i] = parseNestedValue(values[i])
+
+    return parsed
+
+
+def _isListRepr(value) -> bool:
+    return isinstance(value, str) and value[:1] == "[" and value[-1:] == "]"
+
+
+def _parseJsonBatch(cells: list):
+    if not cells:
+        return []
+
+    text = "[" + ",".join(cells) + "]"
+
+    # The quick conversion only replaces the constants that are dict values. One left anywhere else
+    # is not JSON, so the text is converted again telling every string from the code
+    for quick in (True, False):
+        converted = _reprToJson(text, quick)
+        if converted is None:
+            return None
+
+        try:
+            lists = json.loads(converted, parse_constant=_rejectConstant)
+            break
+        except ValueError:
+            if not quick or not any(word in converted for word in ("None", "True", "False")):
+                return None
+
+    # A malformed cell can split into several values
+    if len(lists) != len(cells) or not all(isinstance(items, list) for items in lists):
+        return None
+
+    return lists
+
+
+def _rejectConstant(name: str):
+    # NaN and Infinity are JSON constants but not Python ones, ast.literal_eval rejects the cell
+    raise ValueError(f"Unexpected constant {name}")
+
+
+def _reprToJson(text: str, quick: bool = True):
+    # The JSON of a Python repr, or None if it has anything JSON would read differently
+    runs, literals, position = [], [], 0
+    quote, backslash = text.find('"'), text.find("\\")
+
+    # Only the strings with a double quote or a backslash are converted on their own, the text
+    # between them is converted at once
+    while quote != -1 or backslash != -1:
+        special = quote if backslash == -1 or quote != -1 and quote < backslash else backslash
+
+        # After an odd number of single quotes the character is inside a single quoted string
+        if text.count("'", position, special) % 2:
+            start = text.rfind("'", position, special)
+        elif special == quote:
+            start = special
+        else:
+            return None
+
+        match = _REPR_LITERAL.match(text, start)
+        literal = _literalToJson(match.group()) if match is not None else None
+
+        if literal is None:
+            return None
+
+        runs.append(text[position:start])
+        literals.append(literal)
+        position = match.end()
+
+        if quote != -1 and quote < position:
+            quote = text.find('"', position)
+        if backslash != -1 and backslash < position:
+            backslash = text.find("\\", position)
+
+    runs.append(text[position:])
+
+    converted = _runToJson("\0".join(runs) if len(runs) > 1 else runs[0], quick)
+    if converted is None:
+        return None
+
+    runs = converted.split("\0") if len(runs) > 1 else [converted]
+
+    # A NUL character in the text itself
+    if len(runs) != len(literals) + 1:
+        return None
+
+    pieces = [None] * (len(runs) + len(literals))
+    pieces[0::2], pieces[1::2] = runs, literals
+
+    return "".join(pieces)
+
+
+def _literalToJson(literal: str):
+    # Double quoted strings without escapes are already JSON
+    if literal[0] == '"' and "\\" not in literal:
+        return literal
+
+    try:
+        return json.dumps(ast.literal_eval(literal))
+    except Exception:
+        return None
+
+
+def _runToJson(run: str, quick: bool = True):
+    # The text between the strings with quotes or escapes: no string in it holds a quote, so a
+    # constant after a closing quote and a colon is a dict value and is replaced without telling
+    # the strings from the code. A quote that may open a string needs the split below
+    if quick and not any(word in run for word in ("null", "true", "false")) and not _QUOTED_CONSTANT.search(run):
+        return (run.replace("': None", "': null").replace("': True", "': true").replace("': False", "': false")
+                .replace("'", '"'))
+
+    # Every quote of a run delimits a string, so even parts are outside the strings
+    text = run.replace("'", '"')
+    parts = text.split('"')
+    code = "".join(parts[0::2])
+
+    # Words JSON reads differently from Python
+    if any(word in code for word in ("null", "true", "false")):
+        return None
+
+    # Replace the Python constants in one pass unless a string contains them too
+    strings = "".join(parts[1::2])
+
+    if any(word in strings for word in ("None", "True", "False")):
+        parts[0::2] = [part.replace("None", "null").replace("True", "true").replace("False", "false")
+                       for part in parts[0::2]]
+        return '"'.join(parts)
+
+    return text.replace("None", "null").replace("True", "true").replace("False", "false")
+
+
+#Defines a function that decodes a nested column once and caches the result
+@instrumented()
+def decodeNestedColumn(series: pd.Series, column: str = None) -> list:
+    """
+    Parses every cell of a nested column, reusing the result of earlier calls on the same content
+
+    Columns of repr strings are keyed by their name and a hash of their content, so getColumnSize,
+    extractColumnData and separateArray parse credits.crew (or any other column) only once.
+    Columns that already hold lists are not cached since they need no parsing. The parsed lists
+    are shared between callers and must not be modified
+
+    Parameters
+    ----------
+    series  :   pd.Series
+            The nested column
+
+    column  :   str
+            The name of the column. Defaults to the name of the series
+
+    Returns
+    -------
+    list
+        The parsed cell values (a list or None per row) in the order of the series
+    """
+    values = series.to_numpy(dtype=object)
+    notna = series.notna().to_numpy()
+
+    # Only repr strings are worth caching
+    if not all(isinstance(value, str) for value in values[notna]):
+        return [parseNestedValue(value) for value in values]
+
+    hashes = pd.util.hash_pandas_object(series, index=False).to_numpy()
+    key = (column if column is not None else series.name, len(values),
+           hashlib.blake2b(hashes.tobytes(), digest_size=16).hexdigest())
+
+    if key in _CACHE:
+        _STATS["hits"] += 1
+        _CACHE.move_to_end(key)
+        return _CACHE[key]
+
+    _STATS["misses"] += 1
+    parsed = parseNestedStrings(values)
+
+    _CACHE[key] = parsed
+    if len(_CACHE) > _CACHE_SIZE:
+        _CACHE.popitem(last=False)
+
+    return parsed
+
+
+#Defines a function that reports the use of the nested column cache
+def nestedCacheInfo() -> dict:
+    """
+    Returns the number of cache hits, misses and cached columns
+    """
+    return {**_STATS, "columns": len(_CACHE)}
+
+
+#Defines a function that empties the nested column cache
+def clearNestedCache() -> None:
+    _CACHE.clear()
+    _STATS["hits"] = 0
+    _STATS["misses"] = 0
+
+
+def main():
+    data = pd.DataFrame({
+        "credits.crew": ["[{'name': 'Quentin Tarantino', 'job': 'Director'}]", np.nan, "not a list"]
+    })
+
+    print(decodeNestedColumn(data["credits.crew"]))
+    print(decodeNestedColumn(data["credits.crew"]))
+    print(nestedCacheInfo())
+
+
+if __name__ == "__main__":
+    main()
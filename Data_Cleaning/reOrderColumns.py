@@ -1,6 +1,14 @@
 
 import pandas as pd
 
+try:
+    from Config.instrumentation import instrumented
+except ModuleNotFoundError:
+    # Run as a script, without the project root on sys.path: the functions are not measured
+    def instrumented(stage=None, metrics=None):
+        return lambda function: function
+
+@instrumented()
 def reOrderColumns(data: pd.DataFrame, columns: list) -> pd.DataFrame:
     """
     Reorders the columns in a DataFrame according to the list provided.
@@ -1,6 +1,14 @@
 import pandas as pd
 import logging
 
+try:
+    from Config.instrumentation import instrumented
+except ModuleNotFoundError:
+    # Run as a script, without the project root on sys.path: the functions are not measured
+    def instrumented(stage=None, metrics=None):
+        return lambda function: function
+
+@instrumented()
 def removeColumn(data: pd.DataFrame, columns: tuple) -> pd.DataFrame:
     """
     Creates a function that removes columns from a dataFrame
@@ -52,7 +60,7 @@ def removeColumn(data: pd.DataFrame, columns: tuple) -> pd.DataFrame:
 
     # Remove Columns
     try:
-        new_df = data.drop(columns=valid_cols, axis=1)
+        new_df = data.drop(columns=valid_cols)
         return new_df
 
     except Exception as e:
@@ -1,7 +1,11 @@
 import pandas as pd
-import ast
 import numpy as np
+from itertools import chain, compress
 
+from Config.instrumentation import instrumented
+from Data_Cleaning.parseNested import decodeNestedColumn, parseNestedValue
+
+@instrumented()
 def separateArray(data: pd.DataFrame, columns: dict, separator: str=" | ") -> pd.DataFrame:
     """
     Converts JSON-like array columns into pipe (|) separated strings.
@@ -27,16 +31,63 @@ def separateArray(data: pd.DataFrame, columns: dict, separator: str=" | ") -> pd
     pd.DataFrame
         Transformed DataFrame
     """
-     # Apply transformation to each column
+     # Apply transformation to each column, parsing each nested column only once
     for col, key in columns.items():
         if col in data.columns:
-            data[col] = data[col].apply(lambda value: extract_key(value, key, separator))
+            data[col] = pd.Series(
+                joinKeyColumn(decodeNestedColumn(data[col], col), key, separator),
+                index=data.index
+            )
         else:
             print(f"Column '{col}' not found in dataset. Skipping.")
 
     return data
 
 
+def joinKeyColumn(parsed: list, key, separator) -> list:
+    """
+    Joins the values of a key for a whole parsed column at once
+
+    All the cells are flattened into one exploded array of items with the row each item came
+    from, the key is extracted from every item in bulk and the values of each row are joined by
+    slicing the exploded array at the row boundaries. The result is the same as calling joinKey
+    on every cell
+
+    :Parameters
+    parsed  :   list
+            The parsed cells (a list or None per row)
+
+    key :  string
+            Key to use to extract the value in each dictionary
+
+    Returns:
+    --------
+    A joined string or NaN per row
+    """
+    lengths = np.fromiter((len(items) if items is not None else 0 for items in parsed),
+                          dtype=np.int64, count=len(parsed))
+
+    # Exploded items and the row each of them belongs to
+    items = list(chain.from_iterable(items for items in parsed if items))
+    rows = np.repeat(np.arange(len(parsed)), lengths)
+
+    hasKey = np.fromiter((isinstance(item, dict) and key in item for item in items),
+                         dtype=bool, count=len(items))
+
+    values = [str(item[key]) for item in compress(items, hasKey)]
+    rows = rows[hasKey]
+
+    result = np.full(len(parsed), np.nan, dtype=object)
+
+    # Rows are sorted, so each row's values are a contiguous slice
+    found, starts = np.unique(rows, return_index=True)
+    ends = np.append(starts[1:], len(values))
+
+    result[found] = [separator.join(values[start:end]) for start, end in zip(starts, ends)]
+
+    return result.tolist()
+
+
 def extract_key(value, key, separator):
     """
     Extracts values for the specified keys and separate them with a Pipe (|)
@@ -53,27 +104,33 @@ def extract_key(value, key, separator):
     The values separated with a Pipe (|)
     """
     
-    # Safe NaN handling
-    if value is None or (isinstance(value, float) and pd.isna(value)):
-        return np.nan
+    # Convert string → list (lists from JSON, arrays from Parquet/Arrow), NaN when not a list
+    return joinKey(parseNestedValue(value), key, separator)
 
-    try:
-        # Convert string → list
-        if isinstance(value, str):
-            value = ast.literal_eval(value)
 
-        # Ensure correct type
-        if not isinstance(value, list):
-            return np.nan
+def joinKey(items, key, separator):
+    """
+    Joins the values of a key in a parsed list of dicts
 
-        # Extract values using dynamic key
-        values = [item.get(key) for item in value if isinstance(item, dict) and key in item]
+    :Parameters
+    items   :   list or None
+            The parsed cell, None when the cell is empty or not a list
 
-        return separator.join(map(str, values)) if values else np.nan
+    key :  string
+            Key to use to extract the value in each dictionary
 
-    except Exception:
+    Returns:
+    --------
+    The values separated with the separator, NaN if there are none
+    """
+    if items is None:
         return np.nan
 
+    # Extract values using dynamic key
+    values = [item.get(key) for item in items if isinstance(item, dict) and key in item]
+
+    return separator.join(map(str, values)) if values else np.nan
+
 
 def main():
     sampleData = pd.DataFrame({
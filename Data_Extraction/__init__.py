@@ -0,0 +1,9 @@
+# Modules are imported on first use, see Config.lazyImports. Only extractData imports requests
+from Config.lazyImports import lazyPackage
+
+__getattr__, __dir__ = lazyPackage(__name__, {
+    "batchWriter": ["flattenRecord", "CSVBatchWriter"],
+    "extractData": ["ApiRequestError", "fetchMovie", "fetchMovies", "extractDataFromAPI"],
+    "landingZone": ["openJsonLines", "RawJsonLinesWriter", "readRawJsonLines", "loadRawMovies"],
+    "progressLedger": ["ProgressLedger"]
+})
@@ -0,0 +1,287 @@
+import json
+import os
+import tempfile
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+
+# Marks a column that is not present in a record
+_MISSING = "missing"
+
+
+#Defines a function that flattens a movie the same way pandas.json_normalize does
+def flattenRecord(record: dict, prefix: str = "") -> dict:
+    """
+    Flattens nested dictionaries into dot separated keys
+
+    Top level values keep their position and flattened dictionaries are moved to the end, which is
+    the column order pandas.json_normalize produces. Lists are kept as they are and empty
+    dictionaries are dropped
+
+    Parameters
+    ----------
+    record  :   dict
+            The movie to flatten
+
+    prefix  :   str
+            The key of the parent dictionary
+
+    Returns
+    -------
+    dict
+        The flattened movie
+    """
+    flat = {}
+    nested = {}
+
+    for key, value in record.items():
+        name = f"{prefix}.{key}" if prefix else str(key)
+
+        if isinstance(value, dict):
+            nested.update(flattenRecord(value, name))
+        elif prefix:
+            nested[name] = value
+        else:
+            flat[name] = value
+
+    flat.update(nested)
+
+    return flat
+
+
+#Defines a function that returns the kind of a value as pandas sees it in a single row
+def _valueKind(value) -> str:
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, str):
+        return "str"
+    return "object"
+
+
+_SAMPLES = {"bool": True, "int": 1, "float": 1.5, "str": "s", "object": None}
+
+
+@lru_cache(maxsize=None)
+def _concatDtype(state, kind: str):
+    """
+    Asks pandas for the dtype of a column after concatenating one more row to it
+
+    state is the dtype of the column so far, None if the column is new and "empty" if there are no
+    rows yet. kind is the kind of the value in the new row or _MISSING if the row lacks the column
+    """
+    if kind == _MISSING:
+        new = pd.json_normalize({"other": 1})
+    else:
+        new = pd.json_normalize({"v": _SAMPLES[kind]})
+
+    if state == "empty":
+        old = pd.DataFrame()
+    elif state is None:
+        old = pd.DataFrame({"other": [1]})
+    else:
+        old = pd.DataFrame({"v": pd.Series([_SAMPLES[_dtypeKind(state)]], dtype=object).astype(state)})
+
+    return pd.concat([old, new], ignore_index=True)["v"].dtype
+
+
+def _dtypeKind(dtype) -> str:
+    if pd.api.types.is_bool_dtype(dtype):
+        return "bool"
+    if pd.api.types.is_integer_dtype(dtype):
+        return "int"
+    if pd.api.types.is_float_dtype(dtype):
+        return "float"
+    if pd.api.types.is_string_dtype(dtype) and dtype != np.dtype(object):
+        return "str"
+    return "object"
+
+
+class CSVBatchWriter:
+    """
+    Streams movies to a CSV file in fixed size batches
+
+    Movies are flattened as they arrive and spooled to a temporary JSON Lines file next to the
+    output, while the writer keeps track of the columns and the dtype each column would have after
+    concatenating the movies one by one with pandas.concat. When the writer is closed the spool is
+    read back one batch at a time and appended to the CSV with those dtypes, so the file matches the
+    one built by concatenating every movie into a single DataFrame while memory stays bounded by
+    the batch size
+
+    Parameters
+    ----------
+    output_path :   str
+                Path of the CSV file to write
+
+    batch_size  :   int
+                The number of movies written to the CSV at a time
+    """
+
+    def __init__(self, output_path: str, batch_size: int = 1000):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+
+        self.output_path = output_path
+        self.batch_size = batch_size
+        self.rows = 0
+
+        # column -> dtype so far, in the order the columns were first seen
+        self._dtypes = {}
+
+        # column -> last row at which the column was float64 / int64
+        self._lastFloat = {}
+        self._lastInt = {}
+
+        output_dir = os.path.dirname(output_path)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+
+        fd, self._spoolPath = tempfile.mkstemp(suffix=".spool.jsonl", dir=output_dir or None)
+        self._spool = os.fdopen(fd, "w", encoding="utf-8")
+
+    def add(self, record: dict) -> None:
+        """
+        Adds a movie to the writer
+
+        Parameters
+        ----------
+        record  :   dict
+                The movie as returned by the API
+        """
+        flat = flattenRecord(record)
+
+        for col in self._dtypes:
+            if col not in flat:
+                self._update(col, _MISSING)
+
+        for col, value in flat.items():
+            self._update(col, _valueKind(value))
+
+        self._spool.write(json.dumps(flat))
+        self._spool.write("\n")
+        self.rows += 1
+
+    def _update(self, col: str, kind: str) -> None:
+        state = self._dtypes.get(col) if self.rows else "empty"
+        dtype = _concatDtype(state, kind)
+        self._dtypes[col] = dtype
+
+        if pd.api.types.is_float_dtype(dtype):
+            self._lastFloat[col] = self.rows
+        elif pd.api.types.is_integer_dtype(dtype):
+            self._lastInt[col] = self.rows
+
+    def close(self) -> int:
+        """
+        Writes the spooled movies to the CSV file and removes the spool
+
+        Returns
+        -------
+        int
+            The number of movies written
+        """
+        self._spool.close()
+
+        tmp_path = f"{self.output_path}.tmp"
+
+        try:
+            if not self.rows:
+                pd.DataFrame().to_csv(tmp_path, index=False)
+            else:
+                columns = list(self._dtypes)
+
+                with open(self._spoolPath, encoding="utf-8") as spool:
+                    batch = []
+                    start = 0
+
+                    for line in spool:
+                        batch.append(json.loads(line))
+
+                        if len(batch) == self.batch_size:
+                            self._writeBatch(batch, columns, start, tmp_path)
+                            start += len(batch)
+                            batch = []
+
+                    if batch:
+                        self._writeBatch(batch, columns, start, tmp_path)
+
+            os.replace(tmp_path, self.output_path)
+
+        finally:
+            os.remove(self._spoolPath)
+
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        return self.rows
+
+    def _writeBatch(self, batch: list, columns: list, start: int, path: str) -> None:
+        frame = pd.DataFrame(
+            [[record.get(col, np.nan) for col in columns] for record in batch],
+            columns=columns,
+            dtype=object
+        )
+
+        for col in columns:
+            dtype = self._dtypes[col]
+
+            if dtype != np.dtype(object):
+                frame[col] = frame[col].astype(dtype)
+                continue
+
+            # Values keep the casts they went through while the column was numeric
+            lastFloat = self._lastFloat.get(col, -1)
+            lastInt = self._lastInt.get(col, -1)
+
+            if max(lastFloat, lastInt) >= start:
+                frame[col] = pd.Series(
+                    [_castValue(value, start + i, lastFloat, lastInt) for i, value in enumerate(frame[col])],
+                    index=frame.index,
+                    dtype=object
+                )
+
+        frame.to_csv(path, mode="w" if start == 0 else "a", header=(start == 0), index=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # Discard the spool when the extraction fails
+            self._spool.close()
+            os.remove(self._spoolPath)
+
+
+def _castValue(value, row: int, lastFloat: int, lastInt: int):
+    if isinstance(value, (bool, int)) and row <= lastFloat:
+        return float(value)
+    if isinstance(value, bool) and row <= lastInt:
+        return int(value)
+    return value
+
+
+def main():
+    import sys
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.append(project_root)
+
+    from Benchmarks.stubServer import syntheticMovie
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with CSVBatchWriter(os.path.join(tmp, "movies.csv"), batch_size=2) as writer:
+            for movie_id in range(5):
+                writer.add(syntheticMovie(movie_id))
+
+        print(pd.read_csv(os.path.join(tmp, "movies.csv")).head())
+
+
+if __name__ == "__main__":
+    main()
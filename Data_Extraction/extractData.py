@@ -1,11 +1,20 @@
 class ApiRequestError(Exception):
     """Base class for API request errors."""
 
-import pandas as pd
 import requests
 import json
 import os
-from typing import Optional
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Optional
+
+try:
+    from Config.instrumentation import instrumented
+except ModuleNotFoundError:
+    # Run as a script, without the project root on sys.path: the functions are not measured
+    def instrumented(stage=None, metrics=None):
+        return lambda function: function
 
 
 class ApiRequestError(Exception):
@@ -13,11 +22,144 @@ class ApiRequestError(Exception):
     pass
 
 
+def fetchMovie(session: requests.Session,
+               endpoint: str,
+               headers: dict,
+               params: dict) -> Optional[dict]:
+    """
+
+    Fetches the details of a single movie
+
+    Parameters
+    ----------
+    session :   Session Object
+            Session object to handle retry logic
+
+    endpoint    :   str
+                The URL of the movie
+
+    headers :   dict
+            The request headers
+
+    params  :   dict
+            The query parameters
+
+    Returns:
+    -------
+    The movie as a dictionary or None if the movie was not found or the response is not valid JSON
+
+    """
+    try:
+        response = session.get(
+            url=endpoint,
+            headers=headers,
+            params=params,
+            timeout=10
+        )
+    except requests.exceptions.Timeout:
+        raise ApiRequestError("Request timed out.")
+    except requests.exceptions.ConnectionError:
+        raise ApiRequestError("Connection error.")
+    except requests.exceptions.RequestException as e:
+        raise ApiRequestError(f"Network error: {e}")
+
+    if response.status_code == 404:
+        # Skip missing movie IDs
+        return None
+
+    # Safe JSON parse
+    try:
+        return response.json()
+    except ValueError:
+        return None
+
+
+def fetchMovies(session: requests.Session,
+                url: str,
+                movie_ids: list,
+                headers: dict,
+                params: dict,
+                max_workers: int = 1,
+                raise_errors: bool = True) -> Iterator[tuple]:
+    """
+
+    Fetches movies with a bounded pool of worker threads and yields them in the order of the IDs
+
+    At most a few requests per worker are queued ahead of the movie being yielded, so memory does
+    not grow with the number of IDs. Queued requests are cancelled if a request fails and
+    raise_errors is set
+
+    Parameters
+    ----------
+    session :   Session Object
+            Session object shared by all the workers
+
+    url :   str
+        The URL for the API
+
+    movie_ids   :   list
+                List of IDs for movies to be extracted
+
+    headers :   dict
+            The request headers
+
+    params  :   dict
+            The query parameters
+
+    max_workers :   int
+                The number of concurrent requests
+
+    raise_errors    :   bool
+                    Sets the default to True
+                    Raises the ApiRequestError of a failed request. When False the error is yielded
+                    in place of the movie and the remaining IDs are still fetched
+
+    Returns:
+    -------
+    An iterator of (movie_id, movie) tuples where movie is None for skipped IDs
+
+    """
+    window = max_workers * 4
+    pending = deque()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        try:
+            for movie_id in movie_ids:
+                pending.append((movie_id, executor.submit(fetchMovie, session, f"{url}/{movie_id}", headers, params)))
+
+                # Wait for the oldest request once the window is full
+                if len(pending) >= window:
+                    yield _nextResult(pending, raise_errors)
+
+            while pending:
+                yield _nextResult(pending, raise_errors)
+
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
+def _nextResult(pending: deque, raise_errors: bool) -> tuple:
+    movie_id, future = pending.popleft()
+
+    try:
+        return movie_id, future.result()
+    except ApiRequestError as e:
+        if raise_errors:
+            raise
+        return movie_id, e
+
+
+@instrumented()
 def extractDataFromAPI(session: Optional[requests.Session], 
                        url: str, 
                        API_KEY: str,
                        movie_ids: list,
-                       output_path: str = "../data/movieData.csv") -> None:
+                       output_path: str = "../data/movieData.csv",
+                       max_workers: int = 1,
+                       batch_size: int = 1000,
+                       ledger_path: Optional[str] = None,
+                       raw_output_path: Optional[str] = None) -> None:
     
     """
 
@@ -37,9 +179,29 @@ def extractDataFromAPI(session: Optional[requests.Session],
     movie_ids   :   list
                 List of IDs for movies to be extracted
 
-    maxPages    :   int
-                Sets the default to 500
-                The maximum number of pages to fetch
+    output_path :   str
+                Path of the CSV file the movies are saved to
+
+    max_workers :   int
+                Sets the default to 1
+                The number of movies fetched concurrently. All workers share the same session,
+                so create it with a pool_maxsize of at least max_workers
+
+    batch_size  :   int
+                Sets the default to 1000
+                The number of movies written to the CSV at a time. The movies are streamed to the
+                file in batches so memory does not grow with the number of IDs
+
+    ledger_path :   str
+                Path of a SQLite progress ledger that makes the extraction resumable. Completed,
+                skipped and failed IDs are recorded as they are fetched and failed requests no longer
+                stop the extraction. Rerunning with the same ledger only fetches the IDs that are
+                not completed or skipped, and the CSV is rebuilt from every completed movie
+
+    raw_output_path :   str
+                Path of a JSON Lines landing file the raw responses are appended to, compressed
+                when it ends with .gz or .zst. Load it with landingZone.loadRawMovies to get the
+                nested columns as lists instead of repr strings
 
     Returns:
     -------
@@ -69,53 +231,75 @@ def extractDataFromAPI(session: Optional[requests.Session],
         "append_to_response": "credits"  # includes cast + crew
     }
 
-    df = pd.DataFrame()
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1")
 
-    # FETCH MOVIE DATA 
-    for movie_id in movie_ids:
+    # Imported here so the module can still be run as a script
+    from Data_Extraction.batchWriter import CSVBatchWriter
+    from Data_Extraction.landingZone import RawJsonLinesWriter
+    from Data_Extraction.progressLedger import ProgressLedger
 
-        endpoint = f"{url}/{movie_id}"
+    ledger = ProgressLedger(ledger_path) if ledger_path else None
+    landing = RawJsonLinesWriter(raw_output_path) if raw_output_path else None
 
-        try:
-            response = session.get(
-                url=endpoint,
-                headers=headers,
-                params=params,
-                timeout=10
-            )
-        except requests.exceptions.Timeout:
-            raise ApiRequestError("Request timed out.")
-        except requests.exceptions.ConnectionError:
-            raise ApiRequestError("Connection error.")
-        except requests.exceptions.RequestException as e:
-            raise ApiRequestError(f"Network error: {e}")
-
-        if response.status_code == 404:
-            # Skip missing movie IDs
-            continue
-
-        # Safe JSON parse
-        try:
-            json_data = response.json()
-        except ValueError:
-            continue
+    try:
+        # Only fetch the IDs the ledger has not completed or skipped yet
+        ids_to_fetch = ledger.outstanding(movie_ids) if ledger else movie_ids
+
+        if ledger:
+            print(f"{len(movie_ids) - len(ids_to_fetch)} movies already in the ledger, "
+                  f"fetching {len(ids_to_fetch)}")
+
+        start = time.perf_counter()
+
+        # FETCH MOVIE DATA AND SAVE TO CSV
+        with CSVBatchWriter(output_path, batch_size=batch_size) as writer:
+            for movie_id, json_data in fetchMovies(session, url, ids_to_fetch, headers, params,
+                                                   max_workers, raise_errors=ledger is None):
+
+                # Land the raw response before anything is flattened
+                if landing and isinstance(json_data, dict):
+                    landing.write(json_data)
+
+                # The ledger keeps the movies and writes them out once everything is fetched
+                if ledger:
+                    ledger.record(movie_id, json_data)
+                    continue
 
-        movie_df = pd.json_normalize(json_data)
-        df = pd.concat([df, movie_df], ignore_index=True)
+                # Skip missing movie IDs and unreadable responses
+                if json_data is None:
+                    continue
 
-    # SAVE TO CSV 
+                writer.add(json_data)
 
-    # Create directory if missing
-    output_dir = os.path.dirname(output_path)
-    if output_dir and not os.path.exists(output_dir):
-        os.makedirs(output_dir)
+            elapsed = time.perf_counter() - start
 
-    df.to_csv(output_path, index=False)
+            print(f"Fetched {len(ids_to_fetch)} movies in {elapsed:.2f}s "
+                  f"({len(ids_to_fetch) / elapsed:.1f} requests/s)")
+
+            if ledger:
+                for json_data in ledger.completedMovies(movie_ids):
+                    writer.add(json_data)
+
+                summary = ledger.summary()
+                print(f"Ledger: {summary}")
+
+                if summary[ProgressLedger.FAILED]:
+                    print(f"{summary[ProgressLedger.FAILED]} movies failed. Rerun with the same "
+                          f"ledger to fetch them again")
+
+    finally:
+        if ledger:
+            ledger.close()
+
+        if landing:
+            landing.close()
 
     print(f"Movie data saved to: {output_path}")
 
     
 
+
 def main():
     import os
     import sys
@@ -130,9 +314,14 @@ def main():
     movie_ids = [299534, 19995, 140607, 299536, 597, 135397, 420818, 24428, 168259, 99861,
                     284054, 12445, 181808, 330457, 351286, 109445, 321612, 260513]
 
-    data = extractDataFromAPI(session=create_retry(), url=url, API_KEY=API_KEY, movie_ids=movie_ids)
+    # Reruns are answered from the local response cache
+    session = create_retry(cache_path=os.path.join(project_root, "data", "cache", "responses.sqlite"))
+
+    data = extractDataFromAPI(session=session, url=url, API_KEY=API_KEY, movie_ids=movie_ids)
     #print(data.head())
 
+    print(f"Response cache: {session.response_cache.stats()}")
+
 
 if __name__ == "__main__":
         main()
\ No newline at end of file
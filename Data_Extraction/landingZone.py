@@ -0,0 +1,163 @@
+import gzip
+import io
+import json
+import os
+from typing import Iterator, Optional
+
+import pandas as pd
+
+try:
+    from Config.instrumentation import instrumented
+except ModuleNotFoundError:
+    # Run as a script, without the project root on sys.path: the functions are not measured
+    def instrumented(stage=None, metrics=None):
+        return lambda function: function
+
+
+#Defines a function that opens a JSON Lines file with the compression given by its extension
+def openJsonLines(path: str, mode: str = "r"):
+    """
+    Opens a JSON Lines file as text, compressed with gzip for .gz files and zstd for .zst files
+
+    Parameters
+    ----------
+    path    :   str
+            Path of the file
+
+    mode    :   str
+            "r" to read or "a" to append
+
+    Returns
+    -------
+    A text file object
+    """
+    if mode not in ("r", "a"):
+        raise ValueError("mode must be 'r' or 'a'")
+
+    if path.endswith(".gz"):
+        return gzip.open(path, f"{mode}t", encoding="utf-8")
+
+    if path.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("zstandard is required for .zst files: pip install zstandard")
+
+        if mode == "a":
+            raw = zstandard.ZstdCompressor().stream_writer(open(path, "ab"), closefd=True)
+        else:
+            raw = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), read_across_frames=True,
+                                                             closefd=True)
+
+        return io.TextIOWrapper(raw, encoding="utf-8")
+
+    return open(path, mode, encoding="utf-8")
+
+
+class RawJsonLinesWriter:
+    """
+    Appends raw API responses to a JSON Lines landing file, one movie per line
+
+    The file is only ever appended to, so reruns and resumed extractions add to it. Compressed
+    files (.gz, .zst) get a new compressed member per session, which readers handle transparently
+
+    Parameters
+    ----------
+    path    :   str
+            Path of the landing file
+    """
+
+    def __init__(self, path: str):
+        landing_dir = os.path.dirname(path)
+        if landing_dir and not os.path.exists(landing_dir):
+            os.makedirs(landing_dir)
+
+        self.path = path
+        self.rows = 0
+        self._file = openJsonLines(path, "a")
+
+    def write(self, movie: dict) -> None:
+        self._file.write(json.dumps(movie))
+        self._file.write("\n")
+        self.rows += 1
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+#Defines a function that reads the raw movies back from a landing file
+def readRawJsonLines(path: str) -> Iterator[dict]:
+    """
+    Yields the movies stored in a JSON Lines landing file
+
+    Parameters
+    ----------
+    path    :   str
+            Path of the landing file
+    """
+    with openJsonLines(path, "r") as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+#Defines a function that loads a landing file into a DataFrame with typed nested columns
+@instrumented()
+def loadRawMovies(path: str, columns: Optional[list] = None, dedupe: bool = True) -> pd.DataFrame:
+    """
+    Loads a JSON Lines landing file into a DataFrame flattened like the extracted CSV
+
+    Nested lists such as genres, credits.cast and credits.crew stay Python lists of dicts instead
+    of repr strings, so the Data_Cleaning functions use them directly without ast.literal_eval
+
+    Parameters
+    ----------
+    path    :   str
+            Path of the landing file
+
+    columns :   list
+            Columns to keep. Defaults to all of them
+
+    dedupe  :   bool
+            Keeps only the last response of movies landed more than once
+
+    Returns
+    -------
+    pd.DataFrame
+        The movies
+    """
+    movies = list(readRawJsonLines(path))
+
+    if dedupe:
+        movies = list({movie.get("id", i): movie for i, movie in enumerate(movies)}.values())
+
+    data = pd.json_normalize(movies)
+
+    if columns is not None:
+        data = data[[col for col in columns if col in data.columns]]
+
+    return data
+
+
+def main():
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "movies.jsonl.gz")
+
+        with RawJsonLinesWriter(path) as writer:
+            writer.write({"id": 1, "title": "Merlin", "genres": [{"id": 12, "name": "Adventure"}]})
+
+        data = loadRawMovies(path)
+        print(data)
+        print(type(data.loc[0, "genres"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import json
+import os
+import sqlite3
+import time
+from typing import Iterator
+
+
+class ProgressLedger:
+    """
+    Records the outcome of every movie ID fetched by the extractor in a SQLite file
+
+    Completed movies are stored with their response, skipped IDs (not found or unreadable) and
+    failed IDs (network errors) with their status, so an interrupted extraction can be rerun and
+    only fetch the IDs that are still outstanding
+
+    Parameters
+    ----------
+    path    :   str
+            Path of the SQLite file. It is created if missing
+    """
+
+    COMPLETED = "completed"
+    SKIPPED = "skipped"
+    FAILED = "failed"
+
+    def __init__(self, path: str):
+        ledger_dir = os.path.dirname(path)
+        if ledger_dir and not os.path.exists(ledger_dir):
+            os.makedirs(ledger_dir)
+
+        self.path = path
+        self._connection = sqlite3.connect(path)
+
+        # WAL keeps every update durable without a full sync per movie
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS movies (
+                movie_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                payload TEXT,
+                error TEXT,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._connection.commit()
+
+    def record(self, movie_id, result) -> None:
+        """
+        Records the outcome of fetching a movie
+
+        Parameters
+        ----------
+        movie_id    :   int or str
+                    The ID of the movie
+
+        result  :   dict, None or Exception
+                The movie, None if it was skipped or the error raised while fetching it
+        """
+        if isinstance(result, dict):
+            status, payload, error = self.COMPLETED, json.dumps(result), None
+        elif isinstance(result, Exception):
+            status, payload, error = self.FAILED, None, str(result)
+        else:
+            status, payload, error = self.SKIPPED, None, None
+
+        self._connection.execute(
+            "INSERT OR REPLACE INTO movies VALUES (?, ?, ?, ?, ?)",
+            (str(movie_id), status, payload, error, time.time())
+        )
+        self._connection.commit()
+
+    def outstanding(self, movie_ids: list) -> list:
+        """
+        Returns the IDs that are neither completed nor skipped, in their original order
+
+        Parameters
+        ----------
+        movie_ids   :   list
+                    The IDs requested for the extraction
+        """
+        done = {
+            movie_id for (movie_id,) in self._connection.execute(
+                "SELECT movie_id FROM movies WHERE status IN (?, ?)", (self.COMPLETED, self.SKIPPED)
+            )
+        }
+
+        return [movie_id for movie_id in movie_ids if str(movie_id) not in done]
+
+    def completedMovies(self, movie_ids: list) -> Iterator[dict]:
+        """
+        Yields the stored movies for the completed IDs in the order of movie_ids
+
+        Parameters
+        ----------
+        movie_ids   :   list
+                    The IDs requested for the extraction
+        """
+        for movie_id in movie_ids:
+            row = self._connection.execute(
+                "SELECT payload FROM movies WHERE movie_id = ? AND status = ?",
+                (str(movie_id), self.COMPLETED)
+            ).fetchone()
+
+            if row is not None:
+                yield json.loads(row[0])
+
+    def summary(self) -> dict:
+        """
+        Returns the number of IDs per status
+        """
+        counts = {self.COMPLETED: 0, self.SKIPPED: 0, self.FAILED: 0}
+        counts.update(self._connection.execute("SELECT status, COUNT(*) FROM movies GROUP BY status"))
+
+        return counts
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def main():
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with ProgressLedger(os.path.join(tmp, "ledger.sqlite")) as ledger:
+            ledger.record(1, {"id": 1, "title": "Merlin"})
+            ledger.record(2, None)
+            ledger.record(3, TimeoutError("Request timed out."))
+
+            print(ledger.summary())
+            print(ledger.outstanding([1, 2, 3, 4]))
+
+
+if __name__ == "__main__":
+    main()
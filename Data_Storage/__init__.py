@@ -0,0 +1,7 @@
+# Modules are imported on first use, see Config.lazyImports
+from Config.lazyImports import lazyPackage
+
+__getattr__, __dir__ = lazyPackage(__name__, {
+    "movieStorage": ["NESTED_COLUMNS", "FORMATS", "storageFormat", "parseNestedColumns", "saveMovieData",
+                     "loadMovieData"]
+})
@@ -0,0 +1,202 @@
+import ast
+import os
+from typing import Optional
+
+import pandas as pd
+
+
+# Columns that hold lists of dicts (or lists of strings) in the extracted data
+NESTED_COLUMNS = ("genres", "production_companies", "production_countries", "spoken_languages",
+                  "origin_country", "credits.cast", "credits.crew")
+
+FORMATS = {".csv": "csv", ".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow"}
+
+
+#Defines a function that returns the storage format of a file from its extension
+def storageFormat(path: str, format: Optional[str] = None) -> str:
+    """
+    Returns "csv", "parquet" or "arrow" from the format given or the extension of the path
+    """
+    if format is None:
+        format = FORMATS.get(os.path.splitext(path)[1].lower())
+
+    if format not in ("csv", "parquet", "arrow"):
+        raise ValueError(f"Unknown storage format for '{path}'. Use one of: {sorted(FORMATS)}")
+
+    return format
+
+
+def _importArrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("pyarrow is required for Parquet and Arrow files: pip install pyarrow")
+
+    return pyarrow
+
+
+#Defines a function that turns repr strings read from a CSV back into lists
+def parseNestedColumns(data: pd.DataFrame, columns: tuple = NESTED_COLUMNS) -> pd.DataFrame:
+    """
+    Converts the nested columns stored as Python repr strings (as in movieData.csv) into lists
+
+    Parameters
+    ----------
+    data    :   pd.DataFrame
+            The movies
+
+    columns :   tuple
+            The nested columns. Columns that are missing or already hold lists are left as they are
+
+    Returns
+    -------
+    pd.DataFrame
+        The movies with lists in the nested columns
+    """
+    for col in columns:
+        if col in data.columns:
+            data[col] = data[col].map(_parseRepr).astype(object)
+
+    return data
+
+
+def _parseRepr(value):
+    if isinstance(value, str):
+        try:
+            return ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            return None
+
+    return value
+
+
+#Defines a function that saves the movies as CSV, Parquet or Arrow IPC
+def saveMovieData(data: pd.DataFrame, path: str, format: Optional[str] = None,
+                  dictionaryThreshold: float = 0.5) -> None:
+    """
+    Saves the movies to a CSV, Parquet or Arrow IPC (Feather) file
+
+    For Parquet and Arrow the nested columns are stored as native list<struct> columns and string
+    columns with few distinct values are dictionary encoded, so the files are small and a subset of
+    columns can be loaded without reading the cast and crew
+
+    Parameters
+    ----------
+    data    :   pd.DataFrame
+            The movies
+
+    path    :   str
+            Path of the file. The format is taken from the extension unless given
+
+    format  :   str
+            "csv", "parquet" or "arrow"
+
+    dictionaryThreshold :   float
+                    String columns whose ratio of distinct values to rows is below this value are
+                    dictionary encoded in Arrow files. Parquet dictionary encodes every column
+    """
+    format = storageFormat(path, format)
+
+    output_dir = os.path.dirname(path)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    if format == "csv":
+        data.to_csv(path, index=False)
+        return
+
+    pyarrow = _importArrow()
+    import pyarrow.compute as pc
+
+    data = parseNestedColumns(data.copy())
+    table = pyarrow.Table.from_pandas(data, preserve_index=False)
+
+    if format == "parquet":
+        import pyarrow.parquet as pq
+
+        pq.write_table(table, path, compression="zstd", use_dictionary=True)
+        return
+
+    import pyarrow.feather as feather
+
+    for i, field in enumerate(table.schema):
+        column = table.column(i)
+
+        if pyarrow.types.is_string(field.type) and len(column) and \
+                pc.count_distinct(column).as_py() / len(column) < dictionaryThreshold:
+            table = table.set_column(i, field.name, pc.dictionary_encode(column))
+
+    feather.write_feather(table, path, compression="zstd")
+
+
+#Defines a function that loads the movies from a CSV, Parquet or Arrow IPC file
+def loadMovieData(path: str, columns: Optional[list] = None, format: Optional[str] = None) -> pd.DataFrame:
+    """
+    Loads the movies from a CSV, Parquet or Arrow IPC (Feather) file
+
+    Only the requested columns are read, so a KPI run can load budget, revenue and vote_average
+    without touching the cast and crew. Nested columns loaded from Parquet or Arrow hold arrays of
+    dicts, which the Data_Cleaning functions accept like the repr strings of the CSV
+
+    Parameters
+    ----------
+    path    :   str
+            Path of the file
+
+    columns :   list
+            Columns to load. Defaults to all of them
+
+    format  :   str
+            "csv", "parquet" or "arrow". Defaults to the extension of the path
+
+    Returns
+    -------
+    pd.DataFrame
+        The movies
+    """
+    format = storageFormat(path, format)
+
+    if format == "csv":
+        usecols = (lambda col: col in columns) if columns is not None else None
+        data = pd.read_csv(path, usecols=usecols)
+
+        return data[[col for col in columns if col in data.columns]] if columns is not None else data
+
+    _importArrow()
+
+    if format == "parquet":
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(path, columns=columns)
+    else:
+        import pyarrow.feather as feather
+
+        table = feather.read_table(path, columns=columns)
+
+    return table.to_pandas()
+
+
+def main():
+    import tempfile
+    import time
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    data = pd.read_csv(os.path.join(project_root, "data", "movieData.csv"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ("movies.csv", "movies.parquet", "movies.arrow"):
+            path = os.path.join(tmp, name)
+            saveMovieData(data, path)
+
+            start = time.perf_counter()
+            kpis = loadMovieData(path, columns=["budget", "revenue", "vote_average"])
+            elapsed = time.perf_counter() - start
+
+            print(f"{name:<16} {os.path.getsize(path) / 1024:8.1f} KiB | KPI columns loaded in "
+                  f"{elapsed * 1000:.1f} ms | {kpis.shape}")
+
+        print(loadMovieData(os.path.join(tmp, "movies.arrow"))["genres"][0])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+# Modules are imported on first use, see Config.lazyImports
+from Config.lazyImports import lazyPackage
+
+__getattr__, __dir__ = lazyPackage(__name__, {
+    "moviePipeline": ["CLEANING_STAGES", "COLUMN_ORDER", "OUTPUTS", "RANKINGS", "buildMoviePipeline",
+                      "exportResults"],
+    "pipelineRunner": ["Stage", "Pipeline"]
+})
@@ -0,0 +1,264 @@
+import argparse
+import os
+import sys
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+import numpy as np
+import pandas as pd
+
+from Data_Analysis.Data_Visualization.renderCharts import DEFAULT_CHARTS, chartInputs, renderChart
+from Data_Analysis.KPI_Analysis.aggregationCube import AggregationCube, buildAggregationCube
+from Data_Analysis.KPI_Analysis.kpiAnalysis import calculateProfit, calculateROI, rankColumn
+from Data_Cleaning.chunkedPipeline import CLEANING_FUNCTIONS, DEFAULT_STEPS
+from Data_Cleaning.normalizeTables import buildMovieTables
+from Data_Cleaning.reOrderColumns import reOrderColumns
+from Config.instrumentation import getMetrics, setInstrumentation
+from Pipeline.pipelineRunner import Pipeline
+
+
+# Names of the stages running DEFAULT_STEPS, in the same order
+CLEANING_STAGES = ("removeColumns", "separateArrays", "convertDataTypes", "convertNumeric", "removeStatus",
+                   "castSize", "crewSize", "directors")
+
+# The order of the columns of the cleaned movies in the notebook
+COLUMN_ORDER = ["id", "title", "tagline", "release_date", "genres", "belongs_to_collection", "original_language",
+                "budget_musd", "revenue_musd", "production_companies", "production_countries", "vote_count",
+                "vote_average", "popularity", "runtime", "overview", "spoken_languages", "poster_path", "cast",
+                "cast_size", "directors", "crew_size"]
+
+# The stages whose results are written by the command line
+OUTPUTS = ("clean", "rankings", "franchiseStatistics", "directorStatistics", "cube", "tables", "plots")
+
+COLUMNS_TO_DISPLAY = ["id", "title", "release_date", "genres", "budget_musd", "revenue_musd", "vote_count",
+                      "popularity"]
+
+# Ranking name -> (column, order)
+RANKINGS = {
+    "highest_revenue": ("revenue_musd", "desc"),
+    "highest_budget": ("budget_musd", "desc"),
+    "highest_profit": ("profit", "desc"),
+    "lowest_profit": ("profit", "asc"),
+    "highest_ROI": ("ROI", "desc"),
+    "most_voted": ("vote_count", "desc"),
+    "highest_rated": ("vote_average", "desc"),
+    "most_popular": ("popularity", "desc")
+}
+
+
+#Defines a function that extracts the movies from the API to a CSV file
+def extractMovies(output_path: str, movie_ids: list, max_workers: int = 1) -> str:
+    """
+    Extracts the movies with the API key of the .env file and returns the path of the CSV
+    """
+    from Config.config import create_retry, getURL, loadEnv
+    from Data_Extraction.extractData import extractDataFromAPI
+
+    session = create_retry(pool_maxsize=max_workers, record_latency=True)
+    extractDataFromAPI(session=session, url=getURL(), API_KEY=loadEnv(fileName="API_KEY"), movie_ids=movie_ids,
+                       output_path=output_path, max_workers=max_workers)
+
+    return output_path
+
+
+#Defines a function that reads the extracted movies
+def readMovies(path: str) -> pd.DataFrame:
+    return pd.read_csv(path)
+
+
+#Defines a function that adds the profit and ROI of every movie
+def addKPIs(data: pd.DataFrame) -> pd.DataFrame:
+    data = calculateProfit(data=data, revenueColumn="revenue_musd", budgetColumn="budget_musd")
+
+    return calculateROI(data=data, revenueColumn="revenue_musd", budgetColumn="budget_musd")
+
+
+#Defines a function that ranks the movies by each KPI
+def rankMovies(data: pd.DataFrame, rankings: dict = RANKINGS) -> dict:
+    """
+    Returns the movies ranked by each KPI, as key value pairs of ranking name and DataFrame
+    """
+    ranked = {}
+
+    for name, (column, order) in rankings.items():
+        if column not in data.columns:
+            print(f"Column '{column}' not found in dataset. Skipping.")
+            continue
+
+        columns = [col for col in COLUMNS_TO_DISPLAY if col in data.columns and col != column] + [column]
+        ranked[name] = rankColumn(data=data.copy(), column=column, order=order)[columns]
+
+    return ranked
+
+
+#Defines a function that compares franchise and standalone movies
+def franchiseStatistics(data: pd.DataFrame) -> pd.DataFrame:
+    groups = data.groupby(np.where(data["belongs_to_collection.id"].notna(), "Franchise", "Standalone"))
+
+    return groups.agg(
+        total_movies=("title", "count"),
+        total_budget=("budget_musd", "sum"),
+        mean_budget=("budget_musd", "mean"),
+        total_revenue=("revenue_musd", "sum"),
+        mean_revenue=("revenue_musd", "mean"),
+        mean_rating=("vote_average", "mean")
+    )
+
+
+#Defines a function that computes the number of movies, revenue and rating of each director
+def directorStatistics(data: pd.DataFrame) -> pd.DataFrame:
+    directors = data.assign(directors=data["directors"].dropna().str.split(",")).explode("directors")
+    directors["directors"] = directors["directors"].str.strip()
+
+    return directors.groupby("directors", as_index=False).agg(
+        total_movies=("title", "count"),
+        total_revenue=("revenue_musd", "sum"),
+        mean_rating=("vote_average", "mean")
+    ).sort_values(by="total_movies", ascending=False)
+
+
+#Defines a function that renders the charts of the notebook to PNG images
+def renderPlots(data: pd.DataFrame, cube: AggregationCube) -> dict:
+    """
+    Draws the charts of the notebook without a display and returns them as PNG bytes, as key value
+    pairs of chart name and image
+    """
+    inputs = chartInputs(data, DEFAULT_CHARTS, cube)
+
+    return {name: renderChart(kind, inputs[name], params) for name, (kind, params) in DEFAULT_CHARTS.items()}
+
+
+#Defines a function that declares the stages of the movie analysis
+def buildMoviePipeline(input_path: str, cache_dir: str, movie_ids: list = None, max_workers: int = 1) -> Pipeline:
+    """
+    Declares the notebook's analysis as a pipeline: extraction, the cleaning steps, the KPIs,
+    the rankings, the statistics of franchises and directors, the aggregation cube, the nested
+    tables and the charts
+
+    Parameters
+    ----------
+    input_path  :   str
+                The CSV of extracted movies
+
+    cache_dir   :   str
+                The directory the results of the stages are kept in
+
+    movie_ids   :   list
+                IDs to extract from the API to input_path first. Without them the CSV is read as it is
+
+    max_workers :   int
+                The number of concurrent requests of the extraction
+
+    Returns
+    -------
+    Pipeline
+        The pipeline, run it with run(targets, force)
+    """
+    pipeline = Pipeline(cache_dir)
+
+    if movie_ids:
+        pipeline.add("extract", extractMovies, params={"output_path": input_path, "movie_ids": list(movie_ids),
+                                                       "max_workers": max_workers})
+        pipeline.add("raw", readMovies, inputs=("extract",), files=(input_path,))
+    else:
+        pipeline.add("raw", readMovies, params={"path": input_path}, files=(input_path,))
+
+    previous = "raw"
+    for name, (function, kwargs) in zip(CLEANING_STAGES, DEFAULT_STEPS):
+        pipeline.add(name, CLEANING_FUNCTIONS[function], inputs=(previous,), params=kwargs)
+        previous = name
+
+    return (pipeline
+            .add("clean", reOrderColumns, inputs=(previous,), params={"columns": COLUMN_ORDER})
+            .add("kpis", addKPIs, inputs=("clean",))
+            .add("rankings", rankMovies, inputs=("kpis",))
+            .add("franchiseStatistics", franchiseStatistics, inputs=("kpis",))
+            .add("directorStatistics", directorStatistics, inputs=("kpis",))
+            .add("cube", buildAggregationCube, inputs=("kpis",))
+            .add("tables", buildMovieTables, inputs=("raw",))
+            .add("plots", renderPlots, inputs=("kpis", "cube")))
+
+
+#Defines a function that writes the results of the pipeline to files
+def exportResults(results: dict, output_dir: str) -> list:
+    """
+    Writes DataFrames to CSV files, dicts of DataFrames to one CSV per key, the cube to a CSV and
+    the charts to PNG files, and returns the paths written
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+
+    def write(name, value):
+        if isinstance(value, AggregationCube):
+            value = value.table
+
+        if isinstance(value, pd.DataFrame):
+            path = os.path.join(output_dir, f"{name}.csv")
+            value.to_csv(path, index=not isinstance(value.index, pd.RangeIndex))
+        elif isinstance(value, bytes):
+            path = os.path.join(output_dir, f"{name}.png")
+            with open(path, "wb") as file:
+                file.write(value)
+        else:
+            return
+
+        written.append(path)
+
+    for name, value in results.items():
+        if isinstance(value, dict):
+            for key, item in value.items():
+                write(f"{name}_{key}", item)
+        else:
+            write(name, value)
+
+    return written
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Runs the movie analysis, rerunning only the stages whose "
+                                                 "inputs, code or parameters changed")
+    parser.add_argument("--input", default=os.path.join(project_root, "data", "movieData.csv"),
+                        help="The CSV of extracted movies")
+    parser.add_argument("--output", default=os.path.join(project_root, "data", "pipeline_output"),
+                        help="The directory the results are written to")
+    parser.add_argument("--cache", default=os.path.join(project_root, "data", "cache", "pipeline"),
+                        help="The directory the results of the stages are kept in")
+    parser.add_argument("--targets", nargs="+", default=list(OUTPUTS),
+                        help="Stages to run with the stages they depend on and write to --output")
+    parser.add_argument("--force", nargs="+", default=(), help="Stages to rerun, or all")
+    parser.add_argument("--movie-ids", type=int, nargs="+", default=None,
+                        help="Extract these movies from the API to --input first")
+    parser.add_argument("--workers", type=int, default=1, help="Concurrent requests of the extraction")
+    parser.add_argument("--list", action="store_true", help="Print the stages in order and exit")
+    parser.add_argument("--metrics", default=None,
+                        help="Write the time, rows and memory of every stage to this .json or .prom file")
+    parser.add_argument("--memory", choices=["rss", "tracemalloc"], default="rss",
+                        help="How the memory of the stages is measured")
+    parser.add_argument("--profile", default=None, help="Write a cProfile file per stage to this directory")
+    args = parser.parse_args(argv)
+
+    # Cleaning functions also run in the pipeline stages, so only the outer stages are profiled
+    metrics = setInstrumentation(memory=args.memory, profileDir=args.profile)
+
+    pipeline = buildMoviePipeline(args.input, args.cache, args.movie_ids, args.workers)
+
+    if args.list:
+        for name in pipeline.order():
+            print(f"{name} <- {', '.join(pipeline.stages[name].inputs) or '-'}")
+        return
+
+    results = pipeline.run(args.targets, args.force)
+
+    for path in exportResults(results, args.output):
+        print(f"Wrote {path}")
+
+    print(metrics.report())
+
+    if args.metrics:
+        getMetrics().write(args.metrics)
+        print(f"Wrote {args.metrics}")
+
+
+if __name__ == "__main__":
+    main()
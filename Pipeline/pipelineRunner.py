@@ -0,0 +1,316 @@
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import time
+from typing import Callable, Optional
+
+from Config.instrumentation import measure
+
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Stage:
+    """
+    A step of a pipeline: a function called with the results of its input stages followed by its
+    parameters, as function(*inputs, **params)
+
+    Parameters
+    ----------
+    name    :   str
+            The name of the stage, used by the other stages to take its result as an input
+
+    function    :   Callable
+                The function computing the result. It must not modify its inputs in place,
+                pipelines pass it copies of DataFrames
+
+    inputs  :   tuple
+            Names of the stages whose results are passed to the function, in order
+
+    params  :   dict
+            Keyword arguments of the function. They must be JSON serializable or have a stable repr
+
+    files   :   tuple
+            Paths of files the stage reads. Their content is part of the fingerprint, so editing
+            them reruns the stage
+    """
+
+    def __init__(self, name: str, function: Callable, inputs: tuple = (), params: Optional[dict] = None,
+                 files: tuple = ()):
+        self.name = name
+        self.function = function
+        self.inputs = tuple(inputs)
+        self.params = dict(params or {})
+        self.files = tuple(files)
+
+
+class Pipeline:
+    """
+    Runs stages declared as a DAG and keeps the result of each stage on disk
+
+    Each stage has a fingerprint made of the source of its function and of the project modules it
+    uses, its parameters, the content of the files it reads and the fingerprints of
+    its inputs. A stage whose fingerprint has a saved result is not run again, and results are only
+    loaded from disk when a stage that has to run needs them. Changing a parameter or the code of
+    a stage reruns that stage and the stages depending on it, and nothing else
+
+    Parameters
+    ----------
+    cache_dir   :   str
+                The directory the results of the stages are pickled to, one file per stage
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.stages = {}
+
+    def add(self, name: str, function: Callable, inputs: tuple = (), params: Optional[dict] = None,
+            files: tuple = ()) -> "Pipeline":
+        """
+        Adds a stage. Takes the parameters of Stage and returns the pipeline so calls can be chained
+        """
+        if name in self.stages:
+            raise ValueError(f"Stage '{name}' already exists.")
+
+        self.stages[name] = Stage(name, function, inputs, params, files)
+
+        return self
+
+    def order(self, targets: Optional[list] = None) -> list:
+        """
+        Returns the stages needed for the targets (all stages by default) so that every stage comes
+        after its inputs
+        """
+        targets = list(self.stages) if targets is None else list(targets)
+        ordered, visiting, done = [], set(), set()
+
+        def visit(name, path):
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage '{name}'{f' required by {path[-1]}' if path else ''}. "
+                                 f"Must be one of: {list(self.stages)}")
+
+            if name in done:
+                return
+
+            if name in visiting:
+                raise ValueError(f"The stages form a cycle: {' -> '.join(path + [name])}")
+
+            visiting.add(name)
+            for upstream in self.stages[name].inputs:
+                visit(upstream, path + [name])
+
+            visiting.discard(name)
+            done.add(name)
+            ordered.append(name)
+
+        for target in targets:
+            visit(target, [])
+
+        return ordered
+
+    def run(self, targets: Optional[list] = None, force: tuple = ()) -> dict:
+        """
+        Runs the stages whose results are missing or out of date
+
+        Parameters
+        ----------
+        targets :   list
+                Stages whose results are wanted. Defaults to every stage
+
+        force   :   tuple
+                Stages to run even if they have a saved result, "all" for every stage
+
+        Returns
+        -------
+        dict
+            The result of each target, as key value pairs of stage and result
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        order = self.order(targets)
+        targets = order if targets is None else list(targets)
+        force = set(order) if "all" in force else set(force)
+
+        fingerprints, results, report = {}, {}, {}
+
+        def result(name):
+            # Results of stages that did not run are read from disk only when needed
+            if name not in results:
+                with open(self._artifactPath(name, fingerprints[name]), "rb") as file:
+                    results[name] = pickle.load(file)
+
+            return results[name]
+
+        for name in order:
+            stage = self.stages[name]
+            fingerprint = fingerprints[name] = self._fingerprint(stage, fingerprints)
+            path = self._artifactPath(name, fingerprint)
+
+            if name not in force and os.path.exists(path):
+                print(f"{name}: up to date")
+                report[name] = {"fingerprint": fingerprint, "cached": True}
+                continue
+
+            inputs = [_copy(result(upstream)) for upstream in stage.inputs]
+
+            start = time.perf_counter()
+            with measure(f"pipeline.{name}", inputs[0] if inputs else None) as record:
+                results[name] = stage.function(*inputs, **stage.params)
+                record["rows_out"] = len(results[name]) if hasattr(results[name], "columns") else None
+            elapsed = time.perf_counter() - start
+
+            self._save(name, fingerprint, results[name])
+            print(f"{name}: ran in {elapsed:.2f} seconds")
+            report[name] = {"fingerprint": fingerprint, "cached": False, "seconds": round(elapsed, 4)}
+
+        self._writeManifest(report)
+
+        return {name: result(name) for name in targets}
+
+    def _fingerprint(self, stage: Stage, fingerprints: dict) -> str:
+        state = {
+            "function": f"{stage.function.__module__}.{stage.function.__qualname__}",
+            "code": _codeHash(stage.function),
+            "params": stage.params,
+            "files": [_fileHash(path) for path in stage.files],
+            "inputs": [fingerprints[upstream] for upstream in stage.inputs]
+        }
+
+        return hashlib.blake2b(json.dumps(state, sort_keys=True, default=repr).encode(),
+                               digest_size=16).hexdigest()
+
+    def _artifactPath(self, name: str, fingerprint: str) -> str:
+        return os.path.join(self.cache_dir, f"{name}-{fingerprint}.pkl")
+
+    def _save(self, name: str, fingerprint: str, value) -> None:
+        path = self._artifactPath(name, fingerprint)
+
+        with open(path + ".tmp", "wb") as file:
+            pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+        os.replace(path + ".tmp", path)
+
+        # Only the latest result of a stage is kept
+        for fileName in os.listdir(self.cache_dir):
+            if fileName.endswith(".pkl") and fileName.rsplit("-", 1)[0] == name and \
+                    fileName != os.path.basename(path):
+                os.remove(os.path.join(self.cache_dir, fileName))
+
+    def _writeManifest(self, report: dict) -> None:
+        path = os.path.join(self.cache_dir, "manifest.json")
+
+        manifest = {}
+        if os.path.exists(path):
+            with open(path) as file:
+                manifest = json.load(file)
+
+        manifest.update(report)
+
+        with open(path + ".tmp", "w") as file:
+            json.dump(manifest, file, indent=2)
+
+        os.replace(path + ".tmp", path)
+
+
+def _copy(value):
+    # Most cleaning functions modify the DataFrame they are given
+    return value.copy() if hasattr(value, "copy") and hasattr(value, "columns") else value
+
+
+def _fileHash(path: str) -> str:
+    if not os.path.exists(path):
+        return "missing"
+
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def _codeHash(function: Callable) -> str:
+    # The source of the function and of every project module it uses
+    digest = hashlib.blake2b(digest_size=16)
+    function = inspect.unwrap(function)
+
+    try:
+        digest.update(inspect.getsource(function).encode())
+    except (OSError, TypeError):
+        digest.update(repr(function).encode())
+
+    files = set()
+    for value in _referencedGlobals(function):
+        _projectFiles(value if inspect.ismodule(value) else inspect.getmodule(value), files)
+
+    for path in sorted(files):
+        digest.update(path.encode())
+        digest.update(_fileHash(path).encode())
+
+    return digest.hexdigest()
+
+
+def _referencedGlobals(function: Callable) -> list:
+    # Globals named by the function and by the functions and lambdas defined inside it
+    code = getattr(function, "__code__", None)
+    namespace = getattr(function, "__globals__", {})
+
+    if code is None:
+        return [function]
+
+    names, codes = set(), [code]
+    while codes:
+        code = codes.pop()
+        names.update(code.co_names)
+        codes.extend(const for const in code.co_consts if inspect.iscode(const))
+
+    return [namespace[name] for name in sorted(names)
+            if name in namespace and (inspect.ismodule(namespace[name]) or inspect.isfunction(namespace[name])
+                                      or inspect.isclass(namespace[name]))]
+
+
+def _projectFiles(module, seen: set) -> set:
+    # The file of a project module and of the project modules it imports
+    path = getattr(module, "__file__", None)
+
+    if module is None or path is None or path in seen or \
+            not os.path.abspath(path).startswith(project_root + os.sep):
+        return seen
+
+    seen.add(path)
+
+    for value in list(vars(module).values()):
+        dependency = value if inspect.ismodule(value) else inspect.getmodule(value) \
+            if inspect.isfunction(value) or inspect.isclass(value) else None
+
+        if dependency is not None and dependency is not module:
+            _projectFiles(dependency, seen)
+
+    return seen
+
+
+def main():
+    import tempfile
+
+    def numbers(count: int) -> list:
+        return list(range(count))
+
+    def double(values: list, factor: int) -> list:
+        return [value * factor for value in values]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pipeline = (Pipeline(tmp)
+                    .add("numbers", numbers, params={"count": 5})
+                    .add("doubled", double, inputs=("numbers",), params={"factor": 2}))
+
+        print(pipeline.run())
+        print(pipeline.run())
+
+        pipeline.stages["doubled"].params["factor"] = 3
+        print(pipeline.run())
+
+
+if __name__ == "__main__":
+    main()